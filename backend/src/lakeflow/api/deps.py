@@ -1,7 +1,7 @@
 import os
 from functools import lru_cache
 
-from sentence_transformers import SentenceTransformer
+from lakeflow.pipelines.embedding.model_registry import DEFAULT_MODEL_NAME, get_model
 
 COLLECTION_NAME = "lakeflow_chunks"
 
@@ -12,8 +12,6 @@ def get_qdrant_client():
 
     return QdrantClient(url=os.getenv("QDRANT_URL", "http://localhost:6333"))
 
-@lru_cache
-def get_embedding_model() -> SentenceTransformer:
-    return SentenceTransformer(
-        "sentence-transformers/all-MiniLM-L6-v2"
-    )
+def get_embedding_model():
+    """SentenceTransformer dùng chung (registry: load + warm-up một lần mỗi process)."""
+    return get_model(DEFAULT_MODEL_NAME)
@@ -2,7 +2,18 @@
 Inbox API: upload files into 000_inbox and list by domain.
 
 - POST /inbox/upload: multipart form (domain, file(s)) -> write to inbox_path()/domain/
+  File được stream theo chunk + hash cùng lúc; trùng hash trong raw_objects → "duplicates"
+  (không ghi). File mới vào thẳng 100_raw + catalog (xem pipelines/ingesting/upload.py).
   Sau khi upload thành công, tự chạy pipeline (step0→step4) cho domain đó; collection Qdrant = tên domain.
+- Upload resumable (file lớn / mạng chập chờn):
+    POST   /inbox/uploads                 {domain, path?, filename, size} → upload_id
+    PUT    /inbox/uploads/{id}            body = bytes, header Content-Range: bytes <start>-<end>/<size>
+                                          (hoặc ?offset=<start>); start phải bằng offset hiện tại (409 nếu lệch)
+                                          end/size phải khớp độ dài body và size của session (400 nếu sai)
+    GET    /inbox/uploads/{id}            → offset đã nhận (để tiếp tục)
+    POST   /inbox/uploads/{id}/complete   {sha256?} → ingest vào 100_raw như upload thường
+    DELETE /inbox/uploads/{id}
+  Dữ liệu dở dang nằm trong 000_inbox/.uploads/<id>/ (step0 bỏ qua); SHA-256 tính dần theo chunk.
 - GET /inbox/domains: list top-level subdirs of 000_inbox
 - GET /inbox/list?domain=...: list files in a domain folder
 """
@@ -16,9 +27,27 @@ import urllib.request
 from pathlib import Path
 from typing import Optional
 
-from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Body, File, Form, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 
+from lakeflow.catalog.writer import open_catalog_writer
+from lakeflow.common.filesystem import COPY_STRATEGIES
 from lakeflow.config import paths
+from lakeflow.pipelines.ingesting.raw_ingestor import RawIngestor
+from lakeflow.pipelines.ingesting.upload import (
+    UploadTooLargeError,
+    ingest_staged,
+    store_upload,
+)
+from lakeflow.pipelines.ingesting.upload_sessions import (
+    UploadOffsetMismatchError,
+    UploadSession,
+    UploadSessionError,
+    UploadSessionNotFoundError,
+    UploadSessionStore,
+)
+from lakeflow.pipelines.ingesting.verifier import VERIFY_MODES
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +57,12 @@ router = APIRouter()
 ALLOWED_EXTENSIONS = {".pdf", ".docx", ".xlsx", ".xls", ".pptx", ".txt"}
 # Safe folder name: alphanumeric, underscore, hyphen only
 DOMAIN_PATTERN = re.compile(r"^[a-zA-Z0-9_-]+$")
-MAX_FILE_SIZE = 100 * 1024 * 1024  # 100 MB per file
+# Upload được stream ra đĩa (RAM không phụ thuộc kích thước file) → có thể nâng qua env
+MAX_FILE_SIZE = int(os.getenv("LAKEFLOW_UPLOAD_MAX_MB", "1024")) * 1024 * 1024
+CONTENT_RANGE_PATTERN = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+# Một store / inbox root: giữ hasher SHA-256 của các session đang upload
+_upload_stores: dict[Path, UploadSessionStore] = {}
 
 
 def _inbox_root() -> Path:
@@ -61,38 +95,276 @@ async def upload_to_inbox(
 
     target_dir.mkdir(parents=True, exist_ok=True)
 
-    uploaded: list[str] = []
+    accepted: list[tuple[UploadFile, str, Path]] = []
     errors: list[str] = []
 
     for f in files or []:
         if not f.filename:
             errors.append("One file had no filename")
             continue
-        ext = Path(f.filename).suffix.lower()
-        if ext not in ALLOWED_EXTENSIONS:
-            errors.append(f"{f.filename}: extension {ext} not allowed (allowed: {', '.join(sorted(ALLOWED_EXTENSIONS))})")
-            continue
-        # Safe filename: keep original name but avoid path traversal
-        safe_name = os.path.basename(f.filename)
-        if ".." in safe_name or safe_name.startswith("/"):
-            errors.append(f"{f.filename}: invalid filename")
+        safe_name, error = _check_filename(f.filename)
+        if error:
+            errors.append(f"{f.filename}: {error}")
             continue
-        dest = target_dir / safe_name
-        try:
-            content = await f.read()
-            if len(content) > MAX_FILE_SIZE:
-                errors.append(f"{f.filename}: file too large (max {MAX_FILE_SIZE // (1024*1024)} MB)")
-                continue
-            dest.write_bytes(content)
-            uploaded.append(safe_name)
-        except Exception as e:
-            errors.append(f"{f.filename}: {e!s}")
+        accepted.append((f, safe_name, target_dir / safe_name))
+
+    uploaded: list[str] = []
+    duplicates: list[str] = []
+    if accepted:
+        # Đọc / ghi đĩa + SQLite là blocking → chạy trên threadpool
+        uploaded, duplicates, store_errors = await run_in_threadpool(
+            _store_files, domain, accepted
+        )
+        errors.extend(store_errors)
 
     # Tự chạy pipeline cho domain (step0→step4), collection Qdrant = tên domain; có thể ghi sang qdrant_url (VD Research Qdrant)
     if uploaded:
         _trigger_pipeline_for_domain(domain, qdrant_url=(qdrant_url or "").strip() or None)
 
-    return {"uploaded": uploaded, "errors": errors}
+    return {"uploaded": uploaded, "duplicates": duplicates, "errors": errors}
+
+
+def _store_files(
+    domain: str,
+    accepted: list[tuple[UploadFile, str, Path]],
+) -> tuple[list[str], list[str], list[str]]:
+    """Stream từng file vào 100_raw + catalog. Trả về (uploaded, duplicates, errors)."""
+    uploaded: list[str] = []
+    duplicates: list[str] = []
+    errors: list[str] = []
+
+    with open_catalog_writer() as writer:
+        ingestor = _upload_ingestor(writer)
+        for f, safe_name, dest in accepted:
+            try:
+                stored = store_upload(f.file, domain, dest, ingestor, MAX_FILE_SIZE)
+            except UploadTooLargeError as e:
+                errors.append(f"{f.filename}: {e!s}")
+                continue
+            except Exception as e:
+                logger.exception("[inbox] Upload %s failed", f.filename)
+                errors.append(f"{f.filename}: {e!s}")
+                continue
+            if stored.status == "DUPLICATE":
+                duplicates.append(safe_name)
+            else:
+                uploaded.append(safe_name)
+    return uploaded, duplicates, errors
+
+
+def _upload_ingestor(writer) -> RawIngestor:
+    """RawIngestor cho đường upload; copy / verify theo cùng env với step0."""
+    copy_strategy = (os.getenv("PIPELINE_INGEST_COPY") or "auto").strip().lower()
+    if copy_strategy not in COPY_STRATEGIES:
+        copy_strategy = "auto"
+    verify_mode = (os.getenv("PIPELINE_INGEST_VERIFY") or "full").strip().lower()
+    if verify_mode not in VERIFY_MODES:
+        verify_mode = "full"
+    return RawIngestor(
+        paths.raw_path(),
+        writer.conn,
+        verify_mode=verify_mode,
+        writer=writer,
+        copy_strategy=copy_strategy,
+    )
+
+
+def _check_filename(filename: str) -> tuple[str, Optional[str]]:
+    """(tên an toàn, lỗi hoặc None)."""
+    ext = Path(filename).suffix.lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        return "", f"extension {ext} not allowed (allowed: {', '.join(sorted(ALLOWED_EXTENSIONS))})"
+    # Safe filename: keep original name but avoid path traversal
+    safe_name = os.path.basename(filename)
+    if ".." in safe_name or safe_name.startswith("/"):
+        return "", "invalid filename"
+    return safe_name, None
+
+
+# =====================================================
+# Resumable upload
+# =====================================================
+
+class CreateUploadBody(BaseModel):
+    """Tạo session upload resumable. size = tổng số byte của file."""
+    domain: str
+    filename: str
+    size: int = Field(..., ge=0)
+    path: Optional[str] = None
+
+
+class CompleteUploadBody(BaseModel):
+    """sha256 (tùy chọn) để kiểm tra toàn vẹn; qdrant_url như /upload."""
+    sha256: Optional[str] = None
+    qdrant_url: Optional[str] = None
+
+
+def _upload_store() -> UploadSessionStore:
+    root = _inbox_root()
+    store = _upload_stores.get(root)
+    if store is None:
+        store = _upload_stores.setdefault(root, UploadSessionStore(root))
+    return store
+
+
+def _session_info(session: UploadSession) -> dict:
+    return {
+        "upload_id": session.upload_id,
+        "domain": session.domain,
+        "path": session.path,
+        "filename": session.filename,
+        "size": session.size,
+        "offset": session.offset,
+    }
+
+
+def _upload_target_dir(domain: str, path: str) -> Path:
+    domain_root = _domain_path_safe(_inbox_root(), domain)
+    if domain_root is None:
+        raise HTTPException(status_code=400, detail="domain invalid (no .. or path separators)")
+    target_dir = _domain_subpath_safe(domain_root, path or "")
+    if target_dir is None:
+        raise HTTPException(status_code=400, detail="path invalid (no .. or path separators)")
+    return target_dir
+
+
+@router.post("/uploads")
+def create_upload(body: CreateUploadBody):
+    """Tạo session upload resumable; trả về upload_id và offset (0)."""
+    domain = (body.domain or "").strip()
+    if not domain:
+        raise HTTPException(status_code=400, detail="domain is required")
+    _upload_target_dir(domain, body.path or "")
+    safe_name, error = _check_filename(body.filename)
+    if error:
+        raise HTTPException(status_code=400, detail=f"{body.filename}: {error}")
+    if body.size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"file too large (max {MAX_FILE_SIZE // (1024 * 1024)} MB)",
+        )
+    session = _upload_store().create(domain, body.path or "", safe_name, body.size)
+    return _session_info(session)
+
+
+@router.get("/uploads/{upload_id}")
+def get_upload(upload_id: str):
+    """Trạng thái session: offset = số byte đã nhận (tiếp tục PUT từ đây)."""
+    try:
+        return _session_info(_upload_store().get(upload_id))
+    except UploadSessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.put("/uploads/{upload_id}")
+async def put_upload_chunk(upload_id: str, request: Request, offset: Optional[int] = None):
+    """Ghi body (bytes) vào session tại offset (Content-Range hoặc ?offset=). Trả về offset mới."""
+    start = offset
+    end: Optional[int] = None  # byte cuối (inclusive) theo Content-Range
+    total: Optional[int] = None
+    content_range = request.headers.get("content-range")
+    if content_range:
+        m = CONTENT_RANGE_PATTERN.match(content_range.strip())
+        if not m:
+            raise HTTPException(status_code=400, detail="invalid Content-Range")
+        start, end = int(m.group(1)), int(m.group(2))
+        total = None if m.group(3) == "*" else int(m.group(3))
+        if end < start:
+            raise HTTPException(status_code=400, detail="invalid Content-Range: end < start")
+    if start is None:
+        raise HTTPException(status_code=400, detail="Content-Range header or offset is required")
+
+    content_length = request.headers.get("content-length")
+    if end is not None and content_length and content_length.isdigit() and int(content_length) != end - start + 1:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Content-Range covers {end - start + 1} bytes but body has {content_length}",
+        )
+
+    store = _upload_store()
+    try:
+        writer = await run_in_threadpool(store.open_chunk, upload_id, start)
+    except UploadOffsetMismatchError as e:
+        raise HTTPException(status_code=409, detail={"error": str(e), "offset": e.expected})
+    except UploadSessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    size = writer.session.size
+    if (total is not None and total != size) or (end is not None and end >= size):
+        await run_in_threadpool(writer.close)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Content-Range {content_range} does not match upload size {size}",
+        )
+
+    # Chunk nhận được phần nào giữ phần đó (client ngắt giữa chừng → resume từ offset mới)
+    try:
+        async for data in request.stream():
+            if not data:
+                continue
+            if end is not None and writer.offset + len(data) > end + 1:
+                raise UploadSessionError(f"body longer than Content-Range {content_range}")
+            await run_in_threadpool(writer.write, data)
+    except UploadSessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        new_offset = await run_in_threadpool(writer.close)
+    if end is not None and new_offset != end + 1:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": f"body shorter than Content-Range {content_range}", "offset": new_offset},
+        )
+    return {"upload_id": upload_id, "offset": new_offset}
+
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str, body: Optional[CompleteUploadBody] = Body(default=None)):
+    """Kết thúc upload: kiểm tra đủ byte (+ sha256 nếu gửi), ingest vào 100_raw + catalog."""
+    store = _upload_store()
+    try:
+        session, file_hash, staged = await run_in_threadpool(store.finalize, upload_id)
+    except UploadSessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadSessionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    try:
+        if body and body.sha256 and body.sha256.strip().lower() != file_hash:
+            raise HTTPException(
+                status_code=422,
+                detail=f"sha256 mismatch (server computed {file_hash}); upload discarded",
+            )
+        dest = _upload_target_dir(session.domain, session.path) / session.filename
+        status = await run_in_threadpool(_ingest_upload, session, file_hash, staged, dest)
+    finally:
+        store.delete(upload_id)
+
+    if status == "COPIED":
+        qdrant_url = ((body.qdrant_url if body else None) or "").strip() or None
+        _trigger_pipeline_for_domain(session.domain, qdrant_url=qdrant_url)
+
+    return {
+        "upload_id": upload_id,
+        "status": "uploaded" if status == "COPIED" else "duplicate",
+        "name": session.filename,
+        "file_hash": file_hash,
+        "size": session.offset,
+    }
+
+
+@router.delete("/uploads/{upload_id}")
+def delete_upload(upload_id: str):
+    """Hủy session upload và xóa dữ liệu đã nhận."""
+    try:
+        _upload_store().delete(upload_id)
+    except UploadSessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"upload_id": upload_id, "deleted": True}
+
+
+def _ingest_upload(session: UploadSession, file_hash: str, staged: Path, dest: Path) -> str:
+    with open_catalog_writer() as writer:
+        return ingest_staged(staged, file_hash, session.domain, dest, _upload_ingestor(writer))
 
 
 def _trigger_pipeline_for_domain(domain: str, qdrant_url: Optional[str] = None) -> None:
@@ -149,6 +421,9 @@ def _domain_path_safe(root: Path, domain: str) -> Optional[Path]:
     domain = (domain or "").strip()
     if not domain or ".." in domain or "/" in domain or "\\" in domain:
         return None
+    # ".uploads" (session upload dở dang) và thư mục ẩn khác không phải domain
+    if domain.startswith("."):
+        return None
     target = root / domain
     try:
         target.resolve().relative_to(root.resolve())
@@ -12,6 +12,7 @@ from pathlib import Path
 import os
 
 from lakeflow.runtime.config import runtime_config
+from lakeflow.pipelines.embedding.model_registry import model_stats
 
 
 # ======================================================
@@ -126,3 +127,12 @@ def set_data_path(req: DataPathRequest):
         "status": "ok",
         "data_base_path": str(path),
     }
+
+
+@router.get("/embedding-models")
+def get_embedding_models():
+    """
+    Model embedding đã load trong process API: thời gian load / warm-up,
+    số chiều vector, số lần dùng lại.
+    """
+    return {"models": model_stats()}
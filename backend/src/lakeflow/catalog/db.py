@@ -132,3 +132,35 @@ def init_db(conn: sqlite3.Connection) -> None:
             created_at TEXT
         )
     """)
+    _ensure_column(conn, "ingest_log", "copy_method", "TEXT")
+    # Cache (source_path, size, mtime_ns, inode) → hash: file inbox không đổi thì không hash lại
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inbox_fingerprints (
+            source_path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            inode INTEGER,
+            hash TEXT,
+            updated_at TEXT
+        )
+    """)
+    # Lỗi staging / processing theo file (kể cả file bị watchdog kill)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stage_errors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_hash TEXT,
+            stage TEXT,
+            source_path TEXT,
+            kind TEXT,
+            message TEXT,
+            created_at TEXT
+        )
+    """)
+
+
+def _ensure_column(conn: sqlite3.Connection, table: str, column: str, decl: str) -> None:
+    """Thêm cột cho DB cũ (CREATE TABLE IF NOT EXISTS không cập nhật schema)."""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        log.info("Catalog migration: ALTER TABLE %s ADD COLUMN %s", table, column)
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
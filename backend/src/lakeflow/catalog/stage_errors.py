@@ -0,0 +1,40 @@
+# src/lakeflow/catalog/stage_errors.py
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from lakeflow.common.parallel import WorkerCrashedError
+from lakeflow.common.watchdog import WatchdogKilledError
+
+
+def error_kind(exc: BaseException) -> str:
+    """timeout / memory (watchdog), crashed (worker chết), error (exception thường)."""
+    if isinstance(exc, WatchdogKilledError):
+        return exc.kind
+    if isinstance(exc, WorkerCrashedError):
+        return "crashed"
+    return "error"
+
+
+def record_stage_error(
+    conn: sqlite3.Connection,
+    file_hash: str,
+    stage: str,
+    source_path: Path,
+    exc: BaseException,
+) -> None:
+    conn.execute(
+        """
+        INSERT INTO stage_errors
+        (file_hash, stage, source_path, kind, message, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (
+            file_hash,
+            stage,
+            str(source_path),
+            error_kind(exc),
+            str(exc),
+            datetime.utcnow().isoformat(),
+        ),
+    )
@@ -0,0 +1,316 @@
+# src/lakeflow/catalog/writer.py
+"""
+Catalog writer: gom các lệnh ghi (INSERT/UPDATE) vào transaction tường minh.
+
+Connection của catalog chạy autocommit (isolation_level=None, synchronous=FULL),
+nên mỗi execute() là vài lần fsync – rất chậm trên NFS. Writer giữ các lệnh ghi
+trong bộ nhớ và chạy chúng trong một transaction ở flush(): sau mỗi `batch_size`
+file hoặc `max_interval` giây (kiểm tra tại file_done()). Lock ghi của SQLite chỉ
+bị giữ trong lúc flush, không phải trong lúc copy file giữa hai lần commit
+(API upload / step0 khác chạy cùng lúc không bị "database is locked").
+
+Journal (crash-safe):
+  - Mỗi lệnh ghi được append vào <catalog>.journal-<id>.jsonl trước khi execute,
+    kèm batch id; file_done() ghi một marker.
+  - COMMIT cập nhật catalog_journal_state.last_batch trong cùng transaction.
+  - Writer giữ flock trên journal của mình (lock trên file tạm rồi mới rename sang
+    tên journal → replay không bao giờ thấy journal chưa bị lock). Khi mở writer
+    mới, các journal không còn ai giữ lock (process đã chết giữa batch) được
+    replay: chỉ các batch chưa commit, và chỉ tới marker file_done cuối cùng (file
+    nào ghi dở thì bỏ).
+  Journal được flush (không fsync) mỗi lệnh: chịu được process chết; máy chết thì
+  mất batch hiện tại như trước – lượt sau sẽ ingest lại các file đó.
+
+Chỉ dùng từ một thread (thread sở hữu connection). Đọc qua connection không
+thấy các dòng của batch chưa flush (RawIngestor dedup theo index trong bộ nhớ).
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence
+
+from lakeflow.catalog.db import get_connection, init_db
+from lakeflow.config.paths import catalog_db_path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+JOURNAL_GLOB = ".journal-*.jsonl"
+
+
+class CatalogWriter:
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        batch_size: int = 1,
+        max_interval: Optional[float] = None,
+        journal: bool = True,
+    ):
+        self.conn = conn
+        self.batch_size = max(1, batch_size)
+        self.max_interval = max_interval
+        self._pending_files = 0
+        self._statements: list[tuple[str, Sequence[Any]]] = []
+        self._batch_started: Optional[float] = None
+        self._batch_id = 0
+        self._journal_path: Optional[Path] = None
+        self._journal_file = None
+
+        _init_state_table(conn)
+        db_file = _db_file(conn)
+        if journal and db_file is not None:
+            replay_orphaned_journals(conn)
+            self._open_journal(db_file)
+
+    # -------------------------
+    # Ghi
+    # -------------------------
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> None:
+        """Ghi vào journal và giữ lệnh tới flush()."""
+        if not self._statements:
+            self._batch_id += 1
+            self._batch_started = time.monotonic()
+        self._journal({"batch": self._batch_id, "sql": sql, "params": list(params)})
+        self._statements.append((sql, params))
+
+    def file_done(self) -> None:
+        """Đánh dấu xong một file; commit khi đủ batch hoặc quá max_interval giây."""
+        self._pending_files += 1
+        if self._statements:
+            self._journal({"batch": self._batch_id, "file_done": True})
+        if self._pending_files >= self.batch_size or self._interval_elapsed():
+            self.flush()
+
+    def flush(self) -> None:
+        if self._statements:
+            # Lỗi → ROLLBACK, lệnh được giữ lại (close() thử lại; journal vẫn còn)
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in self._statements:
+                    self.conn.execute(sql, params)
+                if self._journal_path is not None:
+                    _set_last_batch(self.conn, self._journal_path.name, self._batch_id)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            log.debug("Catalog batch %s committed: %s file(s)", self._batch_id, self._pending_files)
+            self._statements = []
+        self._pending_files = 0
+        self._batch_started = None
+
+    def close(self) -> None:
+        self.flush()
+        if self._journal_file is not None:
+            name = self._journal_path.name
+            self._journal_path.unlink(missing_ok=True)
+            self._journal_file.close()  # nhả flock
+            self._journal_file = None
+            self.conn.execute("DELETE FROM catalog_journal_state WHERE journal = ?", (name,))
+
+    def __enter__(self) -> "CatalogWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # Kể cả khi lỗi: các file đã xử lý xong trong batch vẫn được ghi
+        self.close()
+
+    # -------------------------
+    # Journal
+    # -------------------------
+    def _interval_elapsed(self) -> bool:
+        return (
+            self.max_interval is not None
+            and self._batch_started is not None
+            and time.monotonic() - self._batch_started >= self.max_interval
+        )
+
+    def _open_journal(self, db_file: Path) -> None:
+        if fcntl is None:
+            log.warning("fcntl không khả dụng: catalog writer chạy không có journal")
+            return
+        path = db_file.with_name(f"{db_file.name}.journal-{uuid.uuid4().hex[:12]}.jsonl")
+        # Tên tạm không khớp JOURNAL_GLOB: chỉ lộ ra cho replay sau khi đã có lock
+        tmp_path = path.with_name(path.name + ".tmp")
+        f = tmp_path.open("x", encoding="utf-8")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.replace(tmp_path, path)
+        except BaseException:
+            f.close()
+            tmp_path.unlink(missing_ok=True)
+            raise
+        self._journal_path = path
+        self._journal_file = f
+
+    def _journal(self, entry: dict) -> None:
+        if self._journal_file is None:
+            return
+        self._journal_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._journal_file.flush()
+
+
+# =====================================================
+# Replay
+# =====================================================
+
+def replay_orphaned_journals(conn: sqlite3.Connection) -> int:
+    """
+    Replay journal của các writer đã chết giữa batch. Trả về số file đã khôi phục.
+    Journal đang được writer khác giữ lock thì bỏ qua; journal lỗi khi replay được đổi
+    tên thành *.failed (kèm cảnh báo) để xem / xử lý tay.
+    """
+    db_file = _db_file(conn)
+    if db_file is None or fcntl is None:
+        return 0
+
+    restored = 0
+    for path in sorted(db_file.parent.glob(db_file.name + JOURNAL_GLOB)):
+        try:
+            f = path.open("r+", encoding="utf-8")
+        except OSError:
+            continue
+        try:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                continue  # writer còn sống
+            if not _same_file(f, path):
+                continue  # writer / lượt replay khác vừa xử lý xong và xóa journal
+            try:
+                restored += _replay_journal(conn, path.name, f.read().splitlines())
+            except Exception as exc:
+                if _is_busy(exc):
+                    raise  # catalog đang bị khóa: journal giữ nguyên, replay lần sau
+                # Batch không replay được (schema cũ, params hỏng...) → cất sang *.failed
+                # để writer sau không kẹt ở cùng lỗi; các batch trước đó đã được ghi
+                failed_path = path.with_name(path.name + ".failed")
+                path.rename(failed_path)
+                log.warning(
+                    "Catalog journal %s cannot be replayed (%s), moved to %s",
+                    path.name, exc, failed_path.name,
+                )
+                continue
+            path.unlink(missing_ok=True)
+            conn.execute("DELETE FROM catalog_journal_state WHERE journal = ?", (path.name,))
+        finally:
+            f.close()
+    return restored
+
+
+def _replay_journal(conn: sqlite3.Connection, name: str, lines: list[str]) -> int:
+    row = conn.execute(
+        "SELECT last_batch FROM catalog_journal_state WHERE journal = ?", (name,)
+    ).fetchone()
+    last_batch = row[0] if row else 0
+
+    # batch id → danh sách file, mỗi file là list lệnh (chỉ file có marker file_done)
+    batches: dict[int, list[list[tuple[str, list]]]] = {}
+    current: dict[int, list[tuple[str, list]]] = {}
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            break  # dòng cuối ghi dở
+        batch = entry.get("batch", 0)
+        if batch <= last_batch:
+            continue
+        if entry.get("file_done"):
+            batches.setdefault(batch, []).append(current.pop(batch, []))
+        else:
+            current.setdefault(batch, []).append((entry["sql"], entry["params"]))
+
+    restored = 0
+    for batch in sorted(batches):
+        conn.execute("BEGIN")
+        try:
+            for statements in batches[batch]:
+                for sql, params in statements:
+                    try:
+                        conn.execute(sql, params)
+                    except sqlite3.IntegrityError as exc:
+                        log.warning("Catalog journal replay: skip statement (%s)", exc)
+                restored += 1
+            _set_last_batch(conn, name, batch)
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:  # ROLLBACK lỗi không được che lỗi gốc
+                conn.execute("ROLLBACK")
+            raise
+
+    if restored:
+        log.warning("Catalog journal %s: replayed %s file(s) from interrupted batch", name, restored)
+    return restored
+
+
+# =====================================================
+# Helpers
+# =====================================================
+
+def _init_state_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_journal_state (
+            journal TEXT PRIMARY KEY,
+            last_batch INTEGER,
+            updated_at TEXT
+        )
+    """)
+
+
+def _set_last_batch(conn: sqlite3.Connection, name: str, batch: int) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO catalog_journal_state VALUES (?, ?, ?)",
+        (name, batch, datetime.utcnow().isoformat()),
+    )
+
+
+def _is_busy(exc: BaseException) -> bool:
+    message = str(exc).lower()
+    return isinstance(exc, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+def _same_file(f, path: Path) -> bool:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    opened = os.fstat(f.fileno())
+    return (st.st_dev, st.st_ino) == (opened.st_dev, opened.st_ino)
+
+
+def _db_file(conn: sqlite3.Connection) -> Optional[Path]:
+    """Đường dẫn file của DB chính; None nếu là :memory:."""
+    for _, name, file in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return Path(file) if file else None
+    return None
+
+
+@contextmanager
+def open_catalog_writer(
+    batch_size: int = 1,
+    max_interval: Optional[float] = None,
+) -> Iterator[CatalogWriter]:
+    """
+    Mở catalog (500_catalog/catalog.sqlite) + writer có journal.
+    Dùng cho các đường ghi ngoài step0 (vd. API upload).
+    """
+    conn = get_connection(catalog_db_path())
+    try:
+        init_db(conn)
+        with CatalogWriter(conn, batch_size=batch_size, max_interval=max_interval) as writer:
+            yield writer
+    finally:
+        conn.close()
@@ -1,24 +1,122 @@
 # src/lakeflow/common/filesystem.py
+import errno
 import os
 import shutil
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Cách copy vào 100_raw
+#   auto     : reflink (FICLONE) → os.copy_file_range → stream qua Python
+#   hardlink : thử hardlink trước (opt-in: sửa file inbox tại chỗ sẽ sửa luôn bản raw), rồi như auto
+#   stream   : luôn shutil.copyfileobj (như trước)
+COPY_STRATEGIES = ("auto", "hardlink", "stream")
+
+# ioctl FICLONE (linux/fs.h) – reflink trên btrfs / XFS / bcachefs
+FICLONE = 0x40049409
+
+# Lỗi nghĩa là "primitive này không dùng được ở đây" → thử cách tiếp theo
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.EPERM,
+    errno.EBADF,
+}
+
 
 def ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
-def atomic_copy(src: Path, dst: Path) -> None:
+def atomic_copy(src: Path, dst: Path, strategy: str = "auto") -> str:
+    """
+    Copy src → dst qua file tạm + os.replace.
+
+    Trả về cách đã dùng: "hardlink" | "reflink" | "copy_file_range" | "stream".
+    """
     src = Path(src)
     dst = Path(dst).resolve()
     parent_str = os.path.dirname(os.path.abspath(str(dst)))
     os.makedirs(parent_str, exist_ok=True)
     tmp_str = parent_str + os.sep + Path(dst).name + ".tmp"
+
+    if strategy == "hardlink" and _try_hardlink(str(src), tmp_str):
+        os.replace(tmp_str, str(dst))
+        # Cùng inode với src → không copystat
+        return "hardlink"
+
     with open(str(src), "rb") as f_in:
         with open(tmp_str, "wb") as f_out:
-            shutil.copyfileobj(f_in, f_out)
+            method = "stream"
+            if strategy != "stream":
+                if _try_reflink(f_in, f_out):
+                    method = "reflink"
+                elif _try_copy_file_range(f_in, f_out):
+                    method = "copy_file_range"
+            if method == "stream":
+                shutil.copyfileobj(f_in, f_out)
     os.replace(tmp_str, str(dst))
     try:
         shutil.copystat(str(src), str(dst))
     except OSError:
         pass
+    return method
+
+
+def _try_hardlink(src_str: str, tmp_str: str) -> bool:
+    try:
+        if os.path.lexists(tmp_str):
+            os.unlink(tmp_str)
+        os.link(src_str, tmp_str)
+        return True
+    except OSError:
+        return False
+
+
+def _try_reflink(f_in, f_out) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(f_out.fileno(), FICLONE, f_in.fileno())
+        return True
+    except OSError as exc:
+        if exc.errno in _UNSUPPORTED_ERRNOS:
+            return False
+        raise
+
+
+def _try_copy_file_range(f_in, f_out) -> bool:
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is None:
+        return False
+
+    size = os.fstat(f_in.fileno()).st_size
+    offset = 0
+    try:
+        while offset < size:
+            n = copy_file_range(
+                f_in.fileno(), f_out.fileno(), size - offset, offset, offset
+            )
+            if n == 0:
+                break
+            offset += n
+    except OSError as exc:
+        if exc.errno not in _UNSUPPORTED_ERRNOS:
+            raise
+        # Không hỗ trợ (vd. khác filesystem trên kernel cũ) → bỏ phần đã ghi, stream lại
+        f_out.seek(0)
+        f_out.truncate()
+        return False
+
+    if offset < size:
+        # File nguồn bị rút ngắn giữa chừng → để stream xử lý như trước
+        f_out.seek(0)
+        f_out.truncate()
+        return False
+    return True
@@ -1,5 +1,6 @@
 # src/lakeflow/common/hashing.py
 import hashlib
+import os
 import time
 from pathlib import Path
 from typing import Iterable
@@ -55,3 +56,43 @@ def sha256_file(path: Path) -> str:
     raise TemporaryIOError(
         f"Temporary I/O error after {MAX_RETRIES} retries: {path}"
     ) from last_error
+
+
+def sha256_copy(src: Path, dst: Path) -> str:
+    """
+    Copy src → dst và tính SHA-256 trong cùng một lượt đọc (single-pass).
+
+    dst được fsync trước khi trả về. Retry / TemporaryIOError giống sha256_file
+    (mỗi lần retry ghi lại dst từ đầu).
+    """
+    last_error: Exception | None = None
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            hasher = hashlib.sha256()
+            with src.open("rb") as f_in, dst.open("wb") as f_out:
+                while True:
+                    chunk = f_in.read(BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    f_out.write(chunk)
+
+                f_out.flush()
+                os.fsync(f_out.fileno())
+
+            return hasher.hexdigest()
+
+        except (OSError, TimeoutError) as exc:
+            last_error = exc
+
+            errno = getattr(exc, "errno", None)
+            if errno in RETRY_ERRNOS:
+                time.sleep(RETRY_DELAY)
+                continue
+
+            raise
+
+    raise TemporaryIOError(
+        f"Temporary I/O error after {MAX_RETRIES} retries: {src}"
+    ) from last_error
@@ -0,0 +1,136 @@
+# src/lakeflow/common/parallel.py
+"""
+Chạy tác vụ CPU-bound theo từng file trên nhiều process (ProcessPoolExecutor).
+
+- Exception trong một file được trả về cho file đó, không dừng cả lượt.
+- Worker chết hẳn (segfault, bị OOM kill...) làm hỏng cả pool: pool được tạo lại,
+  các file đang chạy được thử lại riêng lẻ; file làm chết worker lần nữa bị đánh
+  dấu WorkerCrashedError.
+- Số file đang chờ trong pool bị giới hạn (2 × workers) → không dựng hết hàng nghìn
+  future cùng lúc.
+
+fn và item phải pickle được (hàm top-level trong module, không phải script __main__).
+"""
+
+import os
+import sys
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class WorkerCrashedError(RuntimeError):
+    """Process worker chết khi đang xử lý item này."""
+
+
+@dataclass
+class TaskResult(Generic[T, R]):
+    item: T
+    value: Optional[R] = None
+    error: Optional[BaseException] = None
+
+
+def resolve_workers(value: Optional[str]) -> int:
+    """"auto" / "0" → số CPU; rỗng → 1."""
+    value = (value or "").strip().lower()
+    if not value:
+        return 1
+    if value in ("auto", "0"):
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+
+def map_in_processes(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    workers: int,
+    initializer: Optional[Callable[..., Any]] = None,
+    initargs: tuple = (),
+) -> Iterator[TaskResult[T, R]]:
+    """Yield TaskResult theo thứ tự hoàn thành."""
+    pending = enumerate(items)
+    retry: deque[tuple[int, T]] = deque()   # đang chạy khi pool hỏng → chạy lại một mình
+    crashed_once: set[int] = set()          # index item đã từng ở trong pool bị hỏng
+    max_in_flight = max(1, workers) * 2
+
+    def new_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=max(1, workers), initializer=initializer, initargs=initargs
+        )
+
+    def on_crash(index: int, item: T) -> Optional[TaskResult[T, R]]:
+        if index in crashed_once:
+            return TaskResult(item, error=WorkerCrashedError("worker process died"))
+        crashed_once.add(index)
+        retry.append((index, item))
+        return None
+
+    pool = new_pool()
+    in_flight: dict[Future, tuple[int, T]] = {}
+    try:
+        while True:
+            # Đang thử lại sau crash: mỗi lần chỉ một item → biết chính xác item nào gây crash
+            to_submit: list[tuple[int, T]] = []
+            if retry:
+                if not in_flight:
+                    to_submit.append(retry.popleft())
+            else:
+                while len(in_flight) + len(to_submit) < max_in_flight:
+                    nxt = next(pending, None)
+                    if nxt is None:
+                        break
+                    to_submit.append(nxt)
+            if to_submit:
+                # fork copy buffer stdout chưa flush sang worker → log bị in lặp
+                sys.stdout.flush()
+                sys.stderr.flush()
+            for n, (index, item) in enumerate(to_submit):
+                try:
+                    in_flight[pool.submit(fn, item)] = (index, item)
+                except BrokenProcessPool:
+                    # Pool hỏng giữa hai lần wait (không phải lỗi của item này)
+                    retry.extendleft(reversed(to_submit[n:]))
+                    if not in_flight:
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        pool = new_pool()
+                    break
+
+            if not in_flight:
+                if retry:
+                    continue
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            broken = False
+            results: list[TaskResult[T, R]] = []
+            for fut in done:
+                index, item = in_flight.pop(fut)
+                try:
+                    results.append(TaskResult(item, value=fut.result()))
+                except BrokenProcessPool:
+                    broken = True
+                    crashed = on_crash(index, item)
+                    if crashed is not None:
+                        results.append(crashed)
+                except Exception as exc:
+                    results.append(TaskResult(item, error=exc))
+
+            if broken:
+                # Mọi future còn lại của pool cũ cũng hỏng → đưa vào hàng thử lại
+                for index, item in in_flight.values():
+                    crashed = on_crash(index, item)
+                    if crashed is not None:
+                        results.append(crashed)
+                in_flight.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                print(f"[PARALLEL][WARN] Worker process died, restarting pool ({len(retry)} to retry)")
+                pool = new_pool()
+
+            yield from results
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
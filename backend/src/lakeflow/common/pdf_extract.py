@@ -0,0 +1,146 @@
+# src/lakeflow/common/pdf_extract.py
+"""
+Trích text PDF theo trang qua engine thay được.
+
+- "pdfium" (mặc định): pypdfium2 (PDFium, C++) – nhanh hơn PyPDF2 hàng chục lần với
+  file lớn.
+- "pypdf2": PyPDF2 thuần Python – dùng làm dự phòng khi pdfium không mở được file
+  (hoặc chưa cài pypdfium2).
+
+    with open_pdf_text(path) as doc:
+        for i in range(doc.page_count):
+            text = doc.page_text(i)
+    doc.engine / doc.version → ghi vào pdf_profile.json / validation.json
+"""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+ENGINES = ("pdfium", "pypdf2")
+DEFAULT_ENGINE = "pdfium"
+
+
+class PdfExtractError(RuntimeError):
+    """Không engine nào mở được file."""
+
+
+def default_engine() -> str:
+    """PIPELINE_PDF_ENGINE hoặc DEFAULT_ENGINE."""
+    engine = (os.getenv("PIPELINE_PDF_ENGINE") or DEFAULT_ENGINE).strip().lower()
+    if engine not in ENGINES:
+        raise ValueError(f"Invalid PIPELINE_PDF_ENGINE: {engine} (expected one of {ENGINES})")
+    return engine
+
+
+def engine_version(engine: str) -> str:
+    """Phiên bản thư viện của engine (ghi kèm text đã lưu để biết khi nào phải extract lại)."""
+    if engine == "pdfium":
+        import pypdfium2 as pdfium
+        return str(getattr(pdfium, "__version__", None) or getattr(pdfium, "V_PYPDFIUM2", "unknown"))
+    if engine == "pypdf2":
+        from PyPDF2 import __version__
+        return __version__
+    raise ValueError(f"Unknown PDF engine: {engine}")
+
+
+class PdfText:
+    """Tài liệu đã mở; luôn close() (hoặc dùng with)."""
+
+    engine = ""
+
+    @property
+    def version(self) -> str:
+        return engine_version(self.engine)
+
+    @property
+    def page_count(self) -> int:
+        raise NotImplementedError
+
+    def page_text(self, index: int) -> str:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "PdfText":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class PdfiumText(PdfText):
+    engine = "pdfium"
+
+    def __init__(self, path: Path):
+        import pypdfium2 as pdfium
+        self._pdf = pdfium.PdfDocument(str(path))
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pdf)
+
+    def page_text(self, index: int) -> str:
+        page = self._pdf[index]
+        try:
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_range()
+            finally:
+                textpage.close()
+        finally:
+            page.close()
+        return text.replace("\r\n", "\n")
+
+    def close(self) -> None:
+        self._pdf.close()
+
+
+class Pypdf2Text(PdfText):
+    engine = "pypdf2"
+
+    def __init__(self, path: Optional[Path] = None, reader=None):
+        if reader is None:
+            from PyPDF2 import PdfReader
+            reader = PdfReader(str(path))
+        self._reader = reader
+
+    @property
+    def page_count(self) -> int:
+        return len(self._reader.pages)
+
+    def page_text(self, index: int) -> str:
+        return self._reader.pages[index].extract_text() or ""
+
+
+def open_pdf_text(
+    path: Path,
+    engine: Optional[str] = None,
+    pypdf2_reader=None,
+    fallback: bool = True,
+) -> PdfText:
+    """
+    Mở file bằng engine (mặc định: default_engine()). pdfium lỗi / chưa cài → PyPDF2.
+    pypdf2_reader: PdfReader đã mở sẵn (tránh parse lại khi phải fallback).
+    fallback=False: chỉ dùng đúng engine (lỗi thì raise) – vd. worker trích một
+    khoảng trang phải dùng cùng engine với process cha.
+    """
+    engine = engine or default_engine()
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown PDF engine: {engine}")
+
+    if engine == "pdfium" and not fallback:
+        return PdfiumText(path)
+    if engine == "pdfium":
+        try:
+            return PdfiumText(path)
+        except ImportError:
+            print("[PDF][WARN] pypdfium2 not installed, falling back to PyPDF2")
+        except Exception as e:
+            print(f"[PDF][WARN] pdfium cannot open {path}: {e} → PyPDF2")
+
+    try:
+        return Pypdf2Text(path, reader=pypdf2_reader)
+    except Exception as e:
+        raise PdfExtractError(f"Cannot open PDF {path}: {e}") from e
@@ -1,3 +1,4 @@
+import sqlite3
 from pathlib import Path
 from typing import Optional
 
@@ -24,3 +25,63 @@ def find_raw_file(file_hash: str, raw_root: Path) -> Optional[Path]:
                 return path
 
     return None
+
+
+class RawFileResolver:
+    """
+    Tra file raw theo hash cho cả một lượt chạy (thay cho find_raw_file mỗi file).
+
+    - Nạp raw_objects (hash → domain, path) bằng một query vào dict.
+    - Path trong catalog là đường dẫn tuyệt đối lúc ingest; data lake có thể đã được
+      mount ở chỗ khác → thử raw_root/<domain>/<tên file> trước, rồi path gốc.
+    - Hash không có trong catalog (hoặc file đã bị dời): quét 100_raw MỘT lần vào dict
+      stem → path, các lần miss sau chỉ tra dict.
+    """
+
+    def __init__(self, raw_root: Path, catalog: Optional[dict[str, tuple[str, str]]] = None):
+        self.raw_root = raw_root
+        self._catalog = catalog or {}
+        self._scanned: Optional[dict[str, Path]] = None
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection, raw_root: Path) -> "RawFileResolver":
+        try:
+            rows = conn.execute("SELECT hash, domain, path FROM raw_objects").fetchall()
+        except sqlite3.OperationalError as e:
+            # Catalog chưa có bảng (chưa chạy step 0) → chỉ dùng filesystem
+            print(f"[RAW] Catalog unavailable ({e}), falling back to filesystem scan")
+            rows = []
+        catalog = {h: (domain or "", path or "") for h, domain, path in rows}
+        print(f"[RAW] Loaded {len(catalog)} raw objects from catalog")
+        return cls(raw_root, catalog)
+
+    def find(self, file_hash: str) -> Optional[Path]:
+        entry = self._catalog.get(file_hash)
+        if entry is not None:
+            domain, stored = entry
+            stored_path = Path(stored)
+            candidates = []
+            if domain and stored_path.name:
+                candidates.append(self.raw_root / domain / stored_path.name)
+            if stored_path.is_absolute():
+                candidates.append(stored_path)
+            for path in candidates:
+                if path.is_file():
+                    return path
+
+        if self._scanned is None:
+            self._scanned = _scan_raw(self.raw_root)
+        return self._scanned.get(file_hash)
+
+
+def _scan_raw(raw_root: Path) -> dict[str, Path]:
+    """stem → path cho mọi file 100_raw/<domain>/<file> (giống find_raw_file: file đầu tiên thắng)."""
+    found: dict[str, Path] = {}
+    for domain_dir in raw_root.iterdir():
+        if not domain_dir.is_dir():
+            continue
+        for path in domain_dir.iterdir():
+            if path.is_file():
+                found.setdefault(path.stem, path)
+    print(f"[RAW] Scanned {len(found)} files in {raw_root}")
+    return found
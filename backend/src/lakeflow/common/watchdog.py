@@ -0,0 +1,178 @@
+# src/lakeflow/common/watchdog.py
+"""
+Chạy xử lý một file trong process con có giám sát (watchdog).
+
+PDF bệnh lý (xref vòng, ảnh inline khổng lồ...) có thể làm analyze_pdf / extract_text
+treo hoặc ăn hết RAM. run_supervised() fork một process con cho mỗi file; process
+cha kiểm tra định kỳ:
+  - quá timeout giây (wall-clock)          → kill, raise FileTimeoutError
+  - RSS (cả cây process con) quá max_rss_mb → kill, raise FileMemoryError
+  - process con chết không trả kết quả      → raise WorkerCrashedError
+Process con tự tách process group → kill cả các process cháu (vd. pool chia khoảng
+trang của step 2).
+
+Giới hạn = 0 → tắt; cả hai tắt thì gọi fn trực tiếp, không fork.
+RSS đọc từ /proc (Linux); hệ khác chỉ có timeout.
+"""
+
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, TypeVar
+
+from lakeflow.common.parallel import WorkerCrashedError
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+CHECK_INTERVAL = 0.25  # giây giữa hai lần kiểm tra
+
+
+class WatchdogKilledError(RuntimeError):
+    """Process xử lý file bị watchdog kill."""
+    kind = "killed"
+
+
+class FileTimeoutError(WatchdogKilledError):
+    kind = "timeout"
+
+
+class FileMemoryError(WatchdogKilledError):
+    kind = "memory"
+
+
+@dataclass(frozen=True)
+class FileLimits:
+    timeout: float = 0      # giây, 0 = không giới hạn
+    max_rss_mb: int = 0     # MB, 0 = không giới hạn
+
+    @property
+    def enabled(self) -> bool:
+        return self.timeout > 0 or self.max_rss_mb > 0
+
+    @classmethod
+    def from_env(cls) -> "FileLimits":
+        """PIPELINE_FILE_TIMEOUT (giây), PIPELINE_FILE_MAX_RSS_MB."""
+        return cls(
+            timeout=float(os.getenv("PIPELINE_FILE_TIMEOUT") or 0),
+            max_rss_mb=int(os.getenv("PIPELINE_FILE_MAX_RSS_MB") or 0),
+        )
+
+    def describe(self) -> str:
+        parts = []
+        if self.timeout > 0:
+            parts.append(f"timeout {self.timeout:g}s")
+        if self.max_rss_mb > 0:
+            parts.append(f"max RSS {self.max_rss_mb} MB")
+        return ", ".join(parts) or "off"
+
+
+def run_supervised(fn: Callable[[T], R], item: T, limits: FileLimits) -> R:
+    """Gọi fn(item) trong process con theo limits; trả về kết quả hoặc raise."""
+    if not limits.enabled:
+        return fn(item)
+
+    ctx = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+    recv_conn, send_conn = ctx.Pipe(duplex=False)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    proc = ctx.Process(target=_child_main, args=(send_conn, fn, item))
+    proc.start()
+    send_conn.close()
+
+    started = time.monotonic()
+    try:
+        while True:
+            if recv_conn.poll(CHECK_INTERVAL):
+                try:
+                    ok, payload = recv_conn.recv()
+                except EOFError:
+                    # Pipe đóng mà không có kết quả → process con đã chết
+                    proc.join()
+                    raise WorkerCrashedError(f"worker process died (exit code {proc.exitcode})")
+                proc.join()
+                if ok:
+                    return payload
+                raise payload
+
+            elapsed = time.monotonic() - started
+            if limits.timeout > 0 and elapsed > limits.timeout:
+                _kill_tree(proc)
+                raise FileTimeoutError(f"killed after {elapsed:.0f}s (timeout {limits.timeout:g}s)")
+
+            if limits.max_rss_mb > 0:
+                rss_mb = _tree_rss_bytes(proc.pid) / (1024 * 1024)
+                if rss_mb > limits.max_rss_mb:
+                    _kill_tree(proc)
+                    raise FileMemoryError(f"killed at {rss_mb:.0f} MB RSS (limit {limits.max_rss_mb} MB)")
+    finally:
+        recv_conn.close()
+        if proc.is_alive():
+            _kill_tree(proc)
+        proc.join()
+
+
+def _child_main(conn, fn, item) -> None:
+    if hasattr(os, "setpgid"):
+        os.setpgid(0, 0)
+    try:
+        result = (True, fn(item))
+    except BaseException as exc:
+        result = (False, exc)
+    try:
+        conn.send(result)
+    except Exception as exc:
+        # Kết quả / exception không pickle được
+        conn.send((False, RuntimeError(f"{type(exc).__name__}: {exc}")))
+    finally:
+        conn.close()
+
+
+def _kill_tree(proc) -> None:
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+            return
+    except (ProcessLookupError, PermissionError):
+        pass  # chưa kịp setpgid / đã thoát
+    proc.kill()
+
+
+def _tree_rss_bytes(pid: int) -> int:
+    """Tổng VmRSS của pid và mọi process con cháu (Linux /proc); 0 nếu không đọc được."""
+    total = 0
+    stack = [pid]
+    seen: set[int] = set()
+    while stack:
+        current = stack.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        total += _rss_bytes(current)
+        stack.extend(_children(current))
+    return total
+
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status", "rb") as f:
+            for line in f:
+                if line.startswith(b"VmRSS:"):
+                    return int(line.split()[1]) * 1024  # kB
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def _children(pid: int) -> list[int]:
+    children: list[int] = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children", "rb") as f:
+                children.extend(int(c) for c in f.read().split())
+    except (OSError, ValueError):
+        pass
+    return children
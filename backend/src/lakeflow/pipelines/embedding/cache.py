@@ -0,0 +1,295 @@
+# src/lakeflow/pipelines/embedding/cache.py
+"""
+Cache vector embedding theo nội dung chunk (content-addressed).
+
+Chạy lại step 3 (force), đổi chunker, hay ingest bản sửa gần giống của cùng một văn
+bản → phần lớn chunk text đã từng được embed. Cache lưu vector theo khóa
+(model_name, model_revision, sha256(text chuẩn hóa)) trong SQLite riêng
+(500_catalog/embedding_cache.sqlite, vector float32 dạng blob), nên lần sau chỉ encode
+chunk thật sự thay đổi.
+
+- Text chuẩn hóa: Unicode NFC + strip.
+- model_revision: commit HF của snapshot model + backend nếu không phải torch (đổi bản
+  model / backend → khóa mới, không dùng nhầm vector cũ).
+- Giới hạn dung lượng (PIPELINE_EMBED_CACHE_MAX_MB, mặc định 1024): vượt thì xóa các
+  vector lâu không dùng nhất (LRU theo last_used).
+- last_used của các hit được gom trong bộ nhớ, ghi cùng transaction của put_many()
+  (trước khi evict) hoặc khi gom đủ TOUCH_BATCH khóa / close() – đường đọc không
+  commit gì.
+- PIPELINE_EMBED_CACHE=0 → tắt.
+
+Cache chỉ là bản sao: xóa file sqlite bất cứ lúc nào cũng không mất dữ liệu.
+"""
+
+import atexit
+import hashlib
+import os
+import sqlite3
+import time
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from lakeflow.config.paths import catalog_path
+from lakeflow.pipelines.embedding.model_registry import vector_revision
+
+DEFAULT_MAX_MB = 1024
+
+# Ước lượng byte mỗi dòng ngoài blob vector (khóa, index, overhead trang SQLite)
+ROW_OVERHEAD_BYTES = 160
+
+# Giới hạn tham số "?" mỗi câu lệnh (SQLite cũ: 999)
+SQL_BATCH = 500
+
+# Số khóa hit chờ cập nhật last_used tối đa trước khi ghi riêng một transaction
+TOUCH_BATCH = 20_000
+
+
+def cache_db_path() -> Path:
+    return catalog_path() / "embedding_cache.sqlite"
+
+
+def text_key(text: str) -> str:
+    normalized = unicodedata.normalize("NFC", text).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stored: int = 0
+    evicted: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def describe(self) -> str:
+        return (
+            f"{self.hits} hits / {self.hits + self.misses} chunks "
+            f"({self.hit_rate:.1%}), stored {self.stored}, evicted {self.evicted}"
+        )
+
+
+class EmbeddingCache:
+
+    def __init__(self, db_path: Path, max_mb: int = DEFAULT_MAX_MB):
+        self.db_path = Path(db_path)
+        self.max_bytes = max(1, max_mb) * 1024 * 1024
+        self.stats = CacheStats()
+        self._used_bytes: Optional[int] = None
+        # (model_name, model_revision) → khóa hit chưa ghi last_used
+        self._touched: dict[tuple[str, str], set[str]] = {}
+        # Không qua catalog get_connection: lỗi mở file không được rơi về DB catalog dự phòng
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=DELETE;")
+        # Cache mất được → không cần fsync mỗi lần ghi như catalog
+        self._conn.execute("PRAGMA synchronous=NORMAL;")
+        self._init_db()
+
+    def _init_db(self) -> None:
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            model_name TEXT NOT NULL,
+            model_revision TEXT NOT NULL,
+            text_sha256 TEXT NOT NULL,
+            dim INTEGER NOT NULL,
+            vector BLOB NOT NULL,
+            last_used REAL NOT NULL,
+            PRIMARY KEY (model_name, model_revision, text_sha256)
+        )
+        """)
+        self._conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used
+        ON embedding_cache(last_used)
+        """)
+
+    # -------------------------
+    # Đọc / ghi
+    # -------------------------
+    def get_many(self, model_name: str, texts: Sequence[str]) -> list[Optional[np.ndarray]]:
+        """Vector cache cho từng text (None = miss); last_used của các hit ghi sau."""
+        revision = vector_revision(model_name)
+        keys = [text_key(t) for t in texts]
+        found: dict[str, np.ndarray] = {}
+
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), SQL_BATCH):
+            part = unique[start:start + SQL_BATCH]
+            marks = ",".join("?" * len(part))
+            rows = self._conn.execute(
+                f"""
+                SELECT text_sha256, vector FROM embedding_cache
+                WHERE model_name = ? AND model_revision = ? AND text_sha256 IN ({marks})
+                """,
+                (model_name, revision, *part),
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype="float32")
+
+        if found:
+            self._touched.setdefault((model_name, revision), set()).update(found)
+            if sum(len(k) for k in self._touched.values()) >= TOUCH_BATCH:
+                self.flush_touched()
+
+        result = [found.get(k) for k in keys]
+        hits = sum(v is not None for v in result)
+        self.stats.hits += hits
+        self.stats.misses += len(result) - hits
+        return result
+
+    def put_many(self, model_name: str, texts: Sequence[str], vectors: np.ndarray) -> None:
+        if not len(texts):
+            return
+        revision = vector_revision(model_name)
+        now = time.time()
+        rows = [
+            (
+                model_name,
+                revision,
+                text_key(text),
+                int(vector.shape[0]),
+                np.ascontiguousarray(vector, dtype="float32").tobytes(),
+                now,
+            )
+            for text, vector in zip(texts, vectors)
+        ]
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                """
+                INSERT OR REPLACE INTO embedding_cache
+                    (model_name, model_revision, text_sha256, dim, vector, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            self._apply_touched(now)
+            self._evict(sum(len(r[4]) + ROW_OVERHEAD_BYTES for r in rows))
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._touched.clear()
+        self.stats.stored += len(rows)
+
+    def flush_touched(self) -> None:
+        """Ghi last_used của các hit đang gom (một transaction)."""
+        if not self._touched:
+            return
+        self._conn.execute("BEGIN")
+        try:
+            self._apply_touched(time.time())
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._touched.clear()
+
+    def _apply_touched(self, now: float) -> None:
+        for (model_name, revision), keys in self._touched.items():
+            keys = list(keys)
+            for start in range(0, len(keys), SQL_BATCH):
+                part = keys[start:start + SQL_BATCH]
+                self._conn.execute(
+                    f"""
+                    UPDATE embedding_cache SET last_used = ?
+                    WHERE model_name = ? AND model_revision = ?
+                      AND text_sha256 IN ({",".join("?" * len(part))})
+                    """,
+                    (now, model_name, revision, *part),
+                )
+
+    def _evict(self, added_bytes: int) -> None:
+        """Xóa vector ít dùng gần đây nhất khi tổng dung lượng vượt max_bytes."""
+        if self._used_bytes is None:
+            self._used_bytes = self._measure()
+        else:
+            # INSERT OR REPLACE trùng khóa → hơi dư, được đo lại khi evict
+            self._used_bytes += added_bytes
+        if self._used_bytes <= self.max_bytes:
+            return
+
+        count = self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        if not count:
+            return
+        row_bytes = self._used_bytes / count
+        # Xóa thêm 10% để không phải evict ở mỗi lần ghi sau đó
+        excess = int((self._used_bytes - self.max_bytes * 0.9) / row_bytes) + 1
+        cur = self._conn.execute(
+            """
+            DELETE FROM embedding_cache WHERE rowid IN (
+                SELECT rowid FROM embedding_cache ORDER BY last_used LIMIT ?
+            )
+            """,
+            (excess,),
+        )
+        self.stats.evicted += cur.rowcount
+        self._used_bytes = self._measure()
+
+    def _measure(self) -> int:
+        """Dung lượng ước lượng: 4 byte mỗi chiều vector + overhead mỗi dòng."""
+        count, dims = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(dim), 0) FROM embedding_cache"
+        ).fetchone()
+        return dims * 4 + count * ROW_OVERHEAD_BYTES
+
+    def close(self) -> None:
+        try:
+            self.flush_touched()
+        finally:
+            self._conn.close()
+
+
+def encode_with_cache(
+    model,
+    model_name: str,
+    texts: Sequence[str],
+    cache: Optional[EmbeddingCache],
+    **encode_kwargs,
+) -> np.ndarray:
+    """
+    model.encode(texts, normalize_embeddings=True) nhưng chỉ cho các text chưa có trong
+    cache; ghép lại theo đúng thứ tự texts.
+    """
+    if cache is None:
+        return model.encode(list(texts), normalize_embeddings=True, **encode_kwargs).astype("float32")
+
+    cached = cache.get_many(model_name, texts)
+    missing = [i for i, v in enumerate(cached) if v is None]
+    if missing:
+        fresh = model.encode(
+            [texts[i] for i in missing], normalize_embeddings=True, **encode_kwargs
+        ).astype("float32")
+        cache.put_many(model_name, [texts[i] for i in missing], fresh)
+        for i, vector in zip(missing, fresh):
+            cached[i] = vector
+    return np.stack(cached).astype("float32")
+
+
+_default_cache: Optional[EmbeddingCache] = None
+
+
+def default_cache() -> Optional[EmbeddingCache]:
+    """Cache dùng chung mỗi process (step 3) theo env (None nếu PIPELINE_EMBED_CACHE=0 hoặc không mở được)."""
+    global _default_cache
+    if os.getenv("PIPELINE_EMBED_CACHE", "1") == "0":
+        return None
+    if _default_cache is None:
+        try:
+            _default_cache = EmbeddingCache(
+                cache_db_path(),
+                max_mb=int(os.getenv("PIPELINE_EMBED_CACHE_MAX_MB") or DEFAULT_MAX_MB),
+            )
+        except (sqlite3.Error, OSError) as e:
+            print(f"[400][WARN] Embedding cache disabled: {e}")
+            return None
+        # Ghi last_used còn đang gom khi process kết thúc
+        atexit.register(_default_cache.close)
+    return _default_cache
@@ -0,0 +1,185 @@
+# src/lakeflow/pipelines/embedding/encode_pool.py
+"""
+Pool nhiều process encode embedding trên CPU (step 3).
+
+Một lần model.encode trên PyTorch CPU không tận dụng được nhiều core (tokenize + GIL,
+intra-op của torch kém hiệu quả khi nhiều thread). EncodePool chia máy thành các nhóm
+core: mỗi worker giữ một model riêng (load + warm-up một lần), bị ghim vào nhóm core
+của nó (sched_setaffinity) với torch.set_num_threads = số core trong nhóm, và lấy
+batch chunk từ hàng đợi chung của pool.
+
+- Process tạo bằng "spawn" (torch không an toàn sau fork), sống suốt lượt chạy.
+- Worker chết (OOM...) → pool được tạo lại; batch đang chạy báo WorkerCrashedError
+  (scheduler encode lại riêng từng file của batch đó).
+- report(): throughput và mức bận (thời gian encode / thời gian chạy) từng worker.
+
+Cấu hình (env):
+  PIPELINE_EMBED_WORKERS   số worker (mặc định 1 = encode trong process chính; auto = số CPU / threads)
+  PIPELINE_EMBED_THREADS   số thread torch mỗi worker (mặc định số CPU / số worker)
+"""
+
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing import get_context
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+
+from lakeflow.common.parallel import WorkerCrashedError
+
+
+@dataclass
+class WorkerStats:
+    worker: int
+    cpus: str
+    batches: int = 0
+    chunks: int = 0
+    busy_seconds: float = 0.0
+
+
+# ---------- Trong process worker ----------
+_worker_model = None
+_worker_slot = -1
+_worker_cpus = ""
+
+
+def _available_cpus() -> list[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _init_worker(model_name: str, threads: int, counter) -> None:
+    global _worker_model, _worker_slot, _worker_cpus
+
+    with counter.get_lock():
+        _worker_slot = counter.value
+        counter.value += 1
+
+    # Nhóm core thứ slot (quay vòng khi pool được tạo lại sau crash)
+    cpus = _available_cpus()
+    groups = max(1, len(cpus) // threads)
+    start = (_worker_slot % groups) * threads
+    group = cpus[start:start + threads] or cpus
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, group)
+    _worker_cpus = f"{group[0]}-{group[-1]}" if len(group) > 1 else str(group[0])
+
+    # Trước khi import torch: OpenMP / tokenizers không tự mở thêm thread
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    import torch
+
+    torch.set_num_threads(threads)
+
+    from lakeflow.pipelines.embedding.model_registry import get_model
+
+    _worker_model = get_model(model_name, device="cpu")
+
+
+def _encode_batch(texts: list[str]) -> tuple[np.ndarray, int, str, float]:
+    started = time.perf_counter()
+    vectors = _worker_model.encode(
+        texts,
+        batch_size=len(texts),
+        show_progress_bar=False,
+        normalize_embeddings=True,
+    ).astype("float32")
+    return vectors, _worker_slot, _worker_cpus, time.perf_counter() - started
+
+
+# ---------- Trong process chính ----------
+class EncodePool:
+
+    def __init__(self, model_name: str, workers: int, threads_per_worker: int):
+        self.model_name = model_name
+        self.workers = max(1, workers)
+        self.threads = max(1, threads_per_worker)
+        self._ctx = get_context("spawn")
+        self._counter = self._ctx.Value("i", 0)
+        self._pool = self._new_pool()
+        self._started: Optional[float] = None  # từ batch đầu tiên (gồm cả load model ở worker)
+        self._stats: dict[int, WorkerStats] = {}
+        print(f"[400] Encode pool: {self.workers} workers x {self.threads} threads (CPU)")
+
+    @classmethod
+    def from_env(cls, model_name: str) -> Optional["EncodePool"]:
+        """None khi PIPELINE_EMBED_WORKERS ≤ 1 (encode ngay trong process chính)."""
+        cpus = len(_available_cpus())
+        value = (os.getenv("PIPELINE_EMBED_WORKERS") or "1").strip().lower()
+        threads = os.getenv("PIPELINE_EMBED_THREADS")
+        if value in ("auto", "0"):
+            per_worker = int(threads) if threads else max(1, min(4, cpus))
+            workers = max(1, cpus // per_worker)
+        else:
+            workers = max(1, int(value))
+            per_worker = int(threads) if threads else max(1, cpus // workers)
+        if workers <= 1:
+            return None
+        return cls(model_name, workers, per_worker)
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=self._ctx,
+            initializer=_init_worker,
+            initargs=(self.model_name, self.threads, self._counter),
+        )
+
+    def encode(
+        self, batches: Sequence[list[str]]
+    ) -> Iterator[tuple[int, Optional[np.ndarray], Optional[BaseException]]]:
+        """Yield (index batch, vectors, lỗi) theo thứ tự hoàn thành."""
+        if self._started is None:
+            self._started = time.monotonic()
+        futures: dict[Future, int] = {}
+        broken = False
+        for index, texts in enumerate(batches):
+            try:
+                futures[self._pool.submit(_encode_batch, texts)] = index
+            except BrokenProcessPool:
+                broken = True
+                yield index, None, WorkerCrashedError("encode pool broken")
+
+        for fut in as_completed(futures):
+            index = futures[fut]
+            try:
+                vectors, slot, cpus, seconds = fut.result()
+            except BrokenProcessPool:
+                broken = True
+                yield index, None, WorkerCrashedError("encode worker process died")
+                continue
+            except Exception as exc:
+                yield index, None, exc
+                continue
+            stats = self._stats.setdefault(slot, WorkerStats(worker=slot, cpus=cpus))
+            stats.batches += 1
+            stats.chunks += len(batches[index])
+            stats.busy_seconds += seconds
+            yield index, vectors, None
+
+        if broken:
+            print("[400][WARN] Encode worker died, restarting pool")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = self._new_pool()
+
+    def report(self) -> list[str]:
+        wall = max(time.monotonic() - (self._started or time.monotonic()), 1e-9)
+        total = sum(s.chunks for s in self._stats.values())
+        lines = [
+            f"Encode pool    : {self.workers} workers x {self.threads} threads, "
+            f"{total} chunks in {wall:.1f}s ({total / wall:.1f} chunks/s)"
+        ]
+        for s in sorted(self._stats.values(), key=lambda s: s.worker):
+            lines.append(
+                f"  worker {s.worker} (cpu {s.cpus}): {s.chunks} chunks / {s.batches} batches, "
+                f"busy {s.busy_seconds:.1f}s ({s.busy_seconds / wall:.0%})"
+            )
+        return lines
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,171 @@
+# src/lakeflow/pipelines/embedding/model_registry.py
+"""
+Registry model embedding: mỗi (model_name, device) chỉ load một lần mỗi process.
+
+Load SentenceTransformer mất vài giây trên CPU; step 3 trước đây load lại cho từng
+file. get_model() load lần đầu, chạy một batch warm-up (khởi tạo kernel / cache của
+backend) rồi trả cùng một instance cho mọi lần gọi sau. Backend (torch / onnx /
+onnx-int8, xem onnx_backend.py) theo LAKEFLOW_EMBEDDING_BACKEND. model_stats() trả thời gian
+load / warm-up và số lần dùng lại (API: GET /system/embedding-models).
+
+Thread-safe (API gọi từ threadpool của FastAPI).
+"""
+
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+WARMUP_TEXTS = ["warm-up"]
+
+
+@dataclass
+class ModelLoadStats:
+    model_name: str
+    device: str
+    backend: str
+    load_seconds: float
+    warmup_seconds: float
+    dimension: Optional[int]
+    loaded_at: str
+    reuses: int = 0
+
+
+_models: dict[tuple[str, str, str], object] = {}
+_stats: dict[tuple[str, str, str], ModelLoadStats] = {}
+_revisions: dict[str, str] = {}
+_lock = threading.Lock()
+
+
+def default_backend() -> str:
+    from lakeflow.pipelines.embedding.onnx_backend import default_backend as _backend
+
+    return _backend()
+
+
+def default_device() -> Optional[str]:
+    """LAKEFLOW_EMBEDDING_DEVICE (cpu / cuda / mps...); None = sentence-transformers tự chọn."""
+    return os.getenv("LAKEFLOW_EMBEDDING_DEVICE") or None
+
+
+def get_model(
+    model_name: str = DEFAULT_MODEL_NAME,
+    device: Optional[str] = None,
+    backend: Optional[str] = None,
+    fallback: bool = True,
+):
+    """
+    Model dùng chung cho (model_name, device, backend); có encode() như SentenceTransformer.
+    Model không export được sang ONNX (UnsupportedModelError) → cảnh báo và dùng torch
+    trên CPU; fallback=False thì raise.
+    """
+    backend = backend or default_backend()
+    device = "cpu" if backend != "torch" else (device or default_device())
+    key = (model_name, device or "auto", backend)
+
+    with _lock:
+        model = _models.get(key)
+        if model is not None:
+            _stats[key].reuses += 1
+            return model
+
+        started = time.perf_counter()
+        if backend == "torch":
+            from sentence_transformers import SentenceTransformer
+
+            model = SentenceTransformer(model_name, device=device)
+        else:
+            from lakeflow.pipelines.embedding.onnx_backend import (
+                UnsupportedModelError,
+                load_onnx_model,
+            )
+
+            try:
+                model = load_onnx_model(model_name, model_revision(model_name), quantize=backend == "onnx-int8")
+            except UnsupportedModelError as exc:
+                if not fallback:
+                    raise
+                print(f"[MODEL][WARN] {exc}; falling back to torch for {model_name}")
+                from sentence_transformers import SentenceTransformer
+
+                model = SentenceTransformer(model_name, device=device)
+                backend = "torch"
+        load_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        model.encode(WARMUP_TEXTS, normalize_embeddings=True)
+        warmup_seconds = time.perf_counter() - started
+
+        _models[key] = model
+        _stats[key] = ModelLoadStats(
+            model_name=model_name,
+            device=str(model.device),
+            backend=backend,
+            load_seconds=round(load_seconds, 3),
+            warmup_seconds=round(warmup_seconds, 3),
+            dimension=model.get_sentence_embedding_dimension(),
+            loaded_at=datetime.utcnow().isoformat(),
+        )
+        print(
+            f"[MODEL] Loaded {model_name} ({backend}) on {model.device} "
+            f"in {load_seconds:.2f}s (warm-up {warmup_seconds:.2f}s)"
+        )
+        return model
+
+
+def model_stats() -> list[dict]:
+    with _lock:
+        return [asdict(s) for s in _stats.values()]
+
+
+def model_revision(model_name: str = DEFAULT_MODEL_NAME) -> str:
+    """
+    Phiên bản model (khóa cache embedding, thư mục export ONNX): commit HF của snapshot
+    trong cache local (không gọi mạng, không cần load model); thư mục local → mtime
+    config.json. Chưa có trong cache → tải riêng config.json để biết commit.
+    """
+    revision = _revisions.get(model_name)
+    if revision:
+        return revision
+
+    local = Path(model_name)
+    if local.is_dir():
+        config = local / "config.json"
+        revision = f"local-{config.stat().st_mtime_ns}" if config.exists() else "local"
+    else:
+        revision = _hub_snapshot_revision(model_name) or _download_revision(model_name) or "unknown"
+
+    _revisions[model_name] = revision
+    return revision
+
+
+def _hub_snapshot_revision(model_name: str) -> Optional[str]:
+    try:
+        from huggingface_hub import try_to_load_from_cache
+
+        cached = try_to_load_from_cache(model_name, "config.json")
+    except Exception:
+        return None
+    # .../models--org--name/snapshots/<commit>/config.json
+    return Path(cached).parent.name if isinstance(cached, str) else None
+
+
+def _download_revision(model_name: str) -> Optional[str]:
+    try:
+        from huggingface_hub import snapshot_download
+
+        return Path(snapshot_download(model_name, allow_patterns=["config.json"])).name
+    except Exception:
+        return None
+
+
+def vector_revision(model_name: str = DEFAULT_MODEL_NAME) -> str:
+    """Khóa phiên bản của vector: model_revision + backend (vector int8 khác vector torch)."""
+    backend = default_backend()
+    revision = model_revision(model_name)
+    return revision if backend == "torch" else f"{revision}+{backend}"
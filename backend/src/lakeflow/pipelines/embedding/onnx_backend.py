@@ -0,0 +1,303 @@
+# src/lakeflow/pipelines/embedding/onnx_backend.py
+"""
+Backend embedding ONNX Runtime (tùy chọn int8) thay cho PyTorch trên CPU.
+
+- Export transformer của sentence-transformer (vd. all-MiniLM-L6-v2) sang ONNX một lần,
+  cache ở 500_catalog/onnx_models/<model>/<commit>/ (model.onnx, model.int8.onnx nếu
+  quantize, tokenizer, export.json).
+- int8: onnxruntime.quantization.quantize_dynamic (trọng số int8, activation lượng tử
+  động).
+- encode(): mean pooling theo attention_mask + chuẩn hóa L2, giống pipeline
+  Transformer → Pooling(mean) → Normalize của sentence-transformers với
+  normalize_embeddings=True.
+- Export giữ flock trên <cache>/.export.lock: worker encode pool khởi động cùng lúc
+  chờ process export đầu tiên rồi dùng lại kết quả. Tokenizer được lưu trước khi
+  model.onnx xuất hiện; export.json (parity đạt) ghi sau cùng → chỉ thư mục đủ file
+  mới được dùng mà không cần lock.
+- Export xong chạy parity_check() với vector PyTorch (cosine ≥ ngưỡng); không đạt →
+  lỗi, không dùng model đã export.
+
+Chọn theo process: LAKEFLOW_EMBEDDING_BACKEND = torch (mặc định) | onnx | onnx-int8
+(model_registry.get_model dùng backend này).
+"""
+
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from lakeflow.config.paths import catalog_path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_BACKEND = "torch"
+
+ONNX_OPSET = 14
+DEFAULT_ENCODE_BATCH = 32
+
+# Cosine tối thiểu giữa vector ONNX và PyTorch cho từng câu mẫu
+PARITY_TOLERANCE = {"onnx": 0.9999, "onnx-int8": 0.98}
+
+PARITY_TEXTS = [
+    "Quy chế đào tạo trình độ đại học theo hệ thống tín chỉ.",
+    "Sinh viên được xét tốt nghiệp khi tích lũy đủ số tín chỉ của chương trình.",
+    "The university library opens from 7:30 to 21:00 on weekdays.",
+    "Học phí",
+    "Điều 12. Đánh giá kết quả học tập theo học kỳ, năm học " * 20,
+]
+
+
+class ParityError(RuntimeError):
+    """Vector ONNX lệch khỏi vector PyTorch quá ngưỡng."""
+
+
+class UnsupportedModelError(ValueError):
+    """Kiến trúc model không export được sang ONNX backend (dùng torch)."""
+
+
+def default_backend() -> str:
+    """LAKEFLOW_EMBEDDING_BACKEND hoặc DEFAULT_BACKEND."""
+    backend = (os.getenv("LAKEFLOW_EMBEDDING_BACKEND") or DEFAULT_BACKEND).strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid LAKEFLOW_EMBEDDING_BACKEND: {backend} (expected one of {BACKENDS})")
+    return backend
+
+
+def onnx_cache_dir(model_name: str, revision: str) -> Path:
+    safe_name = re.sub(r"[^A-Za-z0-9._-]+", "--", model_name.strip("/"))
+    return catalog_path() / "onnx_models" / safe_name / revision
+
+
+# ---------- Export ----------
+def export_onnx(model_name: str, revision: str, quantize: bool) -> Path:
+    """Export (nếu chưa có trong cache) và trả thư mục chứa model + export.json."""
+    out_dir = onnx_cache_dir(model_name, revision)
+    onnx_file = out_dir / ("model.int8.onnx" if quantize else "model.onnx")
+    if _export_ready(out_dir, onnx_file):
+        return out_dir
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with (out_dir / ".export.lock").open("a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        # Process khác có thể vừa export xong trong lúc chờ lock
+        if _export_ready(out_dir, onnx_file):
+            return out_dir
+        return _export_locked(model_name, revision, out_dir, onnx_file, quantize)
+
+
+def _export_ready(out_dir: Path, onnx_file: Path) -> bool:
+    manifest = _read_manifest(out_dir)
+    return onnx_file.exists() and bool(
+        manifest.get("parity", {}).get(onnx_file.name, {}).get("passed")
+    )
+
+
+def _export_locked(
+    model_name: str, revision: str, out_dir: Path, onnx_file: Path, quantize: bool
+) -> Path:
+    from sentence_transformers import SentenceTransformer
+
+    manifest = _read_manifest(out_dir)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    _check_supported(st_model)
+
+    # Tokenizer trước model.onnx (cũng sửa cache cũ có model mà thiếu tokenizer)
+    if not (out_dir / "tokenizer_config.json").exists():
+        st_model.tokenizer.save_pretrained(str(out_dir))
+
+    fp32_file = out_dir / "model.onnx"
+    if not fp32_file.exists():
+        started = time.perf_counter()
+        _export_transformer(st_model, fp32_file)
+        print(f"[ONNX] Exported {model_name} → {fp32_file} in {time.perf_counter() - started:.1f}s")
+    manifest.update(
+        {
+            "model_name": model_name,
+            "revision": revision,
+            "opset": ONNX_OPSET,
+            "max_seq_length": int(st_model.max_seq_length),
+            "dimension": st_model.get_sentence_embedding_dimension(),
+        }
+    )
+
+    if quantize and not onnx_file.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        tmp_file = onnx_file.with_suffix(f".onnx.{os.getpid()}.tmp")
+        quantize_dynamic(str(fp32_file), str(tmp_file), weight_type=QuantType.QInt8)
+        os.replace(tmp_file, onnx_file)
+        print(f"[ONNX] Quantized (dynamic int8) → {onnx_file}")
+
+    # Parity với chính model PyTorch vừa load
+    backend = "onnx-int8" if quantize else "onnx"
+    onnx_model = OnnxEmbeddingModel(out_dir, quantized=quantize, manifest=manifest)
+    report = parity_check(onnx_model, st_model, tolerance=PARITY_TOLERANCE[backend])
+    manifest.setdefault("parity", {})[onnx_file.name] = report
+    _write_manifest(out_dir, manifest)
+    if not report["passed"]:
+        raise ParityError(
+            f"{backend} parity failed for {model_name}: min cosine {report['min_cosine']:.5f} "
+            f"< {report['tolerance']}"
+        )
+    print(f"[ONNX] Parity OK ({backend}): min cosine {report['min_cosine']:.5f}")
+    return out_dir
+
+
+def _check_supported(st_model) -> None:
+    """Chỉ hỗ trợ Transformer → Pooling(mean) [→ Normalize]."""
+    modules = [type(m).__name__ for m in st_model]
+    if modules[:2] != ["Transformer", "Pooling"] or any(m != "Normalize" for m in modules[2:]):
+        raise UnsupportedModelError(f"ONNX backend does not support module layout {modules}")
+    pooling = st_model[1].get_pooling_mode_str()
+    if pooling != "mean":
+        raise UnsupportedModelError(f"ONNX backend only supports mean pooling (model uses {pooling})")
+
+
+def _export_transformer(st_model, onnx_file: Path) -> None:
+    import torch
+
+    transformer = st_model[0].auto_model.eval()
+    sample = st_model.tokenizer(["warm-up"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic_axes = {n: {0: "batch", 1: "sequence"} for n in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    tmp_file = onnx_file.with_suffix(f".onnx.{os.getpid()}.tmp")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[n] for n in input_names),
+            str(tmp_file),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=ONNX_OPSET,
+            do_constant_folding=True,
+        )
+    os.replace(tmp_file, onnx_file)
+
+
+def _read_manifest(out_dir: Path) -> dict:
+    path = out_dir / "export.json"
+    if not path.exists():
+        return {}
+    with path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(out_dir: Path, manifest: dict) -> None:
+    tmp = out_dir / f"export.json.{os.getpid()}.tmp"
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, out_dir / "export.json")
+
+
+# ---------- Inference ----------
+class OnnxEmbeddingModel:
+    """
+    Thay thế SentenceTransformer cho phần encode() mà pipeline / API dùng.
+    """
+
+    device = "cpu"
+
+    def __init__(self, model_dir: Path, quantized: bool, manifest: Optional[dict] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        manifest = manifest or _read_manifest(model_dir)
+        self.model_name = manifest.get("model_name", str(model_dir))
+        self.max_seq_length = int(manifest.get("max_seq_length") or 256)
+        self._dimension = manifest.get("dimension")
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir), use_fast=True)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Worker của encode pool đặt OMP_NUM_THREADS = số core của nhóm
+        threads = int(os.getenv("OMP_NUM_THREADS") or 0)
+        if threads > 0:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        onnx_file = model_dir / ("model.int8.onnx" if quantized else "model.onnx")
+        self.session = ort.InferenceSession(str(onnx_file), options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> Optional[int]:
+        return self._dimension
+
+    def encode(
+        self,
+        sentences: Union[str, Sequence[str]],
+        batch_size: int = DEFAULT_ENCODE_BATCH,
+        show_progress_bar: bool = False,
+        normalize_embeddings: bool = False,
+        **_kwargs,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self._dimension or 0), dtype="float32")
+
+        # Như sentence-transformers: batch theo độ dài để ít padding, trả đúng thứ tự
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        out: list[Optional[np.ndarray]] = [None] * len(texts)
+        for start in range(0, len(texts), max(1, batch_size)):
+            idx = order[start:start + batch_size]
+            vectors = self._encode_batch([texts[i] for i in idx], normalize_embeddings)
+            for i, vector in zip(idx, vectors):
+                out[i] = vector
+
+        result = np.stack(out).astype("float32")
+        return result[0] if single else result
+
+    def _encode_batch(self, texts: list[str], normalize: bool) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np",
+        )
+        feeds = {k: v.astype("int64") for k, v in encoded.items() if k in self._input_names}
+        hidden = self.session.run(["last_hidden_state"], feeds)[0]
+
+        mask = encoded["attention_mask"][..., None].astype("float32")
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+
+def load_onnx_model(model_name: str, revision: str, quantize: bool) -> OnnxEmbeddingModel:
+    model_dir = export_onnx(model_name, revision, quantize)
+    return OnnxEmbeddingModel(model_dir, quantized=quantize)
+
+
+# ---------- Parity ----------
+def parity_check(
+    onnx_model,
+    torch_model,
+    texts: Optional[Sequence[str]] = None,
+    tolerance: float = PARITY_TOLERANCE["onnx"],
+) -> dict:
+    """Cosine giữa vector ONNX và PyTorch (cả hai normalize) cho từng câu mẫu."""
+    texts = list(texts or PARITY_TEXTS)
+    expected = torch_model.encode(texts, normalize_embeddings=True).astype("float32")
+    actual = onnx_model.encode(texts, normalize_embeddings=True)
+    cosines = (expected * actual).sum(axis=1)
+    min_cosine = float(cosines.min())
+    return {
+        "texts": len(texts),
+        "min_cosine": round(min_cosine, 6),
+        "mean_cosine": round(float(cosines.mean()), 6),
+        "tolerance": tolerance,
+        "passed": min_cosine >= tolerance,
+    }
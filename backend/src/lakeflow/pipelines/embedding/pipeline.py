@@ -2,16 +2,15 @@ from pathlib import Path
 from typing import Literal, Optional
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
 from lakeflow.common.jsonio import write_json
 from lakeflow.common.nas_io import nas_safe_mkdir, nas_safe_read_json
+from lakeflow.pipelines.embedding.cache import default_cache, encode_with_cache
+from lakeflow.pipelines.embedding.model_registry import DEFAULT_MODEL_NAME, get_model
 
 
 EmbeddingStatus = Literal["EMBEDDED", "SKIPPED"]
 
-DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-
 
 def run_embedding_pipeline(
     file_hash: str,
@@ -20,10 +19,12 @@ def run_embedding_pipeline(
     model_name: str = DEFAULT_MODEL_NAME,
     force: bool = False,
     parent_dir: Optional[str] = None,
+    use_cache: bool = True,
 ) -> EmbeddingStatus:
     """
     parent_dir: thư mục cha (domain) — output sẽ là 400_embeddings/<parent_dir>/<file_hash>/
     Nếu không truyền: 400_embeddings/<file_hash>/ (giữ tương thích).
+    use_cache: lấy vector chunk đã embed từ cache (cache.py), chỉ encode chunk mới.
     """
 
     # =====================================================
@@ -54,17 +55,16 @@ def run_embedding_pipeline(
         return "SKIPPED"
 
     # =====================================================
-    # 3. Load model & embed
+    # 3. Model (load một lần mỗi process) & embed (qua cache)
     # =====================================================
-    print(f"[400] Loading model: {model_name}")
-    model = SentenceTransformer(model_name)
+    model = get_model(model_name)
+    cache = default_cache() if use_cache else None
+    hits_before = cache.stats.hits if cache else 0
 
     print(f"[400] Embedding {len(texts)} chunks for {file_hash}")
-    vectors = model.encode(
-        texts,
-        show_progress_bar=True,
-        normalize_embeddings=True,
-    ).astype("float32")
+    vectors = encode_with_cache(model, model_name, texts, cache, show_progress_bar=True)
+    if cache:
+        print(f"[400] Cache hits: {cache.stats.hits - hits_before}/{len(texts)}")
 
     chunks_meta = [
         {
@@ -0,0 +1,265 @@
+# src/lakeflow/pipelines/embedding/scheduler.py
+"""
+Embedding nhiều file theo micro-batch chung (thay cho một lần model.encode mỗi file).
+
+Nhiều file nhỏ → nhiều forward pass nhỏ, GPU/CPU không đầy. Scheduler:
+  1. Đọc chunks.json của một cửa sổ file (tới khi đủ window_chunks chunk → RAM có giới hạn).
+  2. Gom mọi chunk của cửa sổ, sort theo độ dài (ít padding), cắt batch batch_size.
+  3. Encode từng batch (trong process này hoặc qua EncodePool nhiều process), rải
+     vector về đúng file / vị trí.
+  4. File nào đủ vector thì ghi ngay: chunks_meta.json rồi embedding.npy, mỗi file qua
+     file tạm + os.replace (embedding.npy là dấu hoàn tất – có nó thì lần sau bỏ qua).
+
+Chunk đã có trong cache embedding (cache.py) được lấy từ cache, không encode lại.
+
+Output giống hệt run_embedding_pipeline (cùng thứ tự vector, cùng chunks_meta.json).
+Batch encode lỗi → encode lại riêng từng file của batch (mọi file cùng lúc); file nào
+lần này vẫn làm worker chết mới được encode một mình. Chỉ file lỗi báo FAILED.
+"""
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Literal, Optional
+
+import numpy as np
+
+from lakeflow.common.jsonio import write_json
+from lakeflow.common.nas_io import nas_safe_mkdir, nas_safe_read_json
+from lakeflow.common.parallel import WorkerCrashedError
+from lakeflow.pipelines.embedding.cache import EmbeddingCache, default_cache
+from lakeflow.pipelines.embedding.encode_pool import EncodePool
+from lakeflow.pipelines.embedding.model_registry import DEFAULT_MODEL_NAME, get_model
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_WINDOW_CHUNKS = 4096
+
+FileStatus = Literal["EMBEDDED", "SKIPPED", "FAILED"]
+
+
+@dataclass(frozen=True)
+class EmbeddingJob:
+    file_hash: str
+    processed_dir: Path
+    out_dir: Path
+
+
+@dataclass
+class EmbeddingResult:
+    job: EmbeddingJob
+    status: FileStatus
+    error: Optional[BaseException] = None
+
+
+@dataclass
+class _PendingFile:
+    job: EmbeddingJob
+    texts: list[str]
+    chunks_meta: list[dict]
+    todo: list[int]  # index chunk chưa có vector (cache miss)
+    vectors: Optional[np.ndarray] = None
+    remaining: int = 0
+    failed: Optional[BaseException] = None
+
+
+class EmbeddingScheduler:
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        window_chunks: int = DEFAULT_WINDOW_CHUNKS,
+        force: bool = False,
+        cache: Optional[EmbeddingCache] = None,
+        pool: Optional[EncodePool] = None,
+    ):
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.window_chunks = max(self.batch_size, window_chunks)
+        self.force = force
+        self.cache = cache
+        self.pool = pool
+
+    @classmethod
+    def from_env(cls, force: bool = False) -> "EmbeddingScheduler":
+        """PIPELINE_EMBED_BATCH, PIPELINE_EMBED_WINDOW_CHUNKS, PIPELINE_EMBED_WORKERS (encode_pool.py)."""
+        return cls(
+            batch_size=int(os.getenv("PIPELINE_EMBED_BATCH") or DEFAULT_BATCH_SIZE),
+            window_chunks=int(os.getenv("PIPELINE_EMBED_WINDOW_CHUNKS") or DEFAULT_WINDOW_CHUNKS),
+            force=force,
+            cache=default_cache(),
+            pool=EncodePool.from_env(DEFAULT_MODEL_NAME),
+        )
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+        if self.cache is not None:
+            self.cache.flush_touched()
+
+    def run(self, jobs: Iterable[EmbeddingJob]) -> Iterator[EmbeddingResult]:
+        """Yield kết quả từng file (SKIPPED ngay khi đọc, EMBEDDED/FAILED khi xong cửa sổ)."""
+        window: list[_PendingFile] = []
+        window_size = 0
+
+        for job in jobs:
+            if (job.out_dir / "embedding.npy").exists() and not self.force:
+                yield EmbeddingResult(job, "SKIPPED")
+                continue
+            try:
+                pending = self._load(job)
+            except Exception as exc:
+                yield EmbeddingResult(job, "FAILED", exc)
+                continue
+            if pending is None:
+                print(f"[400] No valid text chunks for {job.file_hash}, skip")
+                yield EmbeddingResult(job, "SKIPPED")
+                continue
+
+            if not pending.todo:
+                yield self._complete(pending)  # mọi chunk đều có trong cache
+                continue
+
+            window.append(pending)
+            window_size += len(pending.todo)
+            if window_size >= self.window_chunks:
+                yield from self._flush(window)
+                window, window_size = [], 0
+
+        if window:
+            yield from self._flush(window)
+
+    # -------------------------
+    # Nội bộ
+    # -------------------------
+    def _load(self, job: EmbeddingJob) -> Optional[_PendingFile]:
+        chunks_file = job.processed_dir / "chunks.json"
+        if not chunks_file.exists():
+            raise RuntimeError(f"Missing chunks.json for {job.file_hash}")
+        chunks = nas_safe_read_json(chunks_file)
+        texts = [c["text"].strip() for c in chunks if c.get("text")]
+        if not texts:
+            return None
+        chunks_meta = [
+            {
+                "chunk_id": c.get("chunk_id"),
+                "section_id": c.get("section_id"),
+                "file_hash": job.file_hash,
+                "token_estimate": c.get("token_estimate"),
+            }
+            for c in chunks
+        ]
+        pending = _PendingFile(job, texts, chunks_meta, todo=list(range(len(texts))), remaining=len(texts))
+        if self.cache is not None:
+            cached = self.cache.get_many(self.model_name, texts)
+            for i, vector in enumerate(cached):
+                if vector is not None:
+                    self._store(pending, i, vector)
+            pending.todo = [i for i, vector in enumerate(cached) if vector is None]
+        return pending
+
+    def _flush(self, window: list[_PendingFile]) -> Iterator[EmbeddingResult]:
+        # (độ dài, index file, index chunk) – dài trước: lỗi hết bộ nhớ lộ ra sớm
+        order = sorted(
+            ((len(p.texts[i]), f, i) for f, p in enumerate(window) for i in p.todo),
+            reverse=True,
+        )
+        n_chunks = len(order)
+        print(f"[400] Embedding {n_chunks} chunks from {len(window)} files in batches of {self.batch_size}")
+
+        batches = [
+            [(f, i) for _, f, i in order[start:start + self.batch_size]]
+            for start in range(0, n_chunks, self.batch_size)
+        ]
+        # Lượt 1: mọi batch. Lượt 2: batch lỗi tách riêng từng file, gửi cùng lúc (worker
+        # chết làm lỗi mọi batch đang chạy, kể cả batch vô can). Lượt 3: file mà lượt 2
+        # vẫn gặp worker chết được encode một mình, lần lượt.
+        for stage in ("batch", "file", "alone"):
+            if stage != "batch":
+                batches = [
+                    [(g, i) for g, i in batch if g == f]
+                    for batch in batches
+                    for f in dict.fromkeys(f for f, _ in batch)
+                    if window[f].failed is None
+                ]
+            groups = [[b] for b in batches] if stage == "alone" else [batches]
+            failed: list[list[tuple[int, int]]] = []
+            for group in groups:
+                if stage == "alone" and window[group[0][0][0]].failed is not None:
+                    continue  # phần khác của file này vừa lỗi
+                for batch, vectors, error in self._encode(window, group):
+                    if error is None:
+                        yield from self._scatter(window, batch, vectors)
+                    elif stage == "batch" or (stage == "file" and isinstance(error, WorkerCrashedError)):
+                        failed.append(batch)
+                    else:
+                        window[batch[0][0]].failed = error
+            batches = failed
+            if not batches:
+                break
+
+        for pending in window:
+            if pending.failed is not None:
+                yield EmbeddingResult(pending.job, "FAILED", pending.failed)
+
+    def _encode(self, window: list[_PendingFile], batches: list[list[tuple[int, int]]]):
+        """Yield (batch, vectors, lỗi): qua encode pool nếu có, không thì trong process này."""
+        texts = [[window[f].texts[i] for f, i in batch] for batch in batches]
+        if self.pool is not None:
+            for index, vectors, error in self.pool.encode(texts):
+                yield batches[index], vectors, error
+            return
+
+        if not batches:
+            return
+        model = get_model(self.model_name)
+        for batch, batch_texts in zip(batches, texts):
+            try:
+                vectors = model.encode(
+                    batch_texts,
+                    batch_size=len(batch_texts),
+                    show_progress_bar=False,
+                    normalize_embeddings=True,
+                ).astype("float32")
+            except Exception as exc:
+                yield batch, None, exc
+                continue
+            yield batch, vectors, None
+
+    def _scatter(self, window: list[_PendingFile], batch: list[tuple[int, int]], vectors) -> Iterator[EmbeddingResult]:
+        if self.cache is not None:
+            self.cache.put_many(self.model_name, [window[f].texts[i] for f, i in batch], vectors)
+        for (f, i), vector in zip(batch, vectors):
+            self._store(window[f], i, vector)
+
+        # File đủ vector → ghi ngay, không chờ hết cửa sổ
+        for f in dict.fromkeys(f for f, _ in batch):
+            pending = window[f]
+            if pending.remaining == 0 and pending.failed is None:
+                yield self._complete(pending)
+
+    @staticmethod
+    def _store(pending: _PendingFile, index: int, vector) -> None:
+        if pending.vectors is None:
+            pending.vectors = np.empty((len(pending.texts), vector.shape[0]), dtype="float32")
+        pending.vectors[index] = vector
+        pending.remaining -= 1
+
+    def _complete(self, pending: _PendingFile) -> EmbeddingResult:
+        job = pending.job
+        try:
+            nas_safe_mkdir(job.out_dir)
+            meta_tmp = job.out_dir / "chunks_meta.json.tmp"
+            write_json(meta_tmp, pending.chunks_meta)
+            os.replace(meta_tmp, job.out_dir / "chunks_meta.json")
+
+            npy_tmp = job.out_dir / "embedding.npy.tmp"
+            with npy_tmp.open("wb") as f:
+                np.save(f, pending.vectors)
+            os.replace(npy_tmp, job.out_dir / "embedding.npy")
+        except Exception as exc:
+            return EmbeddingResult(job, "FAILED", exc)
+        finally:
+            pending.vectors = None  # nhả RAM sớm
+        print(f"[400] Completed embedding for {job.file_hash}")
+        return EmbeddingResult(job, "EMBEDDED")
@@ -1,5 +1,9 @@
 # src/lakeflow/ingesting/deduplicator.py
 import sqlite3
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+DIGEST_SIZE = 32  # sha256
 
 
 def hash_exists(conn: sqlite3.Connection, hash_value: str) -> bool:
@@ -8,3 +12,79 @@ def hash_exists(conn: sqlite3.Connection, hash_value: str) -> bool:
         (hash_value,)
     )
     return cur.fetchone() is not None
+
+
+class _SortedDigests:
+    """View một blob các digest 32 byte đã sort như một sequence (cho bisect)."""
+
+    def __init__(self, blob: bytes):
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.blob) // DIGEST_SIZE
+
+    def __getitem__(self, i: int) -> bytes:
+        start = i * DIGEST_SIZE
+        return self.blob[start:start + DIGEST_SIZE]
+
+
+class KnownHashIndex:
+    """
+    Tập hash của raw_objects nạp một lần vào bộ nhớ (thay cho hash_exists mỗi file).
+
+    - Hash đã có lúc load: digest nhị phân 32 byte, sort, nối thành một bytes
+      (~32 MB cho 1 triệu object, so với ~100+ MB nếu giữ set[str]); tra bằng bisect.
+    - Hash thêm sau khi load (add()): set riêng.
+    - Hash không phải sha256 hex (dữ liệu cũ): set[str] riêng.
+
+    Chỉ phản ánh catalog lúc load + những gì process này ghi; dòng do process khác
+    ghi sau đó không thấy → file có thể bị copy lại (ghi catalog bằng upsert nên
+    vẫn đúng).
+    """
+
+    def __init__(self, digests: Iterable[bytes] = (), others: Optional[set[str]] = None):
+        self._sorted = _SortedDigests(b"".join(sorted(digests)))
+        self._added: set[bytes] = set()
+        self._others: set[str] = others or set()
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> "KnownHashIndex":
+        digests: list[bytes] = []
+        others: set[str] = set()
+        for (hash_value,) in conn.execute("SELECT hash FROM raw_objects"):
+            digest = _to_digest(hash_value)
+            if digest is None:
+                others.add(hash_value)
+            else:
+                digests.append(digest)
+        index = cls(digests, others)
+        print(f"[INGEST] Loaded {len(index)} known hashes")
+        return index
+
+    def __contains__(self, hash_value: str) -> bool:
+        digest = _to_digest(hash_value)
+        if digest is None:
+            return hash_value in self._others
+        if digest in self._added:
+            return True
+        i = bisect_left(self._sorted, digest)
+        return i < len(self._sorted) and self._sorted[i] == digest
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._added) + len(self._others)
+
+    def add(self, hash_value: str) -> None:
+        digest = _to_digest(hash_value)
+        if digest is None:
+            self._others.add(hash_value)
+        elif hash_value not in self:
+            self._added.add(digest)
+
+
+def _to_digest(hash_value: str) -> Optional[bytes]:
+    if len(hash_value) != DIGEST_SIZE * 2:
+        return None
+    try:
+        return bytes.fromhex(hash_value)
+    except ValueError:
+        return None
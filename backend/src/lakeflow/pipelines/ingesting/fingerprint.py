@@ -0,0 +1,64 @@
+# src/lakeflow/ingesting/fingerprint.py
+"""
+Stat-based fingerprint cache cho 000_inbox.
+
+File có cùng (source_path, size, mtime_ns, inode) với lần ingest trước được coi là
+không đổi → dùng lại hash đã biết, không đọc lại file và không query raw_objects.
+Fingerprint chỉ được ghi sau khi file đã COPIED hoặc DUPLICATE (hash có trong catalog).
+"""
+
+import os
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Union
+
+from lakeflow.catalog.writer import CatalogWriter
+
+
+@dataclass(frozen=True)
+class FileFingerprint:
+    source_path: str
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+def fingerprint_of(path: Path) -> FileFingerprint:
+    st = os.stat(path)
+    return FileFingerprint(
+        source_path=str(path),
+        size=st.st_size,
+        mtime_ns=st.st_mtime_ns,
+        inode=st.st_ino,
+    )
+
+
+def load_fingerprints(conn: sqlite3.Connection) -> dict[FileFingerprint, str]:
+    """Nạp toàn bộ fingerprint một lần (tránh 1 query / file trên NAS)."""
+    cur = conn.execute(
+        "SELECT source_path, size, mtime_ns, inode, hash FROM inbox_fingerprints"
+    )
+    return {
+        FileFingerprint(row[0], row[1], row[2], row[3]): row[4]
+        for row in cur.fetchall()
+    }
+
+
+def remember_hash(
+    conn: Union[sqlite3.Connection, CatalogWriter],
+    fp: FileFingerprint,
+    hash_value: str,
+) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO inbox_fingerprints VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            fp.source_path,
+            fp.size,
+            fp.mtime_ns,
+            fp.inode,
+            hash_value,
+            datetime.utcnow().isoformat(),
+        ),
+    )
@@ -5,11 +5,19 @@ Inbox Scanner
 - Chỉ yield FILE (không yield thư mục)
 - Domain = thư mục cấp 1 dưới 000_inbox
 - Có log tổng số file để debug / quan sát pipeline
+
+Quét kiểu streaming bằng os.scandir: file được yield ngay khi gặp, lọc tên / đuôi
+trước mọi lời gọi stat, và dùng lại stat của DirEntry (size / mtime / inode) cho
+fingerprint. Thư mục bắt đầu bằng "." (.uploads, .Trash...) được bỏ qua.
+Có manifest (DirManifest) → thư mục có mtime không đổi không bị liệt kê lại.
 """
 
+import os
+import stat
 from pathlib import Path
 from typing import Iterator, Optional
 
+from lakeflow.pipelines.ingesting.manifest import DirManifest
 from lakeflow.pipelines.ingesting.models import InboxFile
 
 
@@ -27,11 +35,16 @@ ALLOWED_EXTENSIONS = {
 def scan_inbox(
     inbox_root: Path,
     only_under: Optional[list[str]] = None,
+    manifest: Optional[DirManifest] = None,
+    verbose: bool = True,
 ) -> Iterator[InboxFile]:
     """
     Scan inbox_root (000_inbox) và yield InboxFile.
 
     only_under: nếu có, chỉ quét dưới các path này (vd: ["Regulations and Policies"]).
+    manifest: nếu có, bỏ qua file của các thư mục không đổi mtime kể từ lần quét trước
+        và ghi nhận mtime mới vào manifest (caller gọi manifest.save()).
+    verbose: False → không log từng file / tổng kết (watcher quét định kỳ).
     Cấu trúc mong đợi:
         000_inbox/
             <domain>/
@@ -54,68 +67,198 @@ def scan_inbox(
     # --------------------------------------------------
     if only_under:
         prefixes = [p.strip().rstrip("/") for p in only_under if p.strip()]
-        file_paths = []
-        for prefix in prefixes:
-            sub_root = inbox_root / prefix
-            if sub_root.exists() and sub_root.is_dir():
-                file_paths.extend([p for p in sub_root.rglob("*") if p.is_file()])
-        if prefixes and not file_paths:
-            print(f"[INBOX] No files under selected folder(s): {prefixes}")
-            return
+        scan_roots = [
+            inbox_root / prefix
+            for prefix in prefixes
+            if (inbox_root / prefix).is_dir()
+        ]
     else:
-        all_paths = list(inbox_root.rglob("*"))
-        file_paths = [p for p in all_paths if p.is_file()]
+        prefixes = []
+        scan_roots = [inbox_root]
+
+    if manifest is not None:
+        manifest.begin_scan()
+
+    found = 0
+    skipped_dirs = 0
+
+    for scan_root in scan_roots:
+        # stack: (đường dẫn tuyệt đối, relative tới inbox_root, mtime_ns của thư mục)
+        stack: list[tuple[str, str, Optional[int]]] = [
+            (str(scan_root), _rel(scan_root, inbox_root), None)
+        ]
+
+        while stack:
+            dir_path, rel_dir, mtime_ns = stack.pop()
+            if mtime_ns is None:
+                try:
+                    mtime_ns = os.stat(dir_path).st_mtime_ns
+                except OSError as exc:
+                    print(f"[INBOX][WARN] Cannot stat directory {dir_path}: {exc}")
+                    continue
+
+            # ---------- Thư mục không đổi → chỉ đi xuống thư mục con ----------
+            if manifest is not None:
+                subdirs = manifest.known_subdirs(rel_dir, mtime_ns)
+                if subdirs is not None:
+                    skipped_dirs += 1
+                    for name in reversed(subdirs):
+                        stack.append(
+                            (os.path.join(dir_path, name), _join(rel_dir, name), None)
+                        )
+                    continue
+
+            subdirs = []
+            children: list[tuple[str, str, Optional[int]]] = []
+            files: list[os.DirEntry] = []
+            try:
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        name = entry.name
+                        if name.startswith("."):           # .DS_Store, ._*, .uploads/
+                            continue
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            continue
+                        if is_dir:
+                            subdirs.append(name)
+                            try:
+                                child_mtime = entry.stat().st_mtime_ns
+                            except OSError:
+                                child_mtime = None
+                            children.append((entry.path, _join(rel_dir, name), child_mtime))
+                        else:
+                            files.append(entry)
+            except OSError as exc:
+                print(f"[INBOX][WARN] Cannot list directory {dir_path}: {exc}")
+                continue
+
+            subdirs.sort()
+            children.sort(key=lambda c: c[0], reverse=True)
+            stack.extend(children)
+
+            for entry in sorted(files, key=lambda e: e.name):
+                inbox_file = _to_inbox_file(entry, inbox_root, verbose)
+                if inbox_file is not None:
+                    found += 1
+                    yield inbox_file
 
+            if manifest is not None:
+                manifest.record(rel_dir, mtime_ns, subdirs)
+
+    if not verbose:
+        return
+
+    where = f" under {only_under}" if only_under else f" under {inbox_root}"
     print(
-        f"[INBOX] Scan complete: "
-        f"{len(file_paths)} files found"
-        + (f" under {only_under}" if only_under else f" under {inbox_root}")
+        f"[INBOX] Scan complete: {found} files found{where}"
+        + (f" ({skipped_dirs} unchanged dirs skipped)" if skipped_dirs else "")
     )
 
-    if not file_paths:
-        print("[INBOX][WARN] No files found in inbox")
-        return
+    if not found:
+        if prefixes and not scan_roots:
+            print(f"[INBOX] No files under selected folder(s): {prefixes}")
+        elif not skipped_dirs:
+            print("[INBOX][WARN] No files found in inbox")
 
-    # --------------------------------------------------
-    # Yield files
-    # --------------------------------------------------
-    for path in file_paths:
-        # ---------- Skip temp / system files ----------
-        name = path.name
-
-        if name.startswith("~$"):          # Office temp
-            continue
-        if name.startswith("."):           # .DS_Store, ._*
-            continue
-        if path.suffix.lower() in {".tmp", ".part"}:
-            continue
-
-        # ---------- Extension filter ----------
-        ext = path.suffix.lower()
-        if ext not in ALLOWED_EXTENSIONS:
+
+def inbox_file_for(path: Path, inbox_root: Path, verbose: bool = True) -> Optional[InboxFile]:
+    """
+    InboxFile cho một path cụ thể (dùng bởi watcher khi nhận event).
+    None nếu file bị lọc (tạm / ẩn / sai đuôi), không còn tồn tại hoặc không phải file.
+    """
+    try:
+        relative = path.relative_to(inbox_root)
+    except ValueError:
+        return None
+    if any(part.startswith(".") for part in relative.parts):
+        return None
+    if not _accept_name(path.name, path, verbose):
+        return None
+
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    except OSError as exc:
+        print(f"[INBOX][SKIP] Cannot stat {path}: {exc}")
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+
+    return _build_inbox_file(path, st, inbox_root, verbose)
+
+
+def _accept_name(name: str, path: str | Path, verbose: bool) -> bool:
+    # ---------- Skip temp / system files (trước mọi stat) ----------
+    if name.startswith("~$"):          # Office temp
+        return False
+    ext = os.path.splitext(name)[1].lower()
+    if ext in {".tmp", ".part"}:
+        return False
+
+    # ---------- Extension filter ----------
+    if ext not in ALLOWED_EXTENSIONS:
+        if verbose:
             print(f"[INBOX][SKIP] Unsupported file type: {path}")
-            continue
-
-        # ---------- Determine domain ----------
-        try:
-            relative = path.relative_to(inbox_root)
-        except ValueError:
-            print(f"[INBOX][SKIP] Path outside inbox root: {path}")
-            continue
-
-        parts = relative.parts
-        if len(parts) < 2:
-            # file nằm trực tiếp dưới 000_inbox (không có domain)
-            domain = "unknown"
-            print(
-                f"[INBOX][WARN] File without domain folder: {path}"
-            )
-        else:
-            domain = parts[0]
+        return False
+    return True
+
+
+def _to_inbox_file(
+    entry: os.DirEntry, inbox_root: Path, verbose: bool = True
+) -> Optional[InboxFile]:
+    if not _accept_name(entry.name, entry.path, verbose):
+        return None
+
+    try:
+        if not entry.is_file():
+            return None
+        st = entry.stat()
+    except OSError as exc:
+        print(f"[INBOX][SKIP] Cannot stat {entry.path}: {exc}")
+        return None
+
+    return _build_inbox_file(Path(entry.path), st, inbox_root, verbose)
 
-        print(f"[INBOX][FILE] Domain={domain} Path={path}")
 
-        yield InboxFile(
-            path=path,
-            domain=domain,
+def _build_inbox_file(
+    path: Path, st: os.stat_result, inbox_root: Path, verbose: bool
+) -> Optional[InboxFile]:
+    # ---------- Determine domain ----------
+    try:
+        relative = path.relative_to(inbox_root)
+    except ValueError:
+        print(f"[INBOX][SKIP] Path outside inbox root: {path}")
+        return None
+
+    parts = relative.parts
+    if len(parts) < 2:
+        # file nằm trực tiếp dưới 000_inbox (không có domain)
+        domain = "unknown"
+        print(
+            f"[INBOX][WARN] File without domain folder: {path}"
         )
+    else:
+        domain = parts[0]
+
+    if verbose:
+        print(f"[INBOX][FILE] Domain={domain} Path={path}")
+
+    return InboxFile(
+        path=path,
+        domain=domain,
+        size=st.st_size,
+        mtime_ns=st.st_mtime_ns,
+        inode=st.st_ino,
+    )
+
+
+def _rel(path: Path, root: Path) -> str:
+    rel = str(path.relative_to(root)).replace("\\", "/")
+    return "" if rel == "." else rel
+
+
+def _join(rel_dir: str, name: str) -> str:
+    return f"{rel_dir}/{name}" if rel_dir else name
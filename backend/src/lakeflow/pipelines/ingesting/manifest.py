@@ -0,0 +1,89 @@
+# src/lakeflow/ingesting/manifest.py
+"""
+Manifest mtime thư mục cho scan inbox incremental.
+
+Mỗi thư mục đã quét lưu (mtime_ns, subdirs). Lần sau, thư mục có mtime không đổi
+nghĩa là không có file nào được thêm / xóa / đổi tên trực tiếp trong đó → scanner
+không liệt kê file của nó, chỉ đi tiếp xuống các thư mục con đã biết.
+
+Giới hạn: sửa nội dung file tại chỗ không đổi mtime thư mục → không được phát hiện
+(dùng force re-run để quét lại toàn bộ).
+
+Thay đổi chỉ được ghi xuống đĩa khi gọi save() (sau khi ingest xong); thư mục chứa
+file lỗi / chưa ingest xong được invalidate() để lần sau quét lại. Mỗi lượt quét bắt
+đầu bằng begin_scan() (scan_inbox tự gọi): mốc racy window tính từ lượt quét đó.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+MANIFEST_VERSION = 1
+
+# Thư mục vừa sửa trong khoảng này có thể còn đang thay đổi (độ phân giải mtime
+# trên NAS thô) → không ghi nhận, lần sau quét lại.
+RACY_WINDOW_NS = 2 * 1_000_000_000
+
+
+class DirManifest:
+
+    def __init__(self, path: Optional[Path] = None, dirs: Optional[dict] = None):
+        self.path = path
+        self._dirs: dict[str, dict] = dirs or {}
+        self._invalid: set[str] = set()
+        self._scan_started_ns = time.time_ns()
+
+    @classmethod
+    def load(cls, path: Path) -> "DirManifest":
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls(path)
+        except (OSError, ValueError) as exc:
+            print(f"[INBOX][WARN] Manifest không đọc được, quét lại toàn bộ: {exc}")
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data.get("dirs") or {})
+
+    def known_subdirs(self, rel_dir: str, mtime_ns: int) -> Optional[list[str]]:
+        """Danh sách thư mục con nếu thư mục không đổi kể từ lần quét trước, ngược lại None."""
+        entry = self._dirs.get(rel_dir)
+        if entry is None or entry.get("mtime_ns") != mtime_ns:
+            return None
+        return entry.get("subdirs", [])
+
+    def begin_scan(self) -> None:
+        """Bắt đầu lượt quét mới (watcher dùng một manifest cho nhiều lượt quét)."""
+        self._scan_started_ns = time.time_ns()
+        self._invalid.clear()
+
+    def record(self, rel_dir: str, mtime_ns: int, subdirs: list[str]) -> None:
+        if rel_dir in self._invalid or self._scan_started_ns - mtime_ns < RACY_WINDOW_NS:
+            self._dirs.pop(rel_dir, None)
+            return
+        self._dirs[rel_dir] = {"mtime_ns": mtime_ns, "subdirs": subdirs}
+
+    def invalidate(self, rel_dir: str) -> None:
+        self._invalid.add(rel_dir)
+        self._dirs.pop(rel_dir, None)
+
+    def invalidate_file(self, file_path: Path, root: Path) -> None:
+        """invalidate() thư mục chứa file_path (root = inbox root)."""
+        rel_dir = str(file_path.parent.relative_to(root)).replace("\\", "/")
+        self.invalidate("" if rel_dir == "." else rel_dir)
+
+    def clear(self) -> None:
+        self._dirs.clear()
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "dirs": self._dirs}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
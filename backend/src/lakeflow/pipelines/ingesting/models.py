@@ -1,9 +1,14 @@
 # src/lakeflow/ingesting/models.py
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 
 @dataclass(frozen=True)
 class InboxFile:
     path: Path
     domain: str
+    # stat lấy sẵn từ scanner (DirEntry) – dùng cho fingerprint, None nếu không có
+    size: Optional[int] = None
+    mtime_ns: Optional[int] = None
+    inode: Optional[int] = None
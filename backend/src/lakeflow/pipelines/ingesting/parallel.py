@@ -0,0 +1,157 @@
+# src/lakeflow/ingesting/parallel.py
+"""
+Ingest song song (000_inbox → 100_raw).
+
+- N worker thread chạy phần I/O nặng: RawIngestor.hash_file() và materialize().
+- Thread gọi (sở hữu connection SQLite) làm mọi việc với catalog: fingerprint,
+  dedup, ghi raw_objects / ingest_log qua CatalogWriter (commit theo batch).
+- Kết quả từng file giữ nguyên như chạy tuần tự (COPIED / DUPLICATE / IO_ERROR ...);
+  chỉ thứ tự dòng trong ingest_log có thể khác.
+
+Hai file cùng nội dung đang xử lý cùng lúc: file sau là DUPLICATE
+(hoặc chờ file trước copy xong rồi copy lại nếu force).
+"""
+
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+from lakeflow.common.hashing import TemporaryIOError
+from lakeflow.pipelines.ingesting.fingerprint import FileFingerprint
+from lakeflow.pipelines.ingesting.models import InboxFile
+from lakeflow.pipelines.ingesting.raw_ingestor import (
+    HashedFile,
+    HashVerificationError,
+    IngestStatus,
+    RawIngestor,
+)
+
+
+@dataclass
+class _Job:
+    inbox_file: InboxFile
+    fp: Optional[FileFingerprint]
+    hashed: Optional[HashedFile] = None
+
+
+def run_parallel_ingestion(
+    ingestor: RawIngestor,
+    inbox_files: Iterable[InboxFile],
+    workers: int,
+    force: bool = False,
+    on_status: Optional[Callable[[InboxFile, IngestStatus], None]] = None,
+) -> Counter:
+    """
+    Ingest inbox_files với `workers` thread. Trả về số file theo status.
+    on_status: gọi (trên thread gọi) khi mỗi file có kết quả.
+    Lỗi copy / verify (giống chạy tuần tự) dừng cả lượt sau khi ghi catalog các file đã xong.
+    """
+    counts: Counter = Counter()
+    in_flight: dict[Future, tuple[str, _Job]] = {}
+    claimed: set[str] = set()             # hash đang được copy vào 100_raw
+    parked: dict[str, list[_Job]] = {}    # force: chờ bản copy cùng hash xong
+    max_in_flight = max(1, workers) * 2   # giới hạn số file đang mở cùng lúc
+    files = iter(inbox_files)
+    exhausted = False
+
+    def finish(inbox_file: InboxFile, status: IngestStatus) -> None:
+        counts[status] += 1
+        ingestor.writer.file_done()
+        if on_status is not None:
+            on_status(inbox_file, status)
+
+    def submit_copy(pool: ThreadPoolExecutor, job: _Job) -> None:
+        claimed.add(job.hashed.file_hash)
+        in_flight[pool.submit(ingestor.materialize, job.inbox_file, job.hashed)] = ("copy", job)
+
+    def on_hashed(pool: ThreadPoolExecutor, fut: Future, job: _Job) -> None:
+        src = job.inbox_file.path
+        try:
+            job.hashed = fut.result()
+        except (TemporaryIOError, OSError) as exc:
+            finish(job.inbox_file, ingestor.record_read_error(src, exc))
+            return
+
+        file_hash = job.hashed.file_hash
+        if file_hash in claimed:
+            if force:
+                parked.setdefault(file_hash, []).append(job)
+                return
+            ingestor.discard(job.hashed)
+            finish(job.inbox_file, ingestor.record_duplicate(src, file_hash, job.fp))
+            return
+
+        if not force and ingestor.hash_known(file_hash):
+            ingestor.discard(job.hashed)
+            finish(job.inbox_file, ingestor.record_duplicate(src, file_hash, job.fp))
+            return
+
+        submit_copy(pool, job)
+
+    def on_copied(pool: ThreadPoolExecutor, fut: Future, job: _Job) -> None:
+        src = job.inbox_file.path
+        file_hash = job.hashed.file_hash
+        try:
+            raw_path, copy_method = fut.result()
+        except HashVerificationError:
+            ingestor.record_verify_failed(src, file_hash)
+            ingestor.writer.file_done()
+            raise
+
+        ingestor.record_copied(
+            src, job.inbox_file.domain, file_hash, raw_path, job.fp, copy_method
+        )
+        finish(job.inbox_file, "COPIED")
+
+        claimed.discard(file_hash)
+        waiting = parked.pop(file_hash, [])
+        if waiting:
+            if len(waiting) > 1:
+                parked[file_hash] = waiting[1:]
+            submit_copy(pool, waiting[0])
+
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ingest")
+    try:
+        while True:
+            # ---------- Nạp thêm file (fingerprint trên thread chính) ----------
+            while not exhausted and len(in_flight) < max_in_flight:
+                inbox_file = next(files, None)
+                if inbox_file is None:
+                    exhausted = True
+                    break
+                fp = ingestor.fingerprint(inbox_file)
+                if not force and ingestor.is_unchanged(fp):
+                    print(f"[INGEST][SKIP] Unchanged since last ingest: {inbox_file.path}")
+                    finish(inbox_file, "UNCHANGED")
+                    continue
+                print(f"[INGEST] Start: {inbox_file.path}")
+                job = _Job(inbox_file, fp)
+                in_flight[pool.submit(ingestor.hash_file, inbox_file)] = ("hash", job)
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage, job = in_flight.pop(fut)
+                if stage == "hash":
+                    on_hashed(pool, fut, job)
+                else:
+                    on_copied(pool, fut, job)
+    except BaseException:
+        pool.shutdown(wait=True, cancel_futures=True)
+        # Dọn file tạm single-pass của các file đã hash nhưng chưa xử lý xong
+        pending = [job for _, job in in_flight.values()]
+        pending += [job for jobs in parked.values() for job in jobs]
+        for stage_fut, (stage, job) in in_flight.items():
+            if stage == "hash" and not stage_fut.cancelled() and stage_fut.exception() is None:
+                job.hashed = stage_fut.result()
+        for job in pending:
+            if job.hashed is not None:
+                ingestor.discard(job.hashed)
+        raise
+    else:
+        pool.shutdown(wait=True)
+
+    return counts
@@ -1,10 +1,18 @@
 # src/lakeflow/ingesting/pipeline.py
+from collections import Counter
 from pathlib import Path
 import sqlite3
-from typing import Optional
+from typing import Iterator, Optional
 
+from lakeflow.catalog.writer import CatalogWriter
 from lakeflow.pipelines.ingesting.inbox_scanner import scan_inbox
-from lakeflow.pipelines.ingesting.raw_ingestor import RawIngestor
+from lakeflow.pipelines.ingesting.manifest import DirManifest
+from lakeflow.pipelines.ingesting.models import InboxFile
+from lakeflow.pipelines.ingesting.parallel import run_parallel_ingestion
+from lakeflow.pipelines.ingesting.raw_ingestor import IngestStatus, RawIngestor
+
+# Số file mỗi transaction catalog khi chạy song song (tuần tự: commit từng file)
+DEFAULT_PARALLEL_COMMIT_EVERY = 100
 
 
 def run_ingestion(
@@ -14,13 +22,96 @@ def run_ingestion(
     only_domains: Optional[list[str]] = None,
     only_path_prefixes: Optional[list[str]] = None,
     force_rerun: bool = False,
+    single_pass: bool = False,
+    verify_mode: str = "full",
+    workers: int = 1,
+    commit_every: Optional[int] = None,
+    copy_strategy: str = "auto",
+    commit_interval: Optional[float] = None,
+    manifest_path: Optional[Path] = None,
 ) -> None:
-    ingestor = RawIngestor(raw_root, conn)
+    """
+    single_pass: hash trong lúc copy (đọc file inbox 1 lần thay vì 3).
+    verify_mode: "full" | "sample" — cách kiểm tra bản copy trong 100_raw.
+    workers: > 1 → hash / copy song song trên N thread, catalog ghi từ một writer.
+    commit_every: số file mỗi lần commit catalog (mặc định 1 khi tuần tự,
+        DEFAULT_PARALLEL_COMMIT_EVERY khi song song).
+    commit_interval: commit catalog sau tối đa N giây kể cả khi chưa đủ commit_every.
+        Batch dở dang khi process chết được replay từ journal ở lần chạy sau.
+    copy_strategy: "auto" | "hardlink" | "stream" — cách copy vào 100_raw (two-pass).
+    manifest_path: bật scan incremental – thư mục có mtime không đổi không bị liệt kê
+        lại (xem DirManifest). Bỏ qua khi lọc theo only_domains. Manifest chỉ được lưu
+        khi lượt chạy kết thúc bình thường; force_rerun quét lại toàn bộ.
+    """
+    if commit_every is None:
+        commit_every = DEFAULT_PARALLEL_COMMIT_EVERY if workers > 1 else 1
+
+    # Lọc domain xảy ra sau scan → manifest sẽ ghi nhận cả thư mục có file bị lọc
+    manifest = None
+    if manifest_path is not None and not only_domains:
+        manifest = DirManifest.load(manifest_path)
+        if force_rerun:
+            manifest.clear()
+
+    def on_status(inbox_file: InboxFile, status: IngestStatus) -> None:
+        # File lỗi đọc → lần sau quét lại thư mục chứa nó
+        if manifest is not None and status in ("IO_ERROR", "TEMP_ERROR"):
+            manifest.invalidate_file(inbox_file.path, inbox_root)
+
+    with CatalogWriter(conn, batch_size=commit_every, max_interval=commit_interval) as writer:
+        ingestor = RawIngestor(
+            raw_root,
+            conn,
+            single_pass=single_pass,
+            verify_mode=verify_mode,
+            writer=writer,
+            copy_strategy=copy_strategy,
+        )
+        inbox_files = _iter_selected_files(
+            inbox_root, only_domains, only_path_prefixes, manifest
+        )
+
+        if workers > 1:
+            print(f"[INGEST] Parallel mode: {workers} workers, commit every {commit_every} files")
+            status_counts = run_parallel_ingestion(
+                ingestor,
+                inbox_files,
+                workers=workers,
+                force=force_rerun,
+                on_status=on_status,
+            )
+        else:
+            status_counts = Counter()
+            for inbox_file in inbox_files:
+                status = ingestor.ingest(inbox_file, force=force_rerun)
+                status_counts[status] += 1
+                on_status(inbox_file, status)
+
+    if manifest is not None:
+        manifest.save()
+
+    if status_counts:
+        print(
+            "[INGEST] Status: "
+            + ", ".join(f"{k}={v}" for k, v in sorted(status_counts.items()))
+        )
+
+
+def _iter_selected_files(
+    inbox_root: Path,
+    only_domains: Optional[list[str]],
+    only_path_prefixes: Optional[list[str]],
+    manifest: Optional[DirManifest] = None,
+) -> Iterator[InboxFile]:
     allowed_domains = set(only_domains) if only_domains else None
     allowed_prefixes = [p.strip().rstrip("/") for p in (only_path_prefixes or []) if p.strip()]
 
     # Chỉ quét thư mục được chọn (only_under); nếu không chọn thì quét toàn bộ
-    for inbox_file in scan_inbox(inbox_root, only_under=allowed_prefixes if allowed_prefixes else None):
+    for inbox_file in scan_inbox(
+        inbox_root,
+        only_under=allowed_prefixes if allowed_prefixes else None,
+        manifest=manifest,
+    ):
         if allowed_domains is not None and inbox_file.domain not in allowed_domains:
             continue
         if allowed_prefixes:
@@ -31,4 +122,4 @@ def run_ingestion(
                     continue
             except ValueError:
                 continue
-        ingestor.ingest(inbox_file, force=force_rerun)
+        yield inbox_file
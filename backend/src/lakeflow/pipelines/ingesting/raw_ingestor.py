@@ -1,90 +1,301 @@
 # src/lakeflow/ingesting/raw_ingestor.py
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime
 import sqlite3
+from typing import Literal, Optional
 
-from lakeflow.common.hashing import sha256_file, TemporaryIOError
+from lakeflow.catalog.writer import CatalogWriter
+from lakeflow.common.hashing import sha256_copy, sha256_file, TemporaryIOError
 from lakeflow.common.filesystem import atomic_copy, ensure_dir
 from lakeflow.pipelines.ingesting.models import InboxFile
-from lakeflow.pipelines.ingesting.verifier import verify_hash
-from lakeflow.pipelines.ingesting.deduplicator import hash_exists
+from lakeflow.pipelines.ingesting.verifier import verify_copy
+from lakeflow.pipelines.ingesting.deduplicator import KnownHashIndex
+from lakeflow.pipelines.ingesting.fingerprint import (
+    FileFingerprint,
+    fingerprint_of,
+    load_fingerprints,
+    remember_hash,
+)
+
+
+IngestStatus = Literal["COPIED", "DUPLICATE", "UNCHANGED", "IO_ERROR", "TEMP_ERROR"]
+
+
+class HashVerificationError(RuntimeError):
+    """Bản copy trong 100_raw không khớp với file nguồn."""
+
+
+@dataclass
+class HashedFile:
+    """Kết quả bước hash. single-pass: tmp_path là bản copy tạm đã ghi xong."""
+    file_hash: str
+    tmp_path: Optional[Path] = None
 
 
 class RawIngestor:
+    """
+    000_inbox → 100_raw.
+
+    single_pass=False (mặc định): hash nguồn → copy → đọc lại bản copy để verify.
+    single_pass=True: copy vào file tạm trong 100_raw/<domain>/ và hash cùng lúc
+        (đọc nguồn 1 lần), dedup sau khi copy; file trùng bị xóa khỏi thư mục tạm.
+    verify_mode: "full" (hash lại bản copy) hoặc "sample" (size + block lấy mẫu).
+    copy_strategy: "auto" | "hardlink" | "stream" (xem common.filesystem.atomic_copy);
+        chỉ áp dụng cho two-pass. Cách copy thực tế được ghi vào ingest_log.copy_method.
+
+    File có fingerprint (path, size, mtime_ns, inode) khớp lần ingest trước → UNCHANGED,
+    không hash và không query raw_objects (trừ khi force).
+    Dedup theo hash tra KnownHashIndex (nạp raw_objects một lần), không query mỗi file.
 
-    def __init__(self, raw_root: Path, conn: sqlite3.Connection):
+    Mọi lệnh ghi catalog đi qua `writer` (CatalogWriter); mặc định commit sau mỗi file.
+    hash_file() / materialize() không đụng tới DB → chạy được trên worker thread
+    (xem parallel.py); các hàm record_*() phải chạy trên thread sở hữu connection.
+    """
+
+    def __init__(
+        self,
+        raw_root: Path,
+        conn: sqlite3.Connection,
+        single_pass: bool = False,
+        verify_mode: str = "full",
+        writer: Optional[CatalogWriter] = None,
+        copy_strategy: str = "auto",
+    ):
         self.raw_root = raw_root
         self.conn = conn
+        self.single_pass = single_pass
+        self.verify_mode = verify_mode
+        self.copy_strategy = copy_strategy
+        self.writer = writer or CatalogWriter(conn)
+        self._fingerprints: dict[FileFingerprint, str] | None = None
+        self._known_hashes: KnownHashIndex | None = None
 
-    def ingest(self, inbox_file: InboxFile, force: bool = False) -> None:
+    def ingest(self, inbox_file: InboxFile, force: bool = False) -> IngestStatus:
+        try:
+            return self._ingest(inbox_file, force)
+        finally:
+            self.writer.file_done()
+
+    def _ingest(self, inbox_file: InboxFile, force: bool) -> IngestStatus:
         src = inbox_file.path
         domain = inbox_file.domain
 
+        # ---------- FINGERPRINT (file không đổi → bỏ qua) ----------
+        fp = self.fingerprint(inbox_file)
+        if not force and self.is_unchanged(fp):
+            print(f"[INGEST][SKIP] Unchanged since last ingest: {src}")
+            return "UNCHANGED"
+
         print(f"[INGEST] Start: {src}")
 
         # ---------- HASH ----------
         try:
+            hashed = self.hash_file(inbox_file)
+        except (TemporaryIOError, OSError) as exc:
+            return self.record_read_error(src, exc)
+
+        # ---------- DEDUP (bỏ qua nếu force) ----------
+        if not force and self.hash_known(hashed.file_hash):
+            self.discard(hashed)
+            return self.record_duplicate(src, hashed.file_hash, fp)
+
+        # ---------- COPY + VERIFY ----------
+        try:
+            raw_path, copy_method = self.materialize(inbox_file, hashed)
+        except HashVerificationError:
+            self.record_verify_failed(src, hashed.file_hash)
+            raise
+
+        # ---------- DB ----------
+        self.record_copied(src, domain, hashed.file_hash, raw_path, fp, copy_method)
+        return "COPIED"
+
+    # ==================================================
+    # Đọc / ghi file (không dùng DB – chạy được trên worker thread)
+    # ==================================================
+
+    def hash_file(self, inbox_file: InboxFile) -> HashedFile:
+        """
+        two-pass: sha256 của file nguồn.
+        single-pass: copy vào file tạm trong 100_raw/<domain>/ và hash cùng lúc.
+        Raise TemporaryIOError / OSError khi không đọc được.
+        """
+        src = inbox_file.path
+
+        if not self.single_pass:
             print("[INGEST]   Hashing file...")
             file_hash = sha256_file(src)
             print(f"[INGEST]   Hash = {file_hash[:16]}...")
-        except TemporaryIOError as exc:
-            self._log(src, None, "TEMP_ERROR", str(exc))
-            print(f"[INGEST][SKIP] Temporary I/O error, skip file")
-            return
-        except OSError as exc:
-            self._log(src, None, "IO_ERROR", str(exc))
-            print(f"[INGEST][SKIP] Không đọc được file (quyền / file khóa / sync): {exc}")
-            return
-
-        ext = src.suffix
-        raw_path = self.raw_root / domain / f"{file_hash}{ext}"
-        now = datetime.utcnow().isoformat()
+            return HashedFile(file_hash)
 
-        # ---------- DEDUP (bỏ qua nếu force) ----------
-        if not force and hash_exists(self.conn, file_hash):
-            print("[INGEST]   Duplicate detected, skip copy")
-            self._log(src, file_hash, "DUPLICATE", "Hash already exists")
-            return
-
-        # ---------- COPY ----------
-        print(f"[INGEST]   Copy to raw: {raw_path}")
-        ensure_dir(raw_path.parent)
-        atomic_copy(src, raw_path)
-
-        # ---------- VERIFY ----------
-        print("[INGEST]   Verifying hash...")
-        if not verify_hash(raw_path, file_hash):
-            self._log(src, file_hash, "ERROR", "Hash verification failed")
-            print("[INGEST][ERROR] Hash verification failed")
-            raise RuntimeError("Hash verification failed")
+        raw_dir = self.raw_root / inbox_file.domain
+        ensure_dir(raw_dir)
+        # Tên tạm bắt đầu bằng "." và đuôi .tmp → step1 / scanner bỏ qua
+        tmp_path = raw_dir / f".ingest-{uuid.uuid4().hex}{src.suffix}.tmp"
 
-        # ---------- DB ----------
-        if hash_exists(self.conn, file_hash):
-            print("[INGEST]   Updating catalog (force re-ingest)")
-            self.conn.execute(
-                "UPDATE raw_objects SET path = ?, size = ?, created_at = ? WHERE hash = ?",
-                (str(raw_path), src.stat().st_size, now, file_hash),
-            )
+        print("[INGEST]   Copy + hashing (single-pass)...")
+        try:
+            file_hash = sha256_copy(src, tmp_path)
+        except (TemporaryIOError, OSError):
+            _discard(tmp_path)
+            raise
+        print(f"[INGEST]   Hash = {file_hash[:16]}...")
+        return HashedFile(file_hash, tmp_path)
+
+    def materialize(self, inbox_file: InboxFile, hashed: HashedFile) -> tuple[Path, str]:
+        """
+        Đưa file vào 100_raw/<domain>/<hash><ext> và verify.
+        Trả về (raw_path, copy_method).
+        """
+        src = inbox_file.path
+        raw_path = self.raw_root / inbox_file.domain / f"{hashed.file_hash}{src.suffix}"
+
+        if hashed.tmp_path is None:
+            print(f"[INGEST]   Copy to raw: {raw_path}")
+            ensure_dir(raw_path.parent)
+            copy_method = atomic_copy(src, raw_path, strategy=self.copy_strategy)
+            print(f"[INGEST]   Copy method = {copy_method}")
+            copied = raw_path
         else:
-            print("[INGEST]   Writing metadata to catalog")
-            self.conn.execute(
-                "INSERT INTO raw_objects VALUES (?, ?, ?, ?, ?)",
-                (file_hash, domain, str(raw_path), src.stat().st_size, now),
+            copy_method = "hash_stream"
+            copied = hashed.tmp_path
+
+        # Hardlink: cùng inode với nguồn → không cần verify
+        if copy_method == "hardlink":
+            return raw_path, copy_method
+
+        print(f"[INGEST]   Verifying copy ({self.verify_mode})...")
+        if not verify_copy(src, copied, hashed.file_hash, self.verify_mode):
+            self.discard(hashed)
+            print("[INGEST][ERROR] Hash verification failed")
+            raise HashVerificationError("Hash verification failed")
+
+        if hashed.tmp_path is not None:
+            print(f"[INGEST]   Move to raw: {raw_path}")
+            os.replace(hashed.tmp_path, raw_path)
+            try:
+                shutil.copystat(str(src), str(raw_path))
+            except OSError:
+                pass
+
+        return raw_path, copy_method
+
+    @staticmethod
+    def discard(hashed: HashedFile) -> None:
+        if hashed.tmp_path is not None:
+            _discard(hashed.tmp_path)
+
+    # ==================================================
+    # Catalog (chỉ trên thread sở hữu connection)
+    # ==================================================
+
+    @staticmethod
+    def fingerprint(inbox_file: InboxFile) -> Optional[FileFingerprint]:
+        if inbox_file.size is not None and inbox_file.mtime_ns is not None:
+            return FileFingerprint(
+                source_path=str(inbox_file.path),
+                size=inbox_file.size,
+                mtime_ns=inbox_file.mtime_ns,
+                inode=inbox_file.inode or 0,
             )
-        self._log(src, file_hash, "COPIED", None)
-        self.conn.commit()
+        try:
+            return fingerprint_of(inbox_file.path)
+        except OSError:
+            # Không stat được → để bước hash ghi IO_ERROR như bình thường
+            return None
+
+    def is_unchanged(self, fp: Optional[FileFingerprint]) -> bool:
+        return fp is not None and fp in self._known_fingerprints()
+
+    def hash_known(self, file_hash: str) -> bool:
+        """Hash đã có trong raw_objects (theo index trong bộ nhớ)."""
+        if self._known_hashes is None:
+            self._known_hashes = KnownHashIndex.load(self.conn)
+        return file_hash in self._known_hashes
 
+    def record_read_error(self, src: Path, exc: Exception) -> IngestStatus:
+        if isinstance(exc, TemporaryIOError):
+            self._log(src, None, "TEMP_ERROR", str(exc))
+            print("[INGEST][SKIP] Temporary I/O error, skip file")
+            return "TEMP_ERROR"
+        self._log(src, None, "IO_ERROR", str(exc))
+        print(f"[INGEST][SKIP] Không đọc được file (quyền / file khóa / sync): {exc}")
+        return "IO_ERROR"
+
+    def record_duplicate(
+        self,
+        src: Path,
+        file_hash: str,
+        fp: Optional[FileFingerprint],
+    ) -> IngestStatus:
+        print("[INGEST]   Duplicate detected, skip copy")
+        self._log(src, file_hash, "DUPLICATE", "Hash already exists")
+        self._remember(fp, file_hash)
+        return "DUPLICATE"
+
+    def record_verify_failed(self, src: Path, file_hash: str) -> None:
+        self._log(src, file_hash, "ERROR", "Hash verification failed")
+
+    def record_copied(
+        self,
+        src: Path,
+        domain: str,
+        file_hash: str,
+        raw_path: Path,
+        fp: Optional[FileFingerprint] = None,
+        copy_method: Optional[str] = None,
+    ) -> None:
+        size = raw_path.stat().st_size
+        now = datetime.utcnow().isoformat()
+        print("[INGEST]   Writing metadata to catalog")
+        # Upsert: đúng cả khi process khác đã ghi hash này sau lúc nạp index
+        self.writer.execute(
+            "INSERT INTO raw_objects VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(hash) DO UPDATE SET "
+            "path = excluded.path, size = excluded.size, created_at = excluded.created_at",
+            (file_hash, domain, str(raw_path), size, now),
+        )
+        if self._known_hashes is not None:
+            self._known_hashes.add(file_hash)
+        self._log(src, file_hash, "COPIED", None, copy_method)
+        self._remember(fp, file_hash)
         print("[INGEST] Completed successfully")
 
+    def _known_fingerprints(self) -> dict[FileFingerprint, str]:
+        if self._fingerprints is None:
+            self._fingerprints = load_fingerprints(self.conn)
+        return self._fingerprints
+
+    def _remember(self, fp: Optional[FileFingerprint], file_hash: str) -> None:
+        if fp is not None:
+            remember_hash(self.writer, fp, file_hash)
+            self._known_fingerprints()[fp] = file_hash
+
     def _log(
         self,
         src: Path,
         hash_value: str | None,
         status: str,
-        message: str | None
+        message: str | None,
+        copy_method: str | None = None,
     ):
         print(f"[DB]   Log status={status}")
-        self.conn.execute(
-            "INSERT INTO ingest_log VALUES (NULL, ?, ?, ?, ?, ?)",
-            (str(src), hash_value, status, message, datetime.utcnow().isoformat())
+        self.writer.execute(
+            "INSERT INTO ingest_log "
+            "(source_path, hash, status, message, created_at, copy_method) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (str(src), hash_value, status, message, datetime.utcnow().isoformat(), copy_method)
         )
+
+
+def _discard(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as exc:
+        print(f"[INGEST][WARN] Không xóa được file tạm {path}: {exc}")
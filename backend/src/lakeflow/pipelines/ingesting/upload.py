@@ -0,0 +1,160 @@
+# src/lakeflow/ingesting/upload.py
+"""
+Ingest trực tiếp file upload (API /inbox/upload) – không qua bước quét inbox.
+
+- Stream upload theo chunk vào file tạm trong 100_raw/<domain>/, hash SHA-256 cùng lúc
+  (RAM chỉ giữ một chunk, không phụ thuộc kích thước file).
+- Hash đã có trong raw_objects → DUPLICATE, xóa file tạm, không ghi vào inbox.
+- File mới: os.replace vào 100_raw/<domain>/<hash><ext>, ghi + commit raw_objects /
+  ingest_log, rồi mới đặt bản sao vào 000_inbox (atomic_copy: hardlink / reflink nếu
+  được, khác filesystem thì phải copy lại) và ghi fingerprint → step0 sau đó coi là
+  UNCHANGED, không hash lại. Bản sao inbox chỉ là best-effort: lỗi thì upload vẫn
+  thành công (file đã nằm trong raw + catalog).
+
+ingest_staged(): file upload resumable đã nằm đủ trên đĩa (000_inbox/.uploads) và
+đã có hash → rename vào inbox rồi đi qua RawIngestor.materialize() như step0,
+bỏ bước hash.
+"""
+
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Literal, Optional
+
+from lakeflow.common.filesystem import atomic_copy, ensure_dir
+from lakeflow.pipelines.ingesting.deduplicator import hash_exists
+from lakeflow.pipelines.ingesting.fingerprint import fingerprint_of, remember_hash
+from lakeflow.pipelines.ingesting.models import InboxFile
+from lakeflow.pipelines.ingesting.raw_ingestor import (
+    HashedFile,
+    HashVerificationError,
+    RawIngestor,
+)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+UploadStatus = Literal["COPIED", "DUPLICATE"]
+
+
+class UploadTooLargeError(ValueError):
+    """Upload vượt quá max_size (file tạm đã bị xóa)."""
+
+
+@dataclass
+class StoredUpload:
+    status: UploadStatus
+    file_hash: str
+    size: int
+    raw_path: Optional[Path] = None
+
+
+def store_upload(
+    stream: BinaryIO,
+    domain: str,
+    inbox_dest: Path,
+    ingestor: RawIngestor,
+    max_size: int,
+) -> StoredUpload:
+    """
+    Lưu một file upload (stream đọc được đồng bộ, vd. UploadFile.file).
+    Ghi catalog qua ingestor.writer và commit trước khi đặt bản sao vào inbox.
+    Raise UploadTooLargeError / OSError (file tạm luôn được dọn).
+    """
+    ext = inbox_dest.suffix
+    raw_dir = ingestor.raw_root / domain
+    ensure_dir(raw_dir)
+    # Tên tạm bắt đầu bằng "." và đuôi .tmp → step1 / scanner bỏ qua
+    tmp_path = raw_dir / f".upload-{uuid.uuid4().hex}{ext}.tmp"
+
+    try:
+        try:
+            file_hash, size = _stream_to_file(stream, tmp_path, max_size)
+
+            # ---------- DEDUP (trước khi ghi bất cứ gì vào raw / inbox) ----------
+            if hash_exists(ingestor.conn, file_hash):
+                tmp_path.unlink(missing_ok=True)
+                ingestor.record_duplicate(inbox_dest, file_hash, None)
+                return StoredUpload("DUPLICATE", file_hash, size)
+
+            raw_path = raw_dir / f"{file_hash}{ext}"
+            print(f"[UPLOAD]   Move to raw: {raw_path}")
+            os.replace(tmp_path, raw_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        ingestor.record_copied(inbox_dest, domain, file_hash, raw_path, None, "upload_stream")
+    finally:
+        ingestor.writer.file_done()
+    ingestor.writer.flush()
+
+    # ---------- Bản sao trong inbox (nguồn để người dùng duyệt / chạy lại) ----------
+    try:
+        atomic_copy(raw_path, inbox_dest, strategy=ingestor.copy_strategy)
+        remember_hash(ingestor.writer, fingerprint_of(inbox_dest), file_hash)
+        ingestor.writer.flush()
+    except OSError as exc:
+        print(f"[UPLOAD][WARN] Could not mirror {raw_path.name} into inbox: {exc}")
+    return StoredUpload("COPIED", file_hash, size, raw_path)
+
+
+def ingest_staged(
+    staged_path: Path,
+    file_hash: str,
+    domain: str,
+    inbox_dest: Path,
+    ingestor: RawIngestor,
+) -> UploadStatus:
+    """
+    File đã nhận đủ (staged_path, cùng filesystem với inbox) + hash đã tính dần.
+    DUPLICATE → xóa staged_path; mới → rename vào inbox_dest và copy vào 100_raw.
+    """
+    try:
+        if hash_exists(ingestor.conn, file_hash):
+            staged_path.unlink(missing_ok=True)
+            ingestor.record_duplicate(inbox_dest, file_hash, None)
+            return "DUPLICATE"
+
+        inbox_dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staged_path, inbox_dest)
+        st = os.stat(inbox_dest)
+        inbox_file = InboxFile(
+            path=inbox_dest,
+            domain=domain,
+            size=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+            inode=st.st_ino,
+        )
+
+        try:
+            raw_path, copy_method = ingestor.materialize(inbox_file, HashedFile(file_hash))
+        except HashVerificationError:
+            # File vẫn nằm trong inbox → step0 lần sau xử lý lại
+            ingestor.record_verify_failed(inbox_dest, file_hash)
+            raise
+        ingestor.record_copied(
+            inbox_dest, domain, file_hash, raw_path, ingestor.fingerprint(inbox_file), copy_method
+        )
+        return "COPIED"
+    finally:
+        ingestor.writer.file_done()
+
+
+def _stream_to_file(stream: BinaryIO, dst: Path, max_size: int) -> tuple[str, int]:
+    hasher = hashlib.sha256()
+    size = 0
+    with dst.open("wb") as f_out:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLargeError(f"file too large (max {max_size // (1024 * 1024)} MB)")
+            hasher.update(chunk)
+            f_out.write(chunk)
+        f_out.flush()
+        os.fsync(f_out.fileno())
+    return hasher.hexdigest(), size
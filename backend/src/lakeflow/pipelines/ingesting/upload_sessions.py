@@ -0,0 +1,224 @@
+# src/lakeflow/ingesting/upload_sessions.py
+"""
+Upload resumable theo chunk (API /inbox/uploads).
+
+Mỗi session là một thư mục 000_inbox/.uploads/<upload_id>/:
+  - meta.json : domain, path, filename, size (tổng số byte khai báo lúc tạo), created_at
+  - data      : phần dữ liệu đã nhận (chỉ append tuần tự)
+
+Scanner bỏ qua thư mục bắt đầu bằng "." → dữ liệu dở dang không bị step0 ingest.
+
+SHA-256 được cập nhật dần theo từng chunk (hasher giữ trong bộ nhớ process). Nếu
+process khởi động lại hoặc chunk rơi vào worker khác, hash được tính lại từ file
+data một lần rồi tiếp tục. Ghi chunk giữ flock trên file data → hai request cùng
+session không ghi xen nhau.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+UPLOADS_DIRNAME = ".uploads"
+SESSION_TTL_SECONDS = 7 * 24 * 3600  # session bỏ dở quá 7 ngày bị xóa
+
+_ID_CHARS = set("0123456789abcdef")
+
+
+class UploadSessionError(ValueError):
+    """Session không tồn tại / request không hợp lệ."""
+
+
+class UploadSessionNotFoundError(UploadSessionError):
+    """upload_id không tồn tại (đã finalize / hủy / hết hạn)."""
+
+
+class UploadOffsetMismatchError(UploadSessionError):
+    """Chunk không bắt đầu tại offset hiện tại của session."""
+
+    def __init__(self, expected: int):
+        super().__init__(f"offset mismatch, expected {expected}")
+        self.expected = expected
+
+
+@dataclass
+class UploadSession:
+    upload_id: str
+    domain: str
+    path: str
+    filename: str
+    size: int
+    created_at: str
+    offset: int = 0
+
+
+class UploadSessionStore:
+
+    def __init__(self, inbox_root: Path):
+        self.root = inbox_root / UPLOADS_DIRNAME
+        self._hashers: dict[str, tuple[int, "hashlib._Hash"]] = {}
+        self._lock = threading.Lock()
+
+    # -------------------------
+    # Session
+    # -------------------------
+    def create(
+        self,
+        domain: str,
+        path: str,
+        filename: str,
+        size: int,
+    ) -> UploadSession:
+        self.expire_stale()
+        upload_id = uuid.uuid4().hex
+        session_dir = self.root / upload_id
+        session_dir.mkdir(parents=True)
+        (session_dir / "data").touch()
+        session = UploadSession(
+            upload_id=upload_id,
+            domain=domain,
+            path=path,
+            filename=filename,
+            size=size,
+            created_at=datetime.utcnow().isoformat(),
+        )
+        meta = asdict(session)
+        meta.pop("offset")
+        (session_dir / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        with self._lock:
+            self._hashers[upload_id] = (0, hashlib.sha256())
+        return session
+
+    def get(self, upload_id: str) -> UploadSession:
+        session_dir = self._session_dir(upload_id)
+        try:
+            meta = json.loads((session_dir / "meta.json").read_text(encoding="utf-8"))
+            offset = (session_dir / "data").stat().st_size
+        except (OSError, ValueError):
+            raise UploadSessionNotFoundError(f"upload {upload_id} not found") from None
+        return UploadSession(**meta, offset=offset)
+
+    def delete(self, upload_id: str) -> None:
+        session_dir = self._session_dir(upload_id)
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+    def expire_stale(self) -> None:
+        if not self.root.is_dir():
+            return
+        cutoff = time.time() - SESSION_TTL_SECONDS
+        for entry in os.scandir(self.root):
+            try:
+                # mtime của data = lần nhận chunk cuối
+                if os.stat(os.path.join(entry.path, "data")).st_mtime < cutoff:
+                    self.delete(entry.name)
+            except (OSError, UploadSessionError):
+                continue
+
+    # -------------------------
+    # Dữ liệu
+    # -------------------------
+    def open_chunk(self, upload_id: str, start: int) -> "ChunkWriter":
+        """Mở ghi chunk bắt đầu tại `start` (phải bằng offset hiện tại)."""
+        session = self.get(upload_id)
+        f = (self._session_dir(upload_id) / "data").open("ab")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            offset = os.fstat(f.fileno()).st_size
+            if start != offset:
+                raise UploadOffsetMismatchError(offset)
+            session.offset = offset
+            return ChunkWriter(self, session, f, self._take_hasher(upload_id, offset))
+        except BaseException:
+            f.close()
+            raise
+
+    def finalize(self, upload_id: str) -> tuple[UploadSession, str, Path]:
+        """
+        Khóa session: kiểm tra đủ dữ liệu, trả về (session, sha256, đường dẫn file).
+        File data được đổi tên → mọi PUT sau đó báo session không tồn tại.
+        """
+        session = self.get(upload_id)
+        data = self.data_path(upload_id)
+        with data.open("rb") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            session.offset = os.fstat(f.fileno()).st_size
+            if session.offset != session.size:
+                raise UploadSessionError(
+                    f"upload incomplete: {session.offset}/{session.size} bytes"
+                )
+            hasher = self._take_hasher(upload_id, session.offset)
+            complete = data.with_name("complete")
+            os.replace(data, complete)
+        return session, hasher.hexdigest(), complete
+
+    def data_path(self, upload_id: str) -> Path:
+        return self._session_dir(upload_id) / "data"
+
+    def _take_hasher(self, upload_id: str, offset: int):
+        with self._lock:
+            cached = self._hashers.pop(upload_id, None)
+        if cached is not None and cached[0] == offset:
+            return cached[1]
+        # Mất trạng thái (restart / worker khác) → tính lại từ đĩa
+        hasher = hashlib.sha256()
+        with self.data_path(upload_id).open("rb") as f:
+            remaining = offset
+            while remaining > 0:
+                chunk = f.read(min(1024 * 1024, remaining))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                remaining -= len(chunk)
+        return hasher
+
+    def _put_hasher(self, upload_id: str, offset: int, hasher) -> None:
+        with self._lock:
+            self._hashers[upload_id] = (offset, hasher)
+
+    def _session_dir(self, upload_id: str) -> Path:
+        if len(upload_id) != 32 or not set(upload_id) <= _ID_CHARS:
+            raise UploadSessionNotFoundError("invalid upload id")
+        return self.root / upload_id
+
+
+class ChunkWriter:
+    """Ghi một chunk (có thể nhận làm nhiều phần) vào session; luôn close()."""
+
+    def __init__(self, store: UploadSessionStore, session: UploadSession, f, hasher):
+        self.store = store
+        self.session = session
+        self.offset = session.offset
+        self._f = f
+        self._hasher = hasher
+
+    def write(self, data: bytes) -> None:
+        if self.offset + len(data) > self.session.size:
+            raise UploadSessionError(f"chunk exceeds declared size {self.session.size}")
+        self._f.write(data)
+        self._hasher.update(data)
+        self.offset += len(data)
+
+    def close(self) -> int:
+        """Flush dữ liệu đã nhận (kể cả khi client ngắt giữa chừng). Trả về offset mới."""
+        try:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self.store._put_hasher(self.session.upload_id, self.offset, self._hasher)
+        finally:
+            self._f.close()  # nhả flock
+        return self.offset
@@ -2,6 +2,43 @@
 from pathlib import Path
 from lakeflow.common.hashing import sha256_file
 
+# Chế độ kiểm tra bản copy trong 100_raw
+#   full   : đọc lại toàn bộ bản copy và so SHA-256 (mặc định, như trước)
+#   sample : so kích thước + một số block lấy mẫu giữa nguồn và bản copy
+VERIFY_MODES = ("full", "sample")
+
+SAMPLE_BLOCKS = 8
+SAMPLE_BLOCK_SIZE = 64 * 1024  # 64KB
+
 
 def verify_hash(path: Path, expected_hash: str) -> bool:
     return sha256_file(path) == expected_hash
+
+
+def verify_sampled(src: Path, dst: Path) -> bool:
+    """
+    Kiểm tra nhanh: cùng kích thước và các block lấy mẫu (đầu, cuối, rải đều) giống nhau.
+    Chỉ đọc tối đa SAMPLE_BLOCKS * SAMPLE_BLOCK_SIZE mỗi file.
+    """
+    size = src.stat().st_size
+    if dst.stat().st_size != size:
+        return False
+    if size == 0:
+        return True
+
+    last = max(size - SAMPLE_BLOCK_SIZE, 0)
+    offsets = sorted({last * i // (SAMPLE_BLOCKS - 1) for i in range(SAMPLE_BLOCKS)})
+
+    with src.open("rb") as f_src, dst.open("rb") as f_dst:
+        for offset in offsets:
+            f_src.seek(offset)
+            f_dst.seek(offset)
+            if f_src.read(SAMPLE_BLOCK_SIZE) != f_dst.read(SAMPLE_BLOCK_SIZE):
+                return False
+    return True
+
+
+def verify_copy(src: Path, dst: Path, expected_hash: str, mode: str = "full") -> bool:
+    if mode == "sample":
+        return verify_sampled(src, dst)
+    return verify_hash(dst, expected_hash)
@@ -0,0 +1,454 @@
+# src/lakeflow/ingesting/watcher.py
+"""
+Inbox watcher: ingest liên tục 000_inbox → 100_raw, không cần quét lại toàn bộ.
+
+- inotify (Linux, qua ctypes): watch mọi thư mục dưới inbox; thư mục mới được
+  watch ngay khi tạo. Event IN_CLOSE_WRITE / IN_MOVED_TO / IN_CREATE → path cần xét.
+- polling: cho NFS / SMB (inotify không thấy thay đổi từ máy khác). Mỗi chu kỳ chỉ
+  stat thư mục; thư mục đổi mtime mới bị liệt kê lại (DirManifest trong bộ nhớ).
+- mode="auto": polling nếu inbox nằm trên network filesystem hoặc không có inotify.
+
+Debounce: file .part / .tmp / ~$ bị bỏ qua (scanner); file chỉ được ingest khi
+(size, mtime) không đổi giữa hai lần stat và mtime đã cũ hơn settle_seconds
+→ file đang được ghi dở (đang lớn dần) sẽ chờ. Với inotify, file đã IN_CREATE mà
+chưa IN_CLOSE_WRITE còn được giữ thêm (tối đa WRITE_HOLD_SECONDS).
+
+Khi khởi động: một lượt quét bắt kịp (dùng manifest nếu có) cho các file đến lúc
+watcher không chạy. Catalog được commit sau mỗi đợt file sẵn sàng. Thư mục còn file
+đang chờ debounce / lỗi đọc không được ghi vào manifest → restart sẽ quét lại.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from lakeflow.pipelines.ingesting.inbox_scanner import inbox_file_for, scan_inbox
+from lakeflow.pipelines.ingesting.manifest import DirManifest
+from lakeflow.pipelines.ingesting.models import InboxFile
+from lakeflow.pipelines.ingesting.raw_ingestor import HashVerificationError, RawIngestor
+
+WATCH_MODES = ("auto", "inotify", "poll")
+
+# Chu kỳ kiểm tra file đang chờ (debounce)
+TICK_SECONDS = 0.5
+# Chờ trước khi thử lại file bị TEMP_ERROR
+RETRY_SECONDS = 30.0
+# inotify: file đang mở ghi (chưa IN_CLOSE_WRITE) được giữ tối đa chừng này
+WRITE_HOLD_SECONDS = 300.0
+# Số file đã xử lý được nhớ (size, mtime) – cũ hơn bị quên, nếu được offer lại thì
+# ingest trả UNCHANGED / DUPLICATE
+MAX_HANDLED = 100_000
+
+NETWORK_FS_TYPES = {
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "afs", "9p",
+    "fuse.sshfs", "fuse.rclone", "fuse.s3fs", "fuse.gcsfuse",
+}
+
+# ---------- inotify ----------
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """inotify tối giản qua libc (không cần thư viện ngoài)."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._libc = libc
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._dirs: dict[int, str] = {}
+
+    def add_tree(self, root: str) -> list[str]:
+        """Watch root và mọi thư mục con (bỏ thư mục "."). Trả về các thư mục đã watch."""
+        added = []
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err in (errno.ENOENT, errno.ENOTDIR):
+                    continue  # vừa bị xóa / đổi tên
+                # ENOSPC: vượt fs.inotify.max_user_watches
+                raise OSError(err, f"inotify_add_watch({path}): {os.strerror(err)}")
+            self._dirs[wd] = path
+            added.append(path)
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if not entry.name.startswith(".") and entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+        return added
+
+    def read(self, timeout: float) -> tuple[list[tuple[str, int]], list[str], bool]:
+        """
+        Chờ tối đa timeout giây. Trả về ([(file path, mask)], thư mục mới, overflow).
+        """
+        files: list[tuple[str, int]] = []
+        new_dirs: list[str] = []
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return files, new_dirs, False
+
+        overflow = False
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                name = buf[offset:offset + length].rstrip(b"\0")
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                parent = self._dirs.get(wd)
+                if parent is None or not name:
+                    continue
+                name_str = os.fsdecode(name)
+                if name_str.startswith("."):
+                    continue
+                path = os.path.join(parent, name_str)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        new_dirs.append(path)
+                else:
+                    files.append((path, mask))
+        return files, new_dirs, overflow
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+# =====================================================
+# Debounce
+# =====================================================
+
+@dataclass
+class _Pending:
+    size: int
+    mtime_ns: int
+    not_before: float = 0.0
+
+
+class _Debouncer:
+    """
+    Giữ các file chờ ổn định. ready() trả về file có (size, mtime) không đổi kể từ
+    lần stat trước và mtime cũ hơn settle_seconds.
+    """
+
+    def __init__(self, inbox_root: Path, settle_seconds: float):
+        self.inbox_root = inbox_root
+        self.settle_ns = int(settle_seconds * 1_000_000_000)
+        self._pending: dict[Path, _Pending] = {}
+        # (size, mtime_ns) lúc đã xử lý – tránh xét lại file không đổi
+        self._handled: OrderedDict[Path, tuple[int, int]] = OrderedDict()
+        # file đang mở ghi (inotify) → thời điểm bắt đầu giữ
+        self._writing: dict[Path, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def offer(self, inbox_file: InboxFile, delay: float = 0.0) -> None:
+        key = (inbox_file.size, inbox_file.mtime_ns)
+        if self._handled.get(inbox_file.path) == key:
+            return
+        pending = self._pending.get(inbox_file.path)
+        if pending is not None and pending.not_before > time.monotonic():
+            return
+        self._pending[inbox_file.path] = _Pending(*key, not_before=time.monotonic() + delay)
+
+    def hold(self, path: Path) -> None:
+        self._writing.setdefault(path, time.monotonic())
+
+    def release(self, path: Path) -> None:
+        self._writing.pop(path, None)
+
+    def mark_handled(self, inbox_file: InboxFile) -> None:
+        self._handled[inbox_file.path] = (inbox_file.size, inbox_file.mtime_ns)
+        self._handled.move_to_end(inbox_file.path)
+        while len(self._handled) > MAX_HANDLED:
+            self._handled.popitem(last=False)
+
+    def pending_paths(self) -> list[Path]:
+        return list(self._pending)
+
+    def ready(self) -> list[InboxFile]:
+        out = []
+        now_ns = time.time_ns()
+        now = time.monotonic()
+        for path, seen in list(self._pending.items()):
+            if seen.not_before > now:
+                continue
+            held_since = self._writing.get(path)
+            if held_since is not None and now - held_since < WRITE_HOLD_SECONDS:
+                continue
+            current = inbox_file_for(path, self.inbox_root, verbose=False)
+            if current is None:
+                del self._pending[path]          # đã bị xóa / đổi tên
+                self._writing.pop(path, None)
+                continue
+            if (current.size, current.mtime_ns) != (seen.size, seen.mtime_ns):
+                seen.size, seen.mtime_ns = current.size, current.mtime_ns  # còn đang ghi
+                continue
+            if now_ns - current.mtime_ns < self.settle_ns:
+                continue
+            del self._pending[path]
+            self._writing.pop(path, None)
+            out.append(current)
+        return out
+
+
+# =====================================================
+# Watcher
+# =====================================================
+
+class InboxWatcher:
+
+    def __init__(
+        self,
+        inbox_root: Path,
+        ingestor: RawIngestor,
+        mode: str = "auto",
+        poll_interval: float = 5.0,
+        settle_seconds: float = 2.0,
+        manifest_path: Optional[Path] = None,
+    ):
+        if mode not in WATCH_MODES:
+            raise ValueError(f"Invalid watch mode: {mode}")
+        self.inbox_root = inbox_root
+        self.ingestor = ingestor
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.manifest_path = manifest_path
+        self._debouncer = _Debouncer(inbox_root, settle_seconds)
+        self._manifest = DirManifest.load(manifest_path) if manifest_path else DirManifest()
+        # File lỗi đọc (IO_ERROR) chờ được ghi lại – thư mục của chúng không vào manifest
+        self._failed: set[Path] = set()
+        # Commit catalog lần trước lỗi → thử lại ở tick sau kể cả khi không có file mới
+        self._commit_pending = False
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self) -> None:
+        inotify = self._open_inotify()
+        print(f"[WATCH] Watching {self.inbox_root} ({'inotify' if inotify else 'polling'})")
+
+        # ---------- Bắt kịp các file đến khi watcher không chạy ----------
+        self._scan()
+        self._process_ready()
+        self._save_manifest()
+
+        try:
+            if inotify is not None:
+                self._run_inotify(inotify)
+            else:
+                self._run_polling()
+        finally:
+            if inotify is not None:
+                inotify.close()
+            self._save_manifest()
+            self.ingestor.writer.flush()
+            print("[WATCH] Stopped")
+
+    # -------------------------
+    # Vòng lặp
+    # -------------------------
+    def _run_inotify(self, inotify: _Inotify) -> None:
+        while not self._stop.is_set():
+            timeout = TICK_SECONDS if len(self._debouncer) or self._commit_pending else self.poll_interval
+            files, new_dirs, overflow = inotify.read(timeout)
+
+            for path_str, mask in files:
+                path = Path(path_str)
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    self._debouncer.release(path)
+                elif mask & IN_CREATE:
+                    self._debouncer.hold(path)
+                self._offer_path(path)
+            for path in new_dirs:
+                # File có thể đã được tạo trước khi watch → liệt kê thư mục mới
+                for added in inotify.add_tree(path):
+                    self._offer_dir(Path(added))
+            if overflow:
+                print("[WATCH][WARN] inotify queue overflow → quét lại (theo mtime thư mục)")
+                self._scan()
+
+            self._process_ready()
+
+    def _run_polling(self) -> None:
+        last_scan = time.monotonic()
+        while not self._stop.is_set():
+            timeout = TICK_SECONDS if len(self._debouncer) or self._commit_pending else self.poll_interval
+            self._stop.wait(timeout)
+            if time.monotonic() - last_scan >= self.poll_interval:
+                self._scan()
+                last_scan = time.monotonic()
+            self._process_ready()
+
+    # -------------------------
+    # Phát hiện file
+    # -------------------------
+    def _open_inotify(self) -> Optional["_Inotify"]:
+        if self.mode == "poll":
+            return None
+        if self.mode == "auto" and is_network_fs(self.inbox_root):
+            print("[WATCH] Inbox on network filesystem → polling")
+            return None
+        try:
+            inotify = _Inotify()
+        except OSError as exc:
+            if self.mode == "inotify":
+                raise
+            print(f"[WATCH][WARN] inotify unavailable ({exc}) → polling")
+            return None
+        try:
+            inotify.add_tree(str(self.inbox_root))
+        except OSError as exc:
+            inotify.close()
+            if self.mode == "inotify":
+                raise
+            print(f"[WATCH][WARN] {exc} → polling")
+            return None
+        return inotify
+
+    def _scan(self) -> None:
+        for inbox_file in scan_inbox(self.inbox_root, manifest=self._manifest, verbose=False):
+            self._debouncer.offer(inbox_file)
+        self._invalidate_unsettled()
+
+    def _invalidate_unsettled(self) -> None:
+        """Thư mục còn file chờ debounce / lỗi đọc → lượt quét sau liệt kê lại."""
+        self._failed = {p for p in self._failed if p.exists()}
+        for path in [*self._debouncer.pending_paths(), *self._failed]:
+            self._manifest.invalidate_file(path, self.inbox_root)
+
+    def _offer_dir(self, directory: Path) -> None:
+        try:
+            with os.scandir(directory) as it:
+                paths = [Path(e.path) for e in it]
+        except OSError:
+            return
+        for path in paths:
+            self._offer_path(path)
+
+    def _offer_path(self, path: Path) -> None:
+        inbox_file = inbox_file_for(path, self.inbox_root, verbose=False)
+        if inbox_file is not None:
+            self._debouncer.offer(inbox_file)
+
+    # -------------------------
+    # Ingest
+    # -------------------------
+    def _process_ready(self) -> None:
+        ready = self._debouncer.ready()
+        if not ready:
+            if self._commit_pending:
+                self._commit()
+            return
+
+        for inbox_file in ready:
+            try:
+                status = self.ingestor.ingest(inbox_file)
+            except (HashVerificationError, OSError) as exc:
+                # Không dừng watcher vì một file; lần ghi kế tiếp vào file sẽ thử lại
+                print(f"[WATCH][ERROR] {inbox_file.path}: {exc}")
+                status = "IO_ERROR"
+            except sqlite3.Error as exc:
+                # Catalog đang bị step0 / API giữ lock → thử lại sau RETRY_SECONDS
+                print(f"[WATCH][WARN] Catalog error for {inbox_file.path}: {exc}")
+                status = "TEMP_ERROR"
+            if status == "TEMP_ERROR":
+                self._debouncer.offer(inbox_file, delay=RETRY_SECONDS)  # NAS chập chờn
+            else:
+                self._debouncer.mark_handled(inbox_file)
+            if status in ("IO_ERROR", "TEMP_ERROR"):
+                self._failed.add(inbox_file.path)
+                self._manifest.invalidate_file(inbox_file.path, self.inbox_root)
+            else:
+                self._failed.discard(inbox_file.path)
+
+        if self._commit():
+            print(f"[WATCH] Ingested batch of {len(ready)} file(s)")
+
+    def _commit(self) -> bool:
+        try:
+            self.ingestor.writer.flush()
+        except sqlite3.Error as exc:
+            # Lệnh ghi vẫn nằm trong writer (và journal) → commit lại ở tick sau
+            print(f"[WATCH][WARN] Catalog commit failed, will retry: {exc}")
+            self._commit_pending = True
+            return False
+        self._commit_pending = False
+        return True
+
+    def _save_manifest(self) -> None:
+        if self.manifest_path is not None:
+            self._invalidate_unsettled()
+            self._manifest.save()
+
+
+def is_network_fs(path: Path) -> bool:
+    """True nếu path nằm trên NFS / SMB / FUSE mạng (theo /proc/self/mounts)."""
+    try:
+        with open("/proc/self/mounts", "r", encoding="utf-8") as f:
+            mounts = [line.split() for line in f]
+    except OSError:
+        return False
+
+    target = str(path.resolve())
+    best, best_type = "", ""
+    for fields in mounts:
+        if len(fields) < 3:
+            continue
+        mount_point = fields[1].replace("\\040", " ")
+        if (
+            target == mount_point
+            or target.startswith(mount_point.rstrip("/") + "/")
+        ) and len(mount_point) >= len(best):
+            best, best_type = mount_point, fields[2]
+    return best_type in NETWORK_FS_TYPES
@@ -0,0 +1,233 @@
+# src/lakeflow/pipelines/processing/chunker.py
+"""
+Chia text thành chunk cho bước embedding.
+
+- "words" (mặc định, như cũ): cửa sổ 500 từ, token_estimate = số từ.
+- "tokens": dùng fast tokenizer (HuggingFace, Rust) của chính model embedding, token
+  hóa theo batch, cắt cửa sổ vừa max_seq_length của model (trừ token đặc biệt) với
+  overlap tuỳ chọn; token_estimate = số token thật. Chunk kết thúc ở đầu một từ
+  (không cắt giữa từ) và text là lát cắt nguyên văn của văn bản gốc.
+
+Cấu hình (env):
+  PIPELINE_CHUNKER         words | tokens
+  PIPELINE_CHUNK_MODEL     model lấy tokenizer (mặc định model embedding)
+  PIPELINE_CHUNK_MAX_TOKENS  ghi đè kích thước cửa sổ
+  PIPELINE_CHUNK_OVERLAP   số token lặp lại giữa hai chunk liền nhau (mặc định 0)
+"""
+
+import json
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+from lakeflow.pipelines.embedding.model_registry import DEFAULT_MODEL_NAME
+
+CHUNKERS = ("words", "tokens")
+
+WORD_CHUNK_SIZE = 500  # từ
+
+# Cùng model với bước embedding
+DEFAULT_TOKENIZER_MODEL = DEFAULT_MODEL_NAME
+# Không đọc được max_seq_length từ cache local → cửa sổ an toàn (MiniLM: 256)
+FALLBACK_MAX_TOKENS = 256
+
+# Lùi điểm cắt tối đa ngần này token để kết thúc chunk ở ranh giới từ
+MAX_BOUNDARY_BACKOFF = 16
+
+
+class Chunker:
+    """
+    split_many(texts) → với mỗi text: danh sách (chunk_text, token_estimate).
+    reserve: bớt kích thước cửa sổ đi ngần này đơn vị (từ / token) – chỗ cho phần
+    ngữ cảnh người gọi sẽ ghép thêm vào mỗi chunk (vd. tên cột của bảng).
+    """
+
+    name = ""
+
+    def split_many(self, texts: Sequence[str], reserve: int = 0) -> List[List[tuple[str, int]]]:
+        raise NotImplementedError
+
+    def split(self, text: str, reserve: int = 0) -> List[tuple[str, int]]:
+        return self.split_many([text], reserve)[0]
+
+    def count(self, text: str) -> int:
+        """Số đơn vị (từ / token) của text."""
+        raise NotImplementedError
+
+    @property
+    def window(self) -> int:
+        """Kích thước cửa sổ (từ / token) khi reserve = 0."""
+        raise NotImplementedError
+
+
+class WordChunker(Chunker):
+    name = "words"
+
+    def __init__(self, size: int = WORD_CHUNK_SIZE):
+        self.size = size
+
+    def split_many(self, texts: Sequence[str], reserve: int = 0) -> List[List[tuple[str, int]]]:
+        size = max(1, self.size - reserve)
+        out = []
+        for text in texts:
+            words = text.split()
+            pieces = []
+            for i in range(0, len(words), size):
+                chunk_text = " ".join(words[i : i + size])
+                pieces.append((chunk_text, len(chunk_text.split())))
+            out.append(pieces)
+        return out
+
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+    @property
+    def window(self) -> int:
+        return self.size
+
+
+class TokenChunker(Chunker):
+    name = "tokens"
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_TOKENIZER_MODEL,
+        max_tokens: Optional[int] = None,
+        overlap: int = 0,
+    ):
+        self.tokenizer = _load_tokenizer(model_name)
+        if max_tokens is None:
+            max_tokens = _model_window(model_name, self.tokenizer)
+            max_tokens -= self.tokenizer.num_special_tokens_to_add(pair=False)
+        if max_tokens <= 0:
+            raise ValueError(f"Invalid chunk size: {max_tokens} tokens")
+        if not 0 <= overlap < max_tokens:
+            raise ValueError(f"Chunk overlap must be in [0, {max_tokens}), got {overlap}")
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    @property
+    def window(self) -> int:
+        return self.max_tokens
+
+    def split_many(self, texts: Sequence[str], reserve: int = 0) -> List[List[tuple[str, int]]]:
+        window = max(1, self.max_tokens - reserve)
+        # Token hóa theo đoạn ("\n\n") trong MỘT lần gọi batch, rồi ghép offset
+        # về vị trí trong text gốc của từng text
+        segments: List[str] = []
+        owners: List[tuple[int, int]] = []  # (index text, offset đoạn trong text)
+        for t_index, text in enumerate(texts):
+            pos = 0
+            for part in text.split("\n\n"):
+                if part.strip():
+                    segments.append(part)
+                    owners.append((t_index, pos))
+                pos += len(part) + 2
+
+        spans: List[List[tuple[int, int]]] = [[] for _ in texts]
+        if segments:
+            encoded = self.tokenizer(
+                segments,
+                add_special_tokens=False,
+                return_offsets_mapping=True,
+                return_attention_mask=False,
+                return_token_type_ids=False,
+            )
+            for (t_index, base), offsets in zip(owners, encoded["offset_mapping"]):
+                spans[t_index].extend((base + s, base + e) for s, e in offsets if e > s)
+
+        return [self._windows(text, text_spans, window) for text, text_spans in zip(texts, spans)]
+
+    def _windows(self, text: str, spans: List[tuple[int, int]], window: int) -> List[tuple[str, int]]:
+        pieces: List[tuple[str, int]] = []
+        overlap = min(self.overlap, window - 1)
+        n = len(spans)
+        start = 0
+        while start < n:
+            end = min(start + window, n)
+            if end < n:
+                # Token spans[end] phải là đầu một từ (có khoảng trắng trước nó)
+                for cut in range(end, max(start + 1, end - MAX_BOUNDARY_BACKOFF), -1):
+                    if spans[cut][0] > spans[cut - 1][1]:
+                        end = cut
+                        break
+            pieces.append((text[spans[start][0] : spans[end - 1][1]], end - start))
+            if end >= n:
+                break
+            start = max(end - overlap, start + 1)
+        return pieces
+
+
+@lru_cache(maxsize=4)
+def _load_tokenizer(model_name: str):
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    if not tokenizer.is_fast:
+        raise RuntimeError(f"Model {model_name} has no fast tokenizer (needed for offsets)")
+    return tokenizer
+
+
+def _model_window(model_name: str, tokenizer) -> int:
+    """
+    max_seq_length của sentence-transformers (vd. 256 với MiniLM), chỉ đọc từ thư mục
+    model / cache HF local (step2 không gọi mạng). Không có → FALLBACK_MAX_TOKENS.
+    """
+    try:
+        config_path = os.path.join(model_name, "sentence_bert_config.json")
+        if not os.path.isfile(config_path):
+            from huggingface_hub import hf_hub_download
+
+            config_path = hf_hub_download(
+                model_name, "sentence_bert_config.json", local_files_only=True
+            )
+        with open(config_path, encoding="utf-8") as f:
+            return int(json.load(f)["max_seq_length"])
+    except Exception as exc:
+        limit = getattr(tokenizer, "model_max_length", None) or FALLBACK_MAX_TOKENS
+        limit = min(int(limit), FALLBACK_MAX_TOKENS)
+        print(
+            f"[300][WARN] max_seq_length of {model_name} not found locally ({exc}); "
+            f"using {limit} tokens (set PIPELINE_CHUNK_MAX_TOKENS to override)"
+        )
+        return limit
+
+
+@lru_cache(maxsize=1)
+def get_chunker() -> Chunker:
+    """Chunker theo env (tạo một lần mỗi process)."""
+    name = (os.getenv("PIPELINE_CHUNKER") or "words").strip().lower()
+    if name not in CHUNKERS:
+        raise ValueError(f"Invalid PIPELINE_CHUNKER: {name} (expected one of {CHUNKERS})")
+    if name == "words":
+        return WordChunker()
+    max_tokens = os.getenv("PIPELINE_CHUNK_MAX_TOKENS")
+    chunker = TokenChunker(
+        model_name=os.getenv("PIPELINE_CHUNK_MODEL") or DEFAULT_TOKENIZER_MODEL,
+        max_tokens=int(max_tokens) if max_tokens else None,
+        overlap=int(os.getenv("PIPELINE_CHUNK_OVERLAP") or 0),
+    )
+    print(f"[300] Token chunker: {chunker.max_tokens} tokens, overlap {chunker.overlap}")
+    return chunker
+
+
+def build_chunks(
+    pieces: List[tuple[str, int]],
+    file_hash: str,
+    section_id: str,
+    start: int = 1,
+) -> List[Dict[str, Any]]:
+    """Chunk dict cho chunks.json; chunk_id = <file_hash>_c<số thứ tự từ start>."""
+    return [
+        {
+            "chunk_id": f"{file_hash}_c{start + i}",
+            "text": chunk_text,
+            "section_id": section_id,
+            "file_hash": file_hash,
+            "token_estimate": token_count,
+        }
+        for i, (chunk_text, token_count) in enumerate(pieces)
+    ]
@@ -1,9 +1,18 @@
+import json
+import os
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, TextIO
 
 import pandas as pd
 
 from lakeflow.common.jsonio import write_json
+from lakeflow.pipelines.processing.chunker import build_chunks, get_chunker
+
+
+# openpyxl chỉ đọc được định dạng OOXML; .xls cũ vẫn đi qua pandas
+STREAMING_SUFFIXES = {".xlsx", ".xlsm"}
+
+ROW_BATCH = 1000  # số dòng đọc / ghi tables.json mỗi lượt
 
 
 def run_excel_pipeline(
@@ -14,7 +23,22 @@ def run_excel_pipeline(
 ) -> None:
     """
     Xử lý Excel → sinh dữ liệu AI-ready (300_processed)
+
+    .xlsx / .xlsm: đọc streaming mọi sheet (openpyxl read_only), xem
+    _run_excel_streaming. Định dạng khác: pandas, chỉ sheet chính (như cũ).
     """
+    if raw_file_path.suffix.lower() in STREAMING_SUFFIXES:
+        _run_excel_streaming(file_hash, raw_file_path, output_dir)
+    else:
+        _run_excel_pandas(file_hash, raw_file_path, output_dir, validation)
+
+
+def _run_excel_pandas(
+    file_hash: str,
+    raw_file_path: Path,
+    output_dir: Path,
+    validation: Dict[str, Any],
+) -> None:
 
     # ---------- 1. Load Excel ----------
     excel = pd.ExcelFile(raw_file_path)
@@ -64,14 +88,253 @@ def run_excel_pipeline(
     write_json(output_dir / "sections.json", sections)
 
     # ---------- 5. Build chunks.json ----------
-    chunks = [
-        {
-            "chunk_id": f"{file_hash}_c1",
-            "text": clean_text,
-            "section_id": "overview",
-            "file_hash": file_hash,
-            "token_estimate": len(clean_text.split()),
-        }
-    ]
+    chunker = get_chunker()
+    if chunker.name == "words":
+        # Như cũ: một chunk tổng quan nguyên văn (giữ xuống dòng, không cắt 500 từ)
+        pieces = [(clean_text, len(clean_text.split()))]
+    else:
+        pieces = chunker.split(clean_text)
+    chunks = build_chunks(pieces, file_hash, "overview")
 
     write_json(output_dir / "chunks.json", chunks)
+
+
+def _run_excel_streaming(file_hash: str, raw_file_path: Path, output_dir: Path) -> None:
+    """
+    Đọc từng sheet theo batch ROW_BATCH dòng (RAM không phụ thuộc kích thước file):
+      - tables.json: mỗi sheet một bảng, dòng được ghi dần ra file
+      - chunks.json: mỗi nhóm PIPELINE_EXCEL_ROWS_PER_CHUNK dòng thành một chunk
+        "Sheet / Cột / dòng 'tên cột: giá trị'" (header lặp lại ở mọi chunk để
+        chunk tự đủ nghĩa khi tìm kiếm), cộng một chunk tổng quan ở cuối
+      - sections.json: overview + một section mỗi sheet
+
+    Mọi output ghi vào *.tmp, chỉ os.replace sang tên thật khi chạy xong: bị kill /
+    lỗi giữa chừng không để lại JSON cụt cạnh output cũ (sẽ bị coi là đã xử lý).
+    """
+    from openpyxl import load_workbook
+
+    rows_per_chunk = max(1, int(os.getenv("PIPELINE_EXCEL_ROWS_PER_CHUNK") or 20))
+    chunker = get_chunker()
+
+    sections: List[Dict[str, Any]] = [
+        {"section_id": "overview", "title": "Tổng quan bảng dữ liệu", "level": 1}
+    ]
+    sheet_summaries: List[str] = []
+    chunk_count = 0
+
+    outputs = ["tables.json", "chunks.json", "clean_text.txt", "sections.json"]
+    tmp = {name: output_dir / f"{name}.tmp" for name in outputs}
+
+    wb = load_workbook(raw_file_path, read_only=True, data_only=True)
+    try:
+        with tmp["tables.json"].open("w", encoding="utf-8") as tables_f, \
+                tmp["chunks.json"].open("w", encoding="utf-8") as chunks_f:
+            tables_out = _JsonArrayWriter(tables_f)
+            chunks_out = _JsonArrayWriter(chunks_f)
+
+            for sheet_index, ws in enumerate(wb.worksheets, start=1):
+                section_id = f"sheet_{sheet_index}"
+                rows = ws.iter_rows(values_only=True)
+
+                headers = _read_headers(rows)
+                if headers is None:
+                    continue  # sheet trống
+                sections.append({
+                    "section_id": section_id,
+                    "title": f"Sheet '{ws.title}'",
+                    "level": 2,
+                })
+
+                context, context_size = _sheet_context(chunker, ws.title, headers)
+
+                table = tables_out.begin_item({
+                    "table_id": f"{file_hash}_table_{sheet_index}",
+                    "title": f"Dữ liệu từ sheet '{ws.title}'",
+                    "headers": headers,
+                    "source_sheet": ws.title,
+                    "source_file": raw_file_path.name,
+                }, "rows")
+
+                row_count = 0
+                for batch in _row_batches(rows, len(headers)):
+                    table.extend(batch)
+                    row_count += len(batch)
+
+                    groups = [
+                        _rows_text(headers, batch[i : i + rows_per_chunk])
+                        for i in range(0, len(batch), rows_per_chunk)
+                    ]
+                    for pieces in chunker.split_many(groups, reserve=context_size):
+                        for text, size in pieces:
+                            chunk_count += 1
+                            chunks_out.append({
+                                "chunk_id": f"{file_hash}_c{chunk_count}",
+                                "text": f"{context}\n{text}" if context else text,
+                                "section_id": section_id,
+                                "file_hash": file_hash,
+                                "token_estimate": size + context_size,
+                            })
+
+                table.end({"row_count": row_count})
+                sheet_summaries.append(
+                    f"Sheet {ws.title}: {row_count} dòng, {len(headers)} cột ({', '.join(headers)})."
+                )
+
+            # ---------- Tổng quan ----------
+            clean_text = (
+                f"Tài liệu bảng dữ liệu trích xuất từ file Excel '{raw_file_path.name}'.\n"
+                f"Số sheet có dữ liệu: {len(sheet_summaries)}.\n"
+                + "\n".join(sheet_summaries)
+            )
+            for text, size in chunker.split(clean_text):
+                chunk_count += 1
+                chunks_out.append({
+                    "chunk_id": f"{file_hash}_c{chunk_count}",
+                    "text": text,
+                    "section_id": "overview",
+                    "file_hash": file_hash,
+                    "token_estimate": size,
+                })
+
+            tables_out.close()
+            chunks_out.close()
+
+        tmp["clean_text.txt"].write_text(clean_text, encoding="utf-8")
+        write_json(tmp["sections.json"], sections)
+    except BaseException:
+        for path in tmp.values():
+            path.unlink(missing_ok=True)
+        raise
+    finally:
+        wb.close()
+
+    for name in outputs:
+        os.replace(tmp[name], output_dir / name)
+    print(f"[300] Excel: {len(sheet_summaries)} sheets, {chunk_count} chunks")
+
+
+def _sheet_context(chunker, title: str, headers: List[str]) -> tuple[str, int]:
+    """
+    (ngữ cảnh "Sheet / Cột" lặp lại ở mọi chunk, kích thước kể cả dòng mới). Tối đa
+    nửa cửa sổ chunker: bớt cột ở cuối ("… +N cột"), vẫn không vừa thì chỉ tên sheet,
+    rồi bỏ hẳn (mỗi dòng của chunk vẫn có "tên cột: giá trị").
+    """
+    budget = chunker.window // 2
+
+    def build(k: int) -> str:
+        shown = headers[:k]
+        if k < len(headers):
+            shown.append(f"… +{len(headers) - k} cột")
+        return f"Sheet: {title}\nCột: {' | '.join(shown)}"
+
+    def size(text: str) -> int:
+        return chunker.count(text) + 1
+
+    # Số cột lớn nhất còn vừa budget (kích thước tăng theo k → tìm nhị phân)
+    lo, hi = 0, len(headers)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if size(build(mid)) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    for context in (build(lo), f"Sheet: {title}"):
+        if size(context) <= budget:
+            return context, size(context)
+    return "", 0
+
+
+def _read_headers(rows) -> Optional[List[str]]:
+    """Dòng không trống đầu tiên làm header; None nếu sheet trống."""
+    for row in rows:
+        if any(_cell(v) for v in row):
+            return [_cell(v) or f"Cột {j + 1}" for j, v in enumerate(row)]
+    return None
+
+
+def _row_batches(rows, width: int):
+    """Batch ROW_BATCH dòng (bỏ dòng trống), cắt / đệm về đúng số cột của header."""
+    batch: List[List[Any]] = []
+    for row in rows:
+        values = [_json_value(v) for v in row[:width]]
+        if not any(v != "" for v in values):
+            continue
+        values.extend([""] * (width - len(values)))
+        batch.append(values)
+        if len(batch) >= ROW_BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _rows_text(headers: List[str], rows: List[List[Any]]) -> str:
+    lines = []
+    for row in rows:
+        parts = [f"{h}: {v}" for h, v in zip(headers, row) if v != ""]
+        lines.append("; ".join(parts))
+    return "\n".join(lines)
+
+
+def _cell(value: Any) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _json_value(value: Any) -> Any:
+    """None → "" (như fillna("") cũ); kiểu không phải JSON (ngày, Decimal...) → str."""
+    if value is None:
+        return ""
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class _JsonArrayWriter:
+    """Ghi một JSON array ra file từng phần tử (không giữ cả mảng trong RAM)."""
+
+    def __init__(self, f: TextIO):
+        self._f = f
+        self._first = True
+        f.write("[")
+
+    def append(self, item: Any) -> None:
+        self._sep()
+        self._f.write(json.dumps(item, ensure_ascii=False))
+
+    def begin_item(self, head: Dict[str, Any], list_key: str) -> "_JsonListField":
+        """Phần tử là object có một field list lớn (ghi dần qua _JsonListField)."""
+        self._sep()
+        fields = json.dumps(head, ensure_ascii=False)[:-1]
+        if head:
+            fields += ", "
+        self._f.write(f"{fields}{json.dumps(list_key)}: [")
+        return _JsonListField(self._f)
+
+    def close(self) -> None:
+        self._f.write("]\n")
+
+    def _sep(self) -> None:
+        if not self._first:
+            self._f.write(",\n")
+        self._first = False
+
+
+class _JsonListField:
+
+    def __init__(self, f: TextIO):
+        self._f = f
+        self._first = True
+
+    def extend(self, items: List[Any]) -> None:
+        for item in items:
+            if not self._first:
+                self._f.write(",\n")
+            self._first = False
+            self._f.write(json.dumps(item, ensure_ascii=False))
+
+    def end(self, tail: Dict[str, Any]) -> None:
+        """Đóng list rồi thêm các field còn lại (vd. row_count chỉ biết ở cuối)."""
+        self._f.write("]")
+        for key, value in tail.items():
+            self._f.write(f", {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)}")
+        self._f.write("}")
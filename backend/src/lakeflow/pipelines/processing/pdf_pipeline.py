@@ -1,9 +1,59 @@
+import math
 from pathlib import Path
-from typing import Dict, Any, List
-
-from PyPDF2 import PdfReader
+from typing import Dict, Any, List, Optional
 
 from lakeflow.common.jsonio import write_json
+from lakeflow.common.parallel import map_in_processes
+from lakeflow.common.pdf_extract import ENGINES, open_pdf_text
+from lakeflow.pipelines.processing.chunker import build_chunks, get_chunker
+from lakeflow.pipelines.staging.page_text import read_page_texts
+
+# Khoảng trang nhỏ nhất gửi cho một worker (mở file lại trong mỗi worker có chi phí)
+MIN_PAGES_PER_RANGE = 25
+
+
+def _extract_page_range(task: tuple[str, str, int, int]) -> list[str]:
+    """Worker: text các trang [start, stop) bằng đúng engine của process cha."""
+    path, engine, start, stop = task
+    with open_pdf_text(Path(path), engine, fallback=False) as doc:
+        return [doc.page_text(i) for i in range(start, stop)]
+
+
+def _page_ranges(page_count: int, workers: int) -> list[tuple[int, int]]:
+    size = max(MIN_PAGES_PER_RANGE, math.ceil(page_count / (workers * 2)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def extract_pdf_pages(
+    raw_file_path: Path,
+    engine: Optional[str] = None,
+    split_pages: int = 0,
+    split_workers: int = 1,
+) -> list[str]:
+    """
+    Text từng trang theo thứ tự trang.
+
+    File có >= split_pages trang (split_pages > 0) và split_workers > 1: chia thành các
+    khoảng trang, trích song song trên process pool rồi ghép lại theo thứ tự → kết quả
+    giống hệt chạy tuần tự.
+    """
+    with open_pdf_text(raw_file_path, engine) as doc:
+        page_count = doc.page_count
+        engine = doc.engine  # engine thực dùng (sau fallback) → worker dùng lại
+        if split_pages <= 0 or split_workers <= 1 or page_count < split_pages:
+            return [doc.page_text(i) for i in range(page_count)]
+
+    ranges = _page_ranges(page_count, split_workers)
+    print(f"[300] Split {page_count} pages into {len(ranges)} ranges ({split_workers} processes)")
+    tasks = [(str(raw_file_path), engine, start, stop) for start, stop in ranges]
+    texts_by_start: dict[int, list[str]] = {}
+    for result in map_in_processes(_extract_page_range, tasks, min(split_workers, len(tasks))):
+        _, _, start, stop = result.item
+        if result.error is not None:
+            raise RuntimeError(f"Extract pages {start}-{stop - 1} failed: {result.error}") from result.error
+        texts_by_start[start] = result.value
+
+    return [text for start, _ in ranges for text in texts_by_start[start]]
 
 
 def run_pdf_pipeline(
@@ -11,16 +61,33 @@ def run_pdf_pipeline(
     raw_file_path: Path,
     output_dir: Path,
     validation: Dict[str, Any],
+    staging_dir: Optional[Path] = None,
+    split_pages: int = 0,
+    split_workers: int = 1,
 ) -> None:
     """
     Xử lý PDF text-based → sinh dữ liệu AI-ready (300_processed)
+
+    Nếu staging_dir có pages.jsonl (cùng phiên bản extractor) thì dùng text đó,
+    không parse lại PDF. Ngược lại extract bằng engine đã dùng khi staging
+    (validation["text_engine"]) hoặc engine mặc định; file lớn chia khoảng trang
+    chạy song song (xem extract_pdf_pages).
     """
 
-    reader = PdfReader(str(raw_file_path))
+    raw_pages = read_page_texts(staging_dir) if staging_dir is not None else None
+    if raw_pages is not None:
+        print(f"[300] Using staged page text ({len(raw_pages)} pages)")
+    else:
+        engine = validation.get("text_engine")
+        raw_pages = extract_pdf_pages(
+            raw_file_path,
+            engine if engine in ENGINES else None,
+            split_pages=split_pages,
+            split_workers=split_workers,
+        )
 
     pages_text: List[str] = []
-    for page in reader.pages:
-        text = page.extract_text() or ""
+    for text in raw_pages:
         if text.strip():
             pages_text.append(text.strip())
 
@@ -43,21 +110,7 @@ def run_pdf_pipeline(
     write_json(output_dir / "sections.json", sections)
 
     # ---------- chunks.json ----------
-    chunks = []
-    chunk_size = 500  # từ
-
-    words = full_text.split()
-    for i in range(0, len(words), chunk_size):
-        chunk_text = " ".join(words[i : i + chunk_size])
-        chunks.append(
-            {
-                "chunk_id": f"{file_hash}_c{i//chunk_size + 1}",
-                "text": chunk_text,
-                "section_id": "full_document",
-                "file_hash": file_hash,
-                "token_estimate": len(chunk_text.split()),
-            }
-        )
+    chunks = build_chunks(get_chunker().split(full_text), file_hash, "full_document")
 
     write_json(output_dir / "chunks.json", chunks)
 
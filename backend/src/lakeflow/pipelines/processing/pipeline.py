@@ -1,5 +1,6 @@
 # src/lakeflow/processing/processing/pipeline.py
 
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Any, Optional
 
@@ -27,6 +28,8 @@ def run_processed_pipeline(
     processed_root: Path,
     force: bool = False,
     parent_dir: Optional[str] = None,
+    pdf_split_pages: int = 0,
+    pdf_split_workers: int = 1,
 ) -> None:
     """
     Orchestrator cho bước 300_processed.
@@ -48,6 +51,10 @@ def run_processed_pipeline(
         True để xử lý lại dù đã có processing data
     parent_dir : str, optional
         Thư mục cha (domain) để ghi 300_processed/<parent_dir>/<file_hash>/
+    pdf_split_pages : int
+        PDF có từ ngần này trang trở lên được trích song song theo khoảng trang (0 = tắt)
+    pdf_split_workers : int
+        Số process dùng khi chia khoảng trang
     """
 
     print(f"[300] Start processing: {file_hash}")
@@ -103,6 +110,9 @@ def run_processed_pipeline(
             raw_file_path=raw_file_path,
             output_dir=out_dir,
             validation=validation,
+            staging_dir=staging_dir,
+            split_pages=pdf_split_pages,
+            split_workers=pdf_split_workers,
         )
 
     else:
@@ -120,3 +130,29 @@ def run_processed_pipeline(
         )
 
     print(f"[300] Completed successfully: {file_hash}")
+
+
+@dataclass(frozen=True)
+class ProcessingJob:
+    """Một staging dir cần xử lý; pickle được để gửi sang process worker."""
+    file_hash: str
+    raw_file_path: Path
+    staging_dir: Path
+    processed_root: Path
+    force: bool = False
+    parent_dir: Optional[str] = None
+    pdf_split_pages: int = 0
+    pdf_split_workers: int = 1
+
+
+def run_processed_job(job: ProcessingJob) -> None:
+    run_processed_pipeline(
+        file_hash=job.file_hash,
+        raw_file_path=job.raw_file_path,
+        staging_dir=job.staging_dir,
+        processed_root=job.processed_root,
+        force=job.force,
+        parent_dir=job.parent_dir,
+        pdf_split_pages=job.pdf_split_pages,
+        pdf_split_workers=job.pdf_split_workers,
+    )
@@ -0,0 +1,71 @@
+# src/lakeflow/pipelines/staging/page_text.py
+"""
+Text từng trang PDF trích ở bước staging → 200_staging/<domain>/<hash>/pages.jsonl.
+
+Bước 300_processed đọc lại file này thay vì parse + trích text PDF lần thứ hai.
+
+Định dạng (JSON Lines):
+  - dòng 1 (header): {"extractor": "pdfium", "extractor_version": "...", "format": 1, "page_count": N}
+  - N dòng tiếp:     {"page": i, "text": "..."}   (i từ 0, text chưa strip)
+
+extractor là engine của common.pdf_extract đã dùng khi staging. Phiên bản engine đó
+hiện cài khác header (nâng cấp thư viện → text có thể khác) hoặc file thiếu dòng →
+coi như không có, bên đọc tự extract lại từ PDF.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from lakeflow.common.pdf_extract import ENGINES, engine_version
+
+PAGES_FILENAME = "pages.jsonl"
+PAGES_FORMAT = 1
+
+
+def _header(engine: str, page_count: int) -> dict:
+    return {
+        "extractor": engine,
+        "extractor_version": engine_version(engine),
+        "format": PAGES_FORMAT,
+        "page_count": page_count,
+    }
+
+
+def write_page_texts(staging_dir: Path, page_texts: list[str], engine: str) -> Path:
+    """Ghi pages.jsonl (qua file tạm + os.replace → bên đọc không thấy file dở)."""
+    dst = staging_dir / PAGES_FILENAME
+    tmp = dst.with_name(dst.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(json.dumps(_header(engine, len(page_texts)), ensure_ascii=False) + "\n")
+        for i, text in enumerate(page_texts):
+            f.write(json.dumps({"page": i, "text": text}, ensure_ascii=False) + "\n")
+    os.replace(tmp, dst)
+    return dst
+
+
+def read_page_texts(staging_dir: Path) -> Optional[list[str]]:
+    """
+    Text từng trang từ pages.jsonl; None nếu không có / khác phiên bản extractor /
+    hỏng (khi đó phải extract lại từ PDF).
+    """
+    path = staging_dir / PAGES_FILENAME
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "null")
+            if not isinstance(header, dict) or header.get("extractor") not in ENGINES:
+                return None
+            expected = _header(header["extractor"], header.get("page_count", -1))
+            if header != expected:
+                return None
+            texts = [json.loads(line)["text"] for line in f if line.strip()]
+    except (FileNotFoundError, ImportError):
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"[300][WARN] Ignoring unreadable {path}: {e}")
+        return None
+
+    if len(texts) != header["page_count"]:
+        return None
+    return texts
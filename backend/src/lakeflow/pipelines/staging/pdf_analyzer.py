@@ -1,7 +1,11 @@
+import re
 from pathlib import Path
+from typing import Optional
 
 from PyPDF2 import PdfReader
-from PyPDF2.generic import IndirectObject, DictionaryObject
+from PyPDF2.generic import ArrayObject, IndirectObject, DictionaryObject
+
+from lakeflow.common.pdf_extract import Pypdf2Text, open_pdf_text
 
 # PyPDF2/pypdf exceptions for clearer error messages
 try:
@@ -14,6 +18,17 @@ except ImportError:
         PdfStreamError = Exception
 
 
+PROFILE_MODES = ("exhaustive", "sampled")
+
+# sampled: xét tối đa SAMPLE_MAX_PAGES trang rải đều trong file; dừng sớm sau
+# SAMPLE_MIN_PAGES trang nếu tất cả cùng kết luận (đều có text / đều không có text)
+SAMPLE_MIN_PAGES = 4
+SAMPLE_MAX_PAGES = 12
+
+# Toán tử in chuỗi trong content stream: (..) Tj, [..] TJ, <..> Tj
+_TEXT_SHOW_OP = re.compile(rb"[)\]>]\s*T[jJ]\b")
+
+
 class StagingError(RuntimeError):
     """Lỗi staging với lý do rõ ràng."""
 
@@ -27,7 +42,29 @@ def _resolve(obj):
     return obj
 
 
-def analyze_pdf(path: Path) -> dict:
+def analyze_pdf(
+    path: Path,
+    mode: str = "exhaustive",
+    page_texts: Optional[list[str]] = None,
+    engine: Optional[str] = None,
+) -> dict:
+    """
+    Profile PDF cho staging.
+
+    mode="exhaustive": trích text mọi trang (chính xác, chậm với file lớn).
+    mode="sampled": chỉ xét một mẫu trang rải đều (tối đa SAMPLE_MAX_PAGES), ưu tiên
+        kiểm tra rẻ (có content stream / font / toán tử in chuỗi) trước khi phải
+        trích text; text_page_ratio khi đó là ước lượng (text_page_ratio_estimated).
+
+    page_texts: nếu truyền list (chỉ mode exhaustive), text từng trang đã extract được
+    append vào đó (để ghi pages.jsonl, tránh extract lại ở bước processing).
+
+    engine: engine trích text (common.pdf_extract; mặc định PIPELINE_PDF_ENGINE / pdfium).
+    Cấu trúc trang (font, XObject, metadata) vẫn đọc bằng PyPDF2. Engine thực dùng
+    (sau fallback) ghi vào text_engine / text_engine_version.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Invalid PDF profile mode: {mode}")
     path = Path(path)
     if not path.exists():
         raise StagingError(f"File không tồn tại: {path}")
@@ -48,23 +85,58 @@ def analyze_pdf(path: Path) -> dict:
         raise StagingError(f"Lỗi phân tích PDF: {msg}") from e
 
     page_count = len(reader.pages)
+
+    doc = open_pdf_text(path, engine, pypdf2_reader=reader)
+    if doc.page_count != page_count:
+        # Hai parser đếm trang khác nhau (file hỏng nhẹ) → dùng PyPDF2 cho nhất quán
+        print(f"[STAGING][WARN] {doc.engine} page count {doc.page_count} != {page_count}, using PyPDF2")
+        doc.close()
+        doc = Pypdf2Text(reader=reader)
     text_pages = 0
     image_pages = 0
 
+    if mode == "sampled":
+        page_indices = _sample_page_indices(page_count)
+    else:
+        page_indices = range(page_count)
+
+    inspected = 0
     try:
-        for page in reader.pages:
-            # -------- Text layer detection --------
-            text = page.extract_text()
-            if text and text.strip():
-                text_pages += 1
-
-            # -------- Image / XObject detection --------
-            resources = _resolve(page.get("/Resources"))
-
-            if isinstance(resources, DictionaryObject):
-                xobjects = _resolve(resources.get("/XObject"))
-                if isinstance(xobjects, DictionaryObject):
-                    image_pages += 1
+        with doc:
+            for i in page_indices:
+                page = reader.pages[i]
+                inspected += 1
+
+                # -------- Text layer detection --------
+                if mode == "sampled":
+                    has_text = _page_has_text_cheap(page)
+                    if has_text is None:
+                        # Không kết luận được từ cấu trúc → extract thật
+                        text = doc.page_text(i)
+                        has_text = bool(text and text.strip())
+                else:
+                    text = doc.page_text(i)
+                    has_text = bool(text and text.strip())
+                    if page_texts is not None:
+                        page_texts.append(text or "")
+                if has_text:
+                    text_pages += 1
+
+                # -------- Image / XObject detection --------
+                resources = _resolve(page.get("/Resources"))
+
+                if isinstance(resources, DictionaryObject):
+                    xobjects = _resolve(resources.get("/XObject"))
+                    if isinstance(xobjects, DictionaryObject):
+                        image_pages += 1
+
+                # -------- Dừng sớm khi mẫu đã nhất quán --------
+                if (
+                    mode == "sampled"
+                    and inspected >= SAMPLE_MIN_PAGES
+                    and text_pages in (0, inspected)
+                ):
+                    break
     except Exception as e:
         raise StagingError(f"Lỗi khi đọc trang PDF: {e}") from e
 
@@ -73,14 +145,82 @@ def analyze_pdf(path: Path) -> dict:
 
     metadata = reader.metadata or {}
 
-    return {
+    profile = {
         "file_type": "pdf",
         "page_count": page_count,
         "has_text_layer": has_text_layer,
-        "text_page_ratio": round(text_pages / page_count, 2) if page_count else 0,
+        "text_page_ratio": round(text_pages / inspected, 2) if inspected else 0,
         "has_images": image_pages > 0,
         "is_scanned_pdf": is_scanned_pdf,
         "producer": metadata.get("/Producer"),
         "creator": metadata.get("/Creator"),
-        "pdf_version": reader.pdf_header
+        "pdf_version": reader.pdf_header,
+        "profile_mode": mode,
+        "text_engine": doc.engine,
+        "text_engine_version": doc.version,
     }
+    if mode == "sampled":
+        profile["pages_inspected"] = inspected
+        profile["text_page_ratio_estimated"] = inspected < page_count
+    return profile
+
+
+def _sample_page_indices(page_count: int) -> list[int]:
+    """
+    Tối đa SAMPLE_MAX_PAGES trang, rải đều; thứ tự xen kẽ (đầu, giữa, cuối, rồi chia đôi
+    dần) để vài trang đầu tiên đã đại diện cho cả file khi dừng sớm.
+    """
+    if page_count <= SAMPLE_MAX_PAGES:
+        return list(range(page_count))
+
+    ordered: list[int] = []
+    seen: set[int] = set()
+
+    def add(i: int) -> None:
+        if 0 <= i < page_count and i not in seen:
+            seen.add(i)
+            ordered.append(i)
+
+    add(0)
+    add(page_count // 2)
+    add(page_count - 1)
+    step = page_count / 2
+    while len(ordered) < SAMPLE_MAX_PAGES and step >= 1:
+        step /= 2
+        k = step
+        while k < page_count and len(ordered) < SAMPLE_MAX_PAGES:
+            add(int(k))
+            k += 2 * step
+    return ordered
+
+
+def _page_has_text_cheap(page) -> Optional[bool]:
+    """
+    Đoán trang có text layer hay không mà không extract_text():
+      - không có content stream → trang trống → False
+      - không có font và không có XObject (form có thể chứa font riêng) → False
+      - có font và content stream có toán tử in chuỗi (Tj / TJ) → True
+    Trả về None nếu không kết luận được.
+    """
+    contents = _resolve(page.get("/Contents"))
+    if contents is None:
+        return False
+
+    resources = _resolve(page.get("/Resources"))
+    fonts = xobjects = None
+    if isinstance(resources, DictionaryObject):
+        fonts = _resolve(resources.get("/Font"))
+        xobjects = _resolve(resources.get("/XObject"))
+    has_fonts = isinstance(fonts, DictionaryObject) and len(fonts) > 0
+
+    if not has_fonts:
+        return None if isinstance(xobjects, DictionaryObject) and len(xobjects) > 0 else False
+
+    streams = contents if isinstance(contents, ArrayObject) else [contents]
+    try:
+        data = b"".join(_resolve(stream).get_data() for stream in streams)
+    except Exception:
+        return None
+    if _TEXT_SHOW_OP.search(data):
+        return True
+    return None
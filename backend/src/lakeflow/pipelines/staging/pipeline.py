@@ -1,15 +1,25 @@
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
 from lakeflow.common.jsonio import write_json
+from lakeflow.pipelines.staging.page_text import write_page_texts
 from lakeflow.pipelines.staging.pdf_analyzer import StagingError, analyze_pdf
 
+STAGING_ERROR_FILE = "staging_error.txt"
 
-def _write_staging_error(staging_dir: Path, reason: str) -> None:
+
+def staging_dir_for(staging_root: Path, file_hash: str, parent_dir: Optional[str] = None) -> Path:
+    if parent_dir:
+        return staging_root / parent_dir / file_hash
+    return staging_root / file_hash
+
+
+def write_staging_error(staging_dir: Path, reason: str) -> None:
     """Ghi lý do lỗi vào staging_error.txt để UI/người dùng xem sau."""
     try:
         staging_dir.mkdir(parents=True, exist_ok=True)
-        (staging_dir / "staging_error.txt").write_text(reason, encoding="utf-8")
+        (staging_dir / STAGING_ERROR_FILE).write_text(reason, encoding="utf-8")
     except Exception:
         pass
 
@@ -19,36 +29,47 @@ def run_pdf_staging(
     raw_pdf_path: Path,
     staging_root: Path,
     parent_dir: Optional[str] = None,
+    profile_mode: str = "exhaustive",
+    save_page_text: bool = False,
+    text_engine: Optional[str] = None,
 ) -> None:
     """
     Chạy pipeline staging cho PDF (200_staging).
 
     parent_dir: thư mục cha (domain) — output sẽ là 200_staging/<parent_dir>/<file_hash>/
     Nếu không truyền: 200_staging/<file_hash>/ (giữ tương thích).
+    profile_mode: "exhaustive" | "sampled" (xem analyze_pdf).
+    save_page_text: ghi text từng trang ra pages.jsonl cho bước 300_processed dùng lại
+    (chỉ mode exhaustive – mode sampled không extract mọi trang).
+    text_engine: "pdfium" | "pypdf2" (mặc định PIPELINE_PDF_ENGINE / pdfium); engine
+    thực dùng ghi vào pdf_profile.json và validation.json.
 
     Sinh:
       - pdf_profile.json
       - validation.json
+      - (tuỳ chọn) pages.jsonl
       - (tuỳ chọn) text_sample.txt
     """
 
-    if parent_dir:
-        staging_dir = staging_root / parent_dir / file_hash
-    else:
-        staging_dir = staging_root / file_hash
+    staging_dir = staging_dir_for(staging_root, file_hash, parent_dir)
 
     try:
         staging_dir.mkdir(parents=True, exist_ok=True)
 
         # ---------- 1. Analyze PDF ----------
+        page_texts: Optional[list[str]] = (
+            [] if save_page_text and profile_mode == "exhaustive" else None
+        )
         try:
-            profile = analyze_pdf(raw_pdf_path)
+            profile = analyze_pdf(
+                raw_pdf_path, mode=profile_mode, page_texts=page_texts, engine=text_engine
+            )
         except StagingError as e:
-            _write_staging_error(staging_dir, str(e))
+            write_staging_error(staging_dir, str(e))
             raise
         except Exception as e:
             reason = f"Phân tích PDF thất bại: {e}"
-            _write_staging_error(staging_dir, reason)
+            write_staging_error(staging_dir, reason)
             raise StagingError(reason) from e
 
         write_json(
@@ -56,12 +77,16 @@ def run_pdf_staging(
             profile,
         )
 
+        if page_texts is not None:
+            write_page_texts(staging_dir, page_texts, profile["text_engine"])
+
         # ---------- 2. Build validation ----------
         validation = {
             "file_type": "pdf",
             "requires_ocr": profile.get("is_scanned", False),
             "has_tables": profile.get("has_tables", False),
             "recommended_pipeline": ["pdf_text_extract"],
+            "text_engine": profile["text_engine"],
         }
 
         try:
@@ -71,12 +96,40 @@ def run_pdf_staging(
             )
         except Exception as e:
             reason = f"Ghi validation.json thất bại: {e}"
-            _write_staging_error(staging_dir, reason)
+            write_staging_error(staging_dir, reason)
             raise StagingError(reason) from e
 
     except StagingError:
         raise
     except OSError as e:
         reason = f"Lỗi ghi thư mục/file (quyền truy cập hoặc ổ đĩa): {e}"
-        _write_staging_error(staging_dir, reason)
+        write_staging_error(staging_dir, reason)
         raise StagingError(reason) from e
+
+
+@dataclass(frozen=True)
+class PdfStagingJob:
+    """Một PDF cần staging; pickle được để gửi sang process worker."""
+    file_hash: str
+    raw_pdf_path: Path
+    staging_root: Path
+    parent_dir: Optional[str] = None
+    profile_mode: str = "exhaustive"
+    save_page_text: bool = False
+    text_engine: Optional[str] = None
+
+    @property
+    def staging_dir(self) -> Path:
+        return staging_dir_for(self.staging_root, self.file_hash, self.parent_dir)
+
+
+def run_pdf_staging_job(job: PdfStagingJob) -> None:
+    run_pdf_staging(
+        file_hash=job.file_hash,
+        raw_pdf_path=job.raw_pdf_path,
+        staging_root=job.staging_root,
+        parent_dir=job.parent_dir,
+        profile_mode=job.profile_mode,
+        save_page_text=job.save_page_text,
+        text_engine=job.text_engine,
+    )
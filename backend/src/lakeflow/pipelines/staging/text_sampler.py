@@ -1,19 +1,21 @@
 # src/lakeflow/processing/staging/text_sampler.py
 from pathlib import Path
-from PyPDF2 import PdfReader
+from typing import Optional
+
+from lakeflow.common.pdf_extract import open_pdf_text
 
 
 MAX_SAMPLE_CHARS = 1500
 
 
-def extract_text_sample(path: Path) -> str:
-    reader = PdfReader(str(path))
+def extract_text_sample(path: Path, engine: Optional[str] = None) -> str:
     buffer = ""
 
-    for page in reader.pages[:2]:
-        text = page.extract_text() or ""
-        buffer += text.strip() + "\n"
-        if len(buffer) >= MAX_SAMPLE_CHARS:
-            break
+    with open_pdf_text(path, engine) as doc:
+        for i in range(min(2, doc.page_count)):
+            text = doc.page_text(i)
+            buffer += text.strip() + "\n"
+            if len(buffer) >= MAX_SAMPLE_CHARS:
+                break
 
     return buffer[:MAX_SAMPLE_CHARS].strip()
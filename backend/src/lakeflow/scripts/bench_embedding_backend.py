@@ -0,0 +1,107 @@
+"""
+Benchmark backend embedding (torch / onnx / onnx-int8) trên chunk thật của 300_processed.
+
+    LAKEFLOW_DATA_BASE_PATH=/data python -m lakeflow.scripts.bench_embedding_backend --max-chunks 2000
+
+In chunks/giây của từng backend (không tính load model / export) và độ lệch so với
+vector PyTorch (cosine min / trung bình) trên cùng tập chunk. Model ONNX được export
+vào 500_catalog/onnx_models nếu chưa có.
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+from lakeflow.common.nas_io import nas_safe_read_json
+from lakeflow.config import paths
+from lakeflow.pipelines.embedding.model_registry import DEFAULT_MODEL_NAME, get_model
+from lakeflow.pipelines.embedding.onnx_backend import BACKENDS, PARITY_TEXTS, UnsupportedModelError
+from lakeflow.runtime.config import runtime_config
+
+
+def load_texts(processed_root: Path, max_chunks: int) -> list[str]:
+    texts: list[str] = []
+    for chunks_file in sorted(processed_root.rglob("chunks.json")):
+        for chunk in nas_safe_read_json(chunks_file):
+            if chunk.get("text"):
+                texts.append(chunk["text"].strip())
+                if len(texts) >= max_chunks:
+                    return texts
+    return texts
+
+
+def bench_backend(backend: str, model_name: str, texts: list[str], batch_size: int, reference=None) -> tuple[dict, object]:
+    # Không fallback sang torch: số đo phải đúng của backend được yêu cầu
+    model = get_model(model_name, device="cpu", backend=backend, fallback=False)
+
+    start = time.perf_counter()
+    vectors = model.encode(texts, batch_size=batch_size, normalize_embeddings=True).astype("float32")
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "backend": backend,
+        "chunks": len(texts),
+        "seconds": elapsed,
+        "chunks_per_second": len(texts) / elapsed if elapsed else 0.0,
+        "min_cosine": None,
+        "mean_cosine": None,
+    }
+    if reference is not None:
+        cosines = (reference * vectors).sum(axis=1)
+        result["min_cosine"] = float(cosines.min())
+        result["mean_cosine"] = float(cosines.mean())
+    return result, vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help=f"Danh sách backend, mặc định {','.join(BACKENDS)}")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--max-chunks", type=int, default=2000, help="Số chunk lấy từ 300_processed")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f"Unknown backend(s): {sorted(unknown)}")
+
+    data_base = os.getenv("LAKEFLOW_DATA_BASE_PATH")
+    if not data_base:
+        parser.error("LAKEFLOW_DATA_BASE_PATH is not set (ONNX export cache lives in 500_catalog)")
+    runtime_config.set_data_base_path(Path(data_base).expanduser().resolve())
+
+    processed_root = paths.processed_path()
+    texts = load_texts(processed_root, args.max_chunks) if processed_root.exists() else []
+    if not texts:
+        print(f"[BENCH] No chunks in {processed_root}, using built-in sample texts")
+        texts = (PARITY_TEXTS * (args.max_chunks // len(PARITY_TEXTS) + 1))[: args.max_chunks]
+
+    print(f"=== EMBEDDING BACKEND BENCHMARK: {len(texts)} chunks, batch {args.batch_size} ===")
+    # torch chạy trước (nếu có trong danh sách) làm mốc so sánh vector
+    ordered = sorted(backends, key=lambda b: b != "torch")
+    reference = None
+    results = []
+    for backend in ordered:
+        try:
+            result, vectors = bench_backend(backend, args.model, texts, args.batch_size, reference)
+        except UnsupportedModelError as exc:
+            print(f"[BENCH] Skip {backend}: {exc}")
+            continue
+        if backend == "torch":
+            reference = vectors
+        results.append(result)
+
+    print(f"{'backend':<10} {'chunks':>7} {'seconds':>9} {'chunks/s':>9} {'min cos':>9} {'mean cos':>9}")
+    for r in results:
+        min_cos = f"{r['min_cosine']:.5f}" if r["min_cosine"] is not None else "-"
+        mean_cos = f"{r['mean_cosine']:.5f}" if r["mean_cosine"] is not None else "-"
+        print(
+            f"{r['backend']:<10} {r['chunks']:>7} {r['seconds']:>9.2f} "
+            f"{r['chunks_per_second']:>9.1f} {min_cos:>9} {mean_cos:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark engine trích text PDF (common.pdf_extract) trên một thư mục PDF cục bộ.
+
+    python -m lakeflow.scripts.bench_pdf_extract /path/to/pdfs --max-files 50
+
+In pages/giây của từng engine (chỉ tính thời gian mở file + trích text), số file lỗi
+và tổng số ký tự (để thấy chênh lệch chất lượng thô giữa hai engine).
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from lakeflow.common.pdf_extract import ENGINES, PdfiumText, Pypdf2Text
+
+
+def bench_engine(engine: str, pdf_files: list[Path]) -> dict:
+    opener = PdfiumText if engine == "pdfium" else Pypdf2Text
+    pages = chars = failed = 0
+    elapsed = 0.0
+
+    for pdf_path in pdf_files:
+        start = time.perf_counter()
+        try:
+            with opener(pdf_path) as doc:
+                for i in range(doc.page_count):
+                    chars += len(doc.page_text(i))
+                    pages += 1
+        except Exception as e:
+            failed += 1
+            print(f"[BENCH][{engine}] Failed {pdf_path.name}: {e}")
+        finally:
+            elapsed += time.perf_counter() - start
+
+    return {
+        "engine": engine,
+        "files": len(pdf_files),
+        "failed": failed,
+        "pages": pages,
+        "chars": chars,
+        "seconds": elapsed,
+        "pages_per_second": pages / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF text extraction engines")
+    parser.add_argument("corpus", type=Path, help="Thư mục chứa PDF (quét đệ quy)")
+    parser.add_argument("--engines", default=",".join(ENGINES), help=f"Danh sách engine, mặc định {','.join(ENGINES)}")
+    parser.add_argument("--max-files", type=int, default=0, help="Giới hạn số file (0 = tất cả)")
+    args = parser.parse_args()
+
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    unknown = set(engines) - set(ENGINES)
+    if unknown:
+        parser.error(f"Unknown engine(s): {sorted(unknown)}")
+
+    pdf_files = sorted(p for p in args.corpus.rglob("*") if p.is_file() and p.suffix.lower() == ".pdf")
+    if args.max_files > 0:
+        pdf_files = pdf_files[: args.max_files]
+    if not pdf_files:
+        parser.error(f"No PDF found in {args.corpus}")
+
+    print(f"=== PDF EXTRACT BENCHMARK: {len(pdf_files)} files ===")
+    results = [bench_engine(engine, pdf_files) for engine in engines]
+
+    print(f"{'engine':<8} {'files':>6} {'failed':>6} {'pages':>8} {'chars':>12} {'seconds':>9} {'pages/s':>9}")
+    for r in results:
+        print(
+            f"{r['engine']:<8} {r['files']:>6} {r['failed']:>6} {r['pages']:>8} "
+            f"{r['chars']:>12} {r['seconds']:>9.2f} {r['pages_per_second']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,8 @@ logging.basicConfig(
 from lakeflow.runtime.config import runtime_config
 from lakeflow.catalog.db import get_connection, init_db
 from lakeflow.pipelines.ingesting.pipeline import run_ingestion
+from lakeflow.pipelines.ingesting.verifier import VERIFY_MODES
+from lakeflow.common.filesystem import COPY_STRATEGIES
 from lakeflow.config import paths
 
 from dotenv import load_dotenv
@@ -54,10 +56,32 @@ print("=== RUN INGESTION (000_inbox → 100_raw) ===")
 only_folders_env = os.getenv("PIPELINE_ONLY_FOLDERS")
 only_path_prefixes = [s.strip() for s in (only_folders_env or "").split(",") if s.strip()] or None
 force_rerun = os.getenv("PIPELINE_FORCE_RERUN") == "1"
+single_pass = os.getenv("PIPELINE_INGEST_SINGLE_PASS") == "1"
+verify_mode = (os.getenv("PIPELINE_INGEST_VERIFY") or "full").strip().lower()
+if verify_mode not in VERIFY_MODES:
+    raise RuntimeError(
+        f"PIPELINE_INGEST_VERIFY={verify_mode!r} không hợp lệ (chọn: {', '.join(VERIFY_MODES)})"
+    )
+copy_strategy = (os.getenv("PIPELINE_INGEST_COPY") or "auto").strip().lower()
+if copy_strategy not in COPY_STRATEGIES:
+    raise RuntimeError(
+        f"PIPELINE_INGEST_COPY={copy_strategy!r} không hợp lệ (chọn: {', '.join(COPY_STRATEGIES)})"
+    )
+workers = int(os.getenv("PIPELINE_INGEST_WORKERS") or "1")
+commit_every_env = os.getenv("PIPELINE_INGEST_COMMIT_EVERY")
+commit_every = int(commit_every_env) if commit_every_env else None
+commit_seconds_env = os.getenv("PIPELINE_INGEST_COMMIT_SECONDS")
+commit_interval = float(commit_seconds_env) if commit_seconds_env else None
+incremental = os.getenv("PIPELINE_INBOX_INCREMENTAL") == "1"
+manifest_path = paths.catalog_path() / "inbox_manifest.json" if incremental else None
 if only_path_prefixes:
     print(f"[INBOX] Chỉ chạy các thư mục: {only_path_prefixes}")
 if force_rerun:
     print("[INBOX] Force re-run: chạy lại kể cả đã ingest")
+if single_pass:
+    print(f"[INBOX] Single-pass ingest: hash trong lúc copy, verify={verify_mode}")
+if incremental:
+    print(f"[INBOX] Incremental scan: manifest={manifest_path}")
 
 before = conn.execute(
     "SELECT COUNT(*) FROM raw_objects"
@@ -69,6 +93,13 @@ run_ingestion(
     conn=conn,
     only_path_prefixes=only_path_prefixes,
     force_rerun=force_rerun,
+    single_pass=single_pass,
+    verify_mode=verify_mode,
+    workers=workers,
+    commit_every=commit_every,
+    copy_strategy=copy_strategy,
+    commit_interval=commit_interval,
+    manifest_path=manifest_path,
 )
 
 after = conn.execute(
@@ -0,0 +1,102 @@
+"""
+Step 0 (watch) – Inbox Ingestion liên tục
+000_inbox → 100_raw, ingest file mới trong vài giây (inotify / polling)
+"""
+
+import logging
+import os
+import signal
+from pathlib import Path
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(levelname)s [%(name)s] %(message)s",
+)
+
+from dotenv import load_dotenv
+
+from lakeflow.catalog.db import get_connection, init_db
+from lakeflow.catalog.writer import CatalogWriter
+from lakeflow.common.filesystem import COPY_STRATEGIES
+from lakeflow.config import paths
+from lakeflow.pipelines.ingesting.raw_ingestor import RawIngestor
+from lakeflow.pipelines.ingesting.verifier import VERIFY_MODES
+from lakeflow.pipelines.ingesting.watcher import WATCH_MODES, InboxWatcher
+from lakeflow.runtime.config import runtime_config
+
+load_dotenv()
+
+# ======================================================
+# BOOTSTRAP RUNTIME CONFIG (BẮT BUỘC)
+# ======================================================
+
+data_base = os.getenv("LAKEFLOW_DATA_BASE_PATH")
+if not data_base:
+    raise RuntimeError(
+        "LAKEFLOW_DATA_BASE_PATH is not set. "
+        "Example: export LAKEFLOW_DATA_BASE_PATH=/path/to/data_lake"
+    )
+
+data_base_path = Path(data_base).expanduser().resolve()
+runtime_config.set_data_base_path(data_base_path)
+
+print(f"[BOOT] DATA_BASE_PATH = {data_base_path}")
+
+
+# ======================================================
+# INIT CATALOG DB
+# ======================================================
+
+conn = get_connection(paths.catalog_db_path())
+init_db(conn)
+
+
+# ======================================================
+# RUN WATCHER
+# ======================================================
+
+print("=== WATCH INBOX (000_inbox → 100_raw) ===")
+
+watch_mode = (os.getenv("PIPELINE_WATCH_MODE") or "auto").strip().lower()
+if watch_mode not in WATCH_MODES:
+    raise RuntimeError(
+        f"PIPELINE_WATCH_MODE={watch_mode!r} không hợp lệ (chọn: {', '.join(WATCH_MODES)})"
+    )
+poll_interval = float(os.getenv("PIPELINE_WATCH_POLL_SECONDS") or "5")
+settle_seconds = float(os.getenv("PIPELINE_WATCH_SETTLE_SECONDS") or "2")
+single_pass = os.getenv("PIPELINE_INGEST_SINGLE_PASS") == "1"
+verify_mode = (os.getenv("PIPELINE_INGEST_VERIFY") or "full").strip().lower()
+if verify_mode not in VERIFY_MODES:
+    raise RuntimeError(
+        f"PIPELINE_INGEST_VERIFY={verify_mode!r} không hợp lệ (chọn: {', '.join(VERIFY_MODES)})"
+    )
+copy_strategy = (os.getenv("PIPELINE_INGEST_COPY") or "auto").strip().lower()
+if copy_strategy not in COPY_STRATEGIES:
+    raise RuntimeError(
+        f"PIPELINE_INGEST_COPY={copy_strategy!r} không hợp lệ (chọn: {', '.join(COPY_STRATEGIES)})"
+    )
+
+# Commit theo đợt file sẵn sàng (watcher gọi flush); batch_size chỉ là trần
+with CatalogWriter(conn, batch_size=1000) as writer:
+    ingestor = RawIngestor(
+        paths.raw_path(),
+        conn,
+        single_pass=single_pass,
+        verify_mode=verify_mode,
+        writer=writer,
+        copy_strategy=copy_strategy,
+    )
+    watcher = InboxWatcher(
+        paths.inbox_path(),
+        ingestor,
+        mode=watch_mode,
+        poll_interval=poll_interval,
+        settle_seconds=settle_seconds,
+        # Manifest riêng: không ghi đè manifest của step0 incremental (inbox_manifest.json)
+        manifest_path=paths.catalog_path() / "inbox_watch_manifest.json",
+    )
+
+    signal.signal(signal.SIGTERM, lambda *_: watcher.stop())
+    signal.signal(signal.SIGINT, lambda *_: watcher.stop())
+
+    watcher.run()
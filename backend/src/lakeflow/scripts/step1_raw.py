@@ -3,14 +3,28 @@ Step 1 – PDF Staging
 100_raw → 200_staging
 """
 
+from functools import partial
 from pathlib import Path
+import argparse
 import os
+import re
 
 from dotenv import load_dotenv
 load_dotenv()
 
 from lakeflow.runtime.config import runtime_config
-from lakeflow.pipelines.staging.pipeline import run_pdf_staging
+from lakeflow.catalog.db import get_connection, init_db
+from lakeflow.catalog.stage_errors import error_kind, record_stage_error
+from lakeflow.common.parallel import map_in_processes, resolve_workers
+from lakeflow.common.pdf_extract import default_engine
+from lakeflow.common.watchdog import FileLimits, run_supervised
+from lakeflow.pipelines.staging.pdf_analyzer import PROFILE_MODES
+from lakeflow.pipelines.staging.pipeline import (
+    STAGING_ERROR_FILE,
+    PdfStagingJob,
+    run_pdf_staging_job,
+    write_staging_error,
+)
 from lakeflow.pipelines.staging.pdf_analyzer import StagingError
 from lakeflow.config import paths
 
@@ -57,11 +71,57 @@ def already_staged(file_hash: str, parent_dir: str = "") -> bool:
     return (root / file_hash / "validation.json").exists()
 
 
+# staging_error.txt do watchdog ghi bắt đầu bằng tiền tố này
+WATCHDOG_PREFIX = "[watchdog:"
+# "[watchdog:<kind>] attempt=<n> config=<engine/profile/giới hạn> <lỗi>"
+WATCHDOG_LINE = re.compile(r"^\[watchdog:\w+\] attempt=(\d+) config=(\S+)")
+
+# File bị watchdog kill được thử lại tối đa ngần này lượt (cùng cấu hình)
+DEFAULT_WATCHDOG_ATTEMPTS = 3
+
+
+def watchdog_config(text_engine: str, profile_mode: str, limits: FileLimits) -> str:
+    """Đổi extractor / profile / giới hạn watchdog → đếm lại số lần thử từ đầu."""
+    return f"{text_engine}/{profile_mode}/{limits.timeout:g}s/{limits.max_rss_mb}MB"
+
+
+def killed_attempts(job: PdfStagingJob, config: str) -> int:
+    """Số lần file này đã bị watchdog kill (timeout / quá RAM / crash) với cùng config."""
+    try:
+        reason = (job.staging_dir / STAGING_ERROR_FILE).read_text(encoding="utf-8")
+    except OSError:
+        return 0
+    match = WATCHDOG_LINE.match(reason)
+    if match is None or match.group(2) != config:
+        return 0  # không phải watchdog, định dạng cũ hoặc cấu hình đã đổi
+    return int(match.group(1))
+
+
+def _print_failure(pdf_path: Path, exc: BaseException) -> None:
+    print(f"[STAGING][ERROR] {pdf_path.name}")
+    if isinstance(exc, StagingError):
+        print(f"                Lý do: {exc}")
+    else:
+        print(f"                Lý do: {type(exc).__name__}: {exc}")
+
+
 # ======================================================
 # MAIN
 # ======================================================
 
 def main():
+    parser = argparse.ArgumentParser(description="Step 1 – PDF staging (100_raw → 200_staging)")
+    parser.add_argument(
+        "--workers",
+        default=os.getenv("PIPELINE_WORKERS"),
+        help="Số process song song (auto = số CPU; mặc định 1 = tuần tự)",
+    )
+    args = parser.parse_args()
+    workers = resolve_workers(args.workers)
+    profile_mode = os.getenv("PIPELINE_PDF_PROFILE", "exhaustive").strip().lower() or "exhaustive"
+    if profile_mode not in PROFILE_MODES:
+        raise RuntimeError(f"Invalid PIPELINE_PDF_PROFILE: {profile_mode} (expected one of {PROFILE_MODES})")
+
     print("=== RUN PDF STAGING (200_staging) ===")
 
     raw_root = paths.raw_path()
@@ -77,8 +137,46 @@ def main():
         print(f"[STAGING] Chỉ chạy các thư mục: {only_path_prefixes}")
     if force_rerun:
         print("[STAGING] Force re-run: chạy lại kể cả đã staging")
+    if profile_mode != "exhaustive":
+        print(f"[STAGING] PDF profile mode: {profile_mode}")
+    text_engine = default_engine()
+    print(f"[STAGING] PDF text engine: {text_engine}")
+    save_page_text = os.getenv("PIPELINE_STAGING_PAGE_TEXT") == "1"
+    if save_page_text:
+        if profile_mode == "exhaustive":
+            print("[STAGING] Save page text: pages.jsonl")
+        else:
+            print("[STAGING][WARN] PIPELINE_STAGING_PAGE_TEXT chỉ có tác dụng với profile exhaustive")
+
+    limits = FileLimits.from_env()
+    if limits.enabled:
+        print(f"[STAGING] Watchdog: {limits.describe()} mỗi file")
+    run_job = partial(run_supervised, run_pdf_staging_job, limits=limits)
+    config = watchdog_config(text_engine, profile_mode, limits)
+    max_attempts = max(1, int(os.getenv("PIPELINE_WATCHDOG_ATTEMPTS") or DEFAULT_WATCHDOG_ATTEMPTS))
+
+    catalog_conn = None
+
+    def on_failure(job: PdfStagingJob, exc: BaseException) -> None:
+        nonlocal catalog_conn
+        _print_failure(job.raw_pdf_path, exc)
+        kind = error_kind(exc)
+        if kind != "error":
+            # Process con đã bị kill → không tự ghi được staging_error.txt
+            attempt = killed_attempts(job, config) + 1
+            write_staging_error(
+                job.staging_dir, f"{WATCHDOG_PREFIX}{kind}] attempt={attempt} config={config} {exc}"
+            )
+        try:
+            if catalog_conn is None:
+                catalog_conn = get_connection(paths.catalog_db_path())
+                init_db(catalog_conn)
+            record_stage_error(catalog_conn, job.file_hash, "staging", job.raw_pdf_path, exc)
+        except Exception as e:
+            print(f"[STAGING][WARN] Cannot record error in catalog: {e}")
 
     processed = skipped = failed = 0
+    jobs: list[PdfStagingJob] = []
 
     pdf_files = [p for p in raw_root.rglob("*") if p.is_file() and p.suffix.lower() == ".pdf"]
     print(f"[DEBUG] Found {len(pdf_files)} PDF files")
@@ -99,25 +197,49 @@ def main():
             skipped += 1
             continue
 
-        print(f"[STAGING][PDF] Processing: {pdf_path}")
-
-        try:
-            run_pdf_staging(
+        jobs.append(
+            PdfStagingJob(
                 file_hash=file_hash,
                 raw_pdf_path=pdf_path,
                 staging_root=paths.staging_path(),
                 parent_dir=parent_dir or None,
+                profile_mode=profile_mode,
+                save_page_text=save_page_text,
+                text_engine=text_engine,
             )
-            processed += 1
-
-        except StagingError as exc:
-            failed += 1
-            print(f"[STAGING][ERROR] {pdf_path.name}")
-            print(f"                Lý do: {exc}")
-        except Exception as exc:
-            failed += 1
-            print(f"[STAGING][ERROR] {pdf_path.name}")
-            print(f"                Lý do: {type(exc).__name__}: {exc}")
+        )
+
+    if not force_rerun:
+        # File đã bị watchdog kill max_attempts lần (cùng config): bỏ qua
+        # (chạy lại bằng PIPELINE_FORCE_RERUN=1 hoặc đổi engine / giới hạn)
+        killed = [job for job in jobs if killed_attempts(job, config) >= max_attempts]
+        for job in killed:
+            print(f"[STAGING][SKIP] Killed by watchdog {max_attempts} times: {job.file_hash}")
+        skipped += len(killed)
+        jobs = [job for job in jobs if job not in killed]
+
+    if workers > 1 and len(jobs) > 1:
+        # ---------- Song song: mỗi PDF một task trên process pool ----------
+        print(f"[STAGING] Parallel mode: {workers} processes, {len(jobs)} PDF")
+        for result in map_in_processes(run_job, jobs, workers):
+            if result.error is None:
+                print(f"[STAGING][PDF] Done: {result.item.raw_pdf_path}")
+                processed += 1
+            else:
+                failed += 1
+                on_failure(result.item, result.error)
+    else:
+        for job in jobs:
+            print(f"[STAGING][PDF] Processing: {job.raw_pdf_path}")
+            try:
+                run_job(job)
+                processed += 1
+            except Exception as exc:
+                failed += 1
+                on_failure(job, exc)
+
+    if catalog_conn is not None:
+        catalog_conn.close()
 
     print("=================================")
     print(f"PDF processed : {processed}")
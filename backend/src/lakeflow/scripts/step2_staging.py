@@ -3,16 +3,24 @@ Step 2 – Processing
 200_staging → 300_processed
 """
 
+from functools import partial
 from pathlib import Path
+from typing import Optional
+import argparse
 import os
 
 from dotenv import load_dotenv
 load_dotenv()
 
 from lakeflow.runtime.config import runtime_config
-from lakeflow.pipelines.processing.pipeline import run_processed_pipeline
+from lakeflow.pipelines.processing.pipeline import ProcessingJob, run_processed_job
 from lakeflow.config import paths
-from lakeflow.common.raw_finder import find_raw_file
+from lakeflow.common.raw_finder import RawFileResolver
+from lakeflow.common.parallel import map_in_processes, resolve_workers
+from lakeflow.common.watchdog import FileLimits, run_supervised
+from lakeflow.catalog.db import get_connection, init_db
+from lakeflow.catalog.stage_errors import error_kind, record_stage_error
+from lakeflow.pipelines.staging.pipeline import write_staging_error
 
 
 # ======================================================
@@ -32,11 +40,28 @@ runtime_config.set_data_base_path(base_path)
 print(f"[BOOT] DATA_BASE_PATH2 = {base_path}")
 
 
+# ======================================================
+# HELPERS
+# ======================================================
+
+def _rel_path(job: ProcessingJob) -> str:
+    return f"{job.parent_dir}/{job.file_hash}" if job.parent_dir else job.file_hash
+
+
 # ======================================================
 # MAIN
 # ======================================================
 
 def main():
+    parser = argparse.ArgumentParser(description="Step 2 – Processing (200_staging → 300_processed)")
+    parser.add_argument(
+        "--workers",
+        default=os.getenv("PIPELINE_WORKERS"),
+        help="Số process song song (auto = số CPU; mặc định 1 = tuần tự)",
+    )
+    args = parser.parse_args()
+    workers = resolve_workers(args.workers)
+
     print("=== RUN 300_PROCESSED PIPELINE ===")
 
     staging_root = paths.staging_path()
@@ -57,8 +82,24 @@ def main():
         print(f"[PROCESSING] Chỉ chạy các thư mục: {only_folders}")
     if force_rerun:
         print("[PROCESSING] Force re-run: chạy lại kể cả đã xử lý")
-
-    processed_count = 0
+    pdf_split_pages = int(os.getenv("PIPELINE_PDF_SPLIT_PAGES") or 0)
+    pdf_split_workers = resolve_workers(os.getenv("PIPELINE_PDF_SPLIT_WORKERS") or "auto")
+    if workers > 1:
+        # Đã song song theo file → chia khoảng trang chỉ làm tranh CPU
+        pdf_split_workers = 1
+    if pdf_split_pages > 0 and pdf_split_workers > 1:
+        print(f"[PROCESSING] PDF >= {pdf_split_pages} trang: chia khoảng trang trên {pdf_split_workers} processes")
+
+    limits = FileLimits.from_env()
+    if limits.enabled:
+        print(f"[PROCESSING] Watchdog: {limits.describe()} mỗi file")
+    run_one = partial(run_supervised, run_processed_job, limits=limits)
+    catalog_conn = get_connection(paths.catalog_db_path())
+    init_db(catalog_conn)
+    raw_resolver = RawFileResolver.load(catalog_conn, raw_root)
+
+    jobs: list[ProcessingJob] = []
+    skipped_count = 0
 
     # 200_staging: có thể là <domain>/<file_hash>/ hoặc (cũ) <file_hash>/
     def iter_staging_entries():
@@ -95,27 +136,70 @@ def main():
             else:
                 continue
 
-        raw_file = find_raw_file(file_hash, raw_root)
+        raw_file = raw_resolver.find(file_hash)
 
         if raw_file is None:
             print(f"[SKIP] Raw file not found for {file_hash}")
+            skipped_count += 1
             continue
 
-        try:
-            run_processed_pipeline(
+        jobs.append(
+            ProcessingJob(
                 file_hash=file_hash,
                 raw_file_path=raw_file,
                 staging_dir=staging_dir,
                 processed_root=processed_root,
                 force=force_rerun,
                 parent_dir=parent_name or None,
+                pdf_split_pages=pdf_split_pages,
+                pdf_split_workers=pdf_split_workers,
             )
-            processed_count += 1
+        )
+
+    # index job → lỗi (None = thành công); tổng kết in theo thứ tự job
+    errors: dict[int, Optional[BaseException]] = {}
+
+    def on_failure(job: ProcessingJob, exc: BaseException) -> None:
+        print(f"[ERROR] Failed processing {job.file_hash}: {exc}")
+        kind = error_kind(exc)
+        if kind != "error":
+            write_staging_error(job.staging_dir, f"[watchdog:{kind}] processing: {exc}")
+        try:
+            record_stage_error(catalog_conn, job.file_hash, "processing", job.raw_file_path, exc)
+        except Exception as e:
+            print(f"[PROCESSING][WARN] Cannot record error in catalog: {e}")
+
+    if workers > 1 and len(jobs) > 1:
+        # ---------- Song song: mỗi file một task; tối đa 2 × workers file đang chờ ----------
+        print(f"[PROCESSING] Parallel mode: {workers} processes, {len(jobs)} files")
+        index_of = {id(job): i for i, job in enumerate(jobs)}
+        for result in map_in_processes(run_one, jobs, workers):
+            errors[index_of[id(result.item)]] = result.error
+            if result.error is None:
+                print(f"[PROCESSING] Done: {_rel_path(result.item)}")
+            else:
+                on_failure(result.item, result.error)
+    else:
+        for i, job in enumerate(jobs):
+            try:
+                run_one(job)
+                errors[i] = None
+            except Exception as exc:
+                errors[i] = exc
+                on_failure(job, exc)
+
+    catalog_conn.close()
 
-        except Exception as exc:
-            print(f"[ERROR] Failed processing {file_hash}: {exc}")
+    failed = [(job, errors[i]) for i, job in enumerate(jobs) if errors.get(i) is not None]
+    processed_count = len(jobs) - len(failed)
 
     print("=================================")
+    if failed:
+        print("Failed files (theo thứ tự):")
+        for job, exc in failed:
+            print(f"  - {_rel_path(job)} [{error_kind(exc)}]: {exc}")
+    print(f"Skipped (no raw file): {skipped_count}")
+    print(f"Failed               : {len(failed)}")
     print(f"=== DONE. Processed files: {processed_count} ===")
     print("=================================")
 
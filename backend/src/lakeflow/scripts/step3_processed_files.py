@@ -10,7 +10,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from lakeflow.runtime.config import runtime_config
-from lakeflow.pipelines.embedding.pipeline import run_embedding_pipeline
+from lakeflow.pipelines.embedding.scheduler import EmbeddingJob, EmbeddingScheduler
+from lakeflow.pipelines.embedding.model_registry import model_stats
 from lakeflow.config import paths
 
 
@@ -56,6 +57,7 @@ def main():
         print("[EMBEDDING] Force re-run: chạy lại kể cả đã embed")
 
     embedded = skipped = failed = 0
+    jobs: list[EmbeddingJob] = []
 
     # 300_processed: <domain>/<file_hash>/ hoặc (cũ) <file_hash>/
     def iter_processed_entries():
@@ -92,32 +94,47 @@ def main():
             else:
                 continue
 
-        print(f"[400] Processing: {file_hash}")
-
-        try:
-            result = run_embedding_pipeline(
+        jobs.append(
+            EmbeddingJob(
                 file_hash=file_hash,
                 processed_dir=processed_dir,
-                embeddings_root=embeddings_root,
-                force=force_rerun,
-                parent_dir=parent_name or None,
+                out_dir=embeddings_root / rel_path,
             )
-
-            if result == "SKIPPED":
+        )
+
+    # ---------- Micro-batch chung cho mọi file (xem pipelines/embedding/scheduler.py) ----------
+    scheduler = EmbeddingScheduler.from_env(force=force_rerun)
+    print(f"[EMBEDDING] {len(jobs)} files, batch {scheduler.batch_size}, window {scheduler.window_chunks} chunks")
+    try:
+        for result in scheduler.run(jobs):
+            file_hash = result.job.file_hash
+            if result.status == "SKIPPED":
                 skipped += 1
-                print(f"[400][SKIP] Already embedded: {file_hash}")
-            else:
+                print(f"[400][SKIP] Already embedded / no text: {file_hash}")
+            elif result.status == "EMBEDDED":
                 embedded += 1
                 print(f"[400][OK] Embedded: {file_hash}")
-
-        except Exception as exc:
-            failed += 1
-            print(f"[400][ERROR] {file_hash}: {exc}")
+            else:
+                failed += 1
+                print(f"[400][ERROR] {file_hash}: {result.error}")
+    finally:
+        scheduler.close()
 
     print("=================================")
     print(f"Embedded files : {embedded}")
     print(f"Skipped        : {skipped}")
     print(f"Failed         : {failed}")
+    if scheduler.pool is not None:
+        for line in scheduler.pool.report():
+            print(line)
+    if scheduler.cache is not None:
+        print(f"Embedding cache: {scheduler.cache.stats.describe()}")
+    for stats in model_stats():
+        print(
+            f"Model          : {stats['model_name']} ({stats['device']}) "
+            f"load {stats['load_seconds']}s, warm-up {stats['warmup_seconds']}s, "
+            f"reused {stats['reuses']}x"
+        )
     print("=================================")
 
 